@@ -1,68 +1,250 @@
 # app.py
 import streamlit as st
-import json, re, time
-from openai import OpenAI
+import contextvars, json, os, queue, time, uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from teardown.cache import DATA_DIR, TeardownCache
+from teardown.fingerprint import plan as plan_regeneration, product_inputs
+from teardown.generate import demo_teardown, generate_teardown
+from teardown.history import TeardownHistory
+from teardown.jobs import FINISHED, JobQueue, WorkerPool, teardown_handler
+from teardown.llm import DEFAULT_POOL, make_client
+from teardown.providers import build_router, provider_models
+from teardown.prompts import DEPTH_LEVELS, INDUSTRY_TEMPLATES
+from teardown.render import comparison_rows, markdown_from_teardown, north_star
+from teardown.ratelimit import configure as configure_rate_limiter
+from teardown.retry import RetryPolicy
+from teardown.schema import TeardownValidationError
+from teardown.similar import SimilarityIndex
+from teardown.tracing import configure as configure_tracing, span, tracer
+from teardown.usage import tracker as usage_tracker, usage_session
 
 st.set_page_config(page_title="AI Product Teardown Engine — Compare", layout="wide")
 st.title("🔎 AI Product Teardown Engine — Compare Mode")
-st.caption("Reverse-engineer any product. Compare two teardowns side-by-side. Industry-aware prompt templates included.")
+st.caption("Reverse-engineer any product. Compare two teardowns side-by-side, or a whole category of competitors in a matrix. Industry-aware prompt templates included.")
 
 # -------------------------------
 # OpenAI client init (new SDK)
+# Built once per process and shared by every session and rerun, so the HTTP
+# connection pool (and its warm TLS connections) survives widget interactions.
+# Optional secrets: LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE, LLM_KEEPALIVE_EXPIRY,
+# LLM_TIMEOUT, LLM_CONNECT_TIMEOUT.
 # -------------------------------
+@st.cache_resource(show_spinner=False)
+def get_client(api_key, max_connections, max_keepalive_connections, keepalive_expiry, timeout, connect_timeout):
+    return make_client(
+        api_key,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+        timeout=timeout,
+        connect_timeout=connect_timeout,
+    )
+
+# Optional secret LLM_PROVIDERS: a list of backends ([[LLM_PROVIDERS]] tables:
+# OpenAI, any OpenAI-compatible base_url, local Ollama / llama.cpp) behind a
+# router that picks one per call by latency, error rate and cost and fails over
+# when one is slow or down. See teardown/providers.py for the fields.
+@st.cache_resource(show_spinner=False)
+def get_router(specs_json, api_key, max_connections, max_keepalive_connections, keepalive_expiry, timeout, connect_timeout):
+    return build_router(
+        json.loads(specs_json),
+        api_key,
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+        timeout=timeout,
+        connect_timeout=connect_timeout,
+    )
+
+provider_specs = json.loads(json.dumps(list(st.secrets.get("LLM_PROVIDERS", [])), default=dict))
+pool_settings = (
+    int(st.secrets.get("LLM_MAX_CONNECTIONS", DEFAULT_POOL["max_connections"])),
+    int(st.secrets.get("LLM_MAX_KEEPALIVE", DEFAULT_POOL["max_keepalive_connections"])),
+    float(st.secrets.get("LLM_KEEPALIVE_EXPIRY", DEFAULT_POOL["keepalive_expiry"])),
+    float(st.secrets.get("LLM_TIMEOUT", DEFAULT_POOL["timeout"])),
+    float(st.secrets.get("LLM_CONNECT_TIMEOUT", DEFAULT_POOL["connect_timeout"])),
+)
+
 client = None
-if "OPENAI_API_KEY" in st.secrets:
+router = None
+if provider_specs:
     try:
-        client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+        client = router = get_router(json.dumps(provider_specs, sort_keys=True), st.secrets.get("OPENAI_API_KEY"), *pool_settings)
+    except Exception as e:
+        st.error("Failed to initialize LLM providers: " + str(e))
+elif "OPENAI_API_KEY" in st.secrets:
+    try:
+        client = get_client(st.secrets["OPENAI_API_KEY"], *pool_settings)
     except Exception as e:
         st.error("Failed to initialize OpenAI client: " + str(e))
 else:
     st.warning("No OPENAI_API_KEY found in Streamlit Secrets. You can still use demo mode outputs but LLM memos will be disabled.")
 
 # -------------------------------
-# Utilities: markdown generator
+# Persistent teardown cache (shared across reruns and sessions)
 # -------------------------------
-def markdown_from_teardown(td, title):
-    md = [f"# Product Teardown — {title}\n"]
-    md.append("## One-pager\n")
-    md.append(td.get("one_pager","") + "\n\n")
-    md.append("## Strategy\n")
-    for s in td.get("strategy",[]):
-        md.append(f"- {s}\n")
-    md.append("\n## Growth Loops\n")
-    for g in td.get("growth_loops", td.get("growthLoops", [])):
-        md.append(f"- {g}\n")
-    md.append("\n## Engagement Mechanics\n")
-    for e in td.get("engagement_mechanics", td.get("engagement", [])):
-        md.append(f"- {e}\n")
-    md.append("\n## KPIs\n")
-    md.append("```json\n")
-    md.append(json.dumps(td.get("kpis",{}), indent=2, ensure_ascii=False))
-    md.append("\n```\n")
-    md.append("\n## UX Tear-down\n")
-    for u in td.get("ux_teardown", td.get("ux", [])):
-        md.append(f"- {u}\n")
-    md.append("\n## SWOT\n")
-    md.append("```json\n")
-    md.append(json.dumps(td.get("swot",{}), indent=2, ensure_ascii=False))
-    md.append("\n```\n")
-    md.append("\n## Opportunities\n")
-    for o in td.get("opportunities",[]):
-        md.append(f"- {o}\n")
-    return "\n".join(md)
-
-    
-# -------------------------------
-# Industry fine-tuned prompt templates
-# -------------------------------
-INDUSTRY_TEMPLATES = {
-    "General / Consumer": "Focus on consumer acquisition, retention hooks, network effects, pricing psychology, and UX simplicity.",
-    "FinTech": "Focus on regulatory constraints, payments & flows, trust signals, onboarding (KYC), monetization via interchange/fees, fraud & compliance concerns, and merchant/partner flows.",
-    "Marketplace": "Focus on two-sided network dynamics (supply/demand), liquidity, take rates, onboarding incentives, quality controls, and marketplace matching algorithms.",
-    "SaaS / B2B": "Focus on buyer personas, sales motions (self-serve vs enterprise), onboarding/activation for users/teams, trial/enterprise pricing, retention via ROI, and product-led growth experiments.",
-    "EdTech": "Focus on learning outcomes, curriculum design, engagement loops, teacher/platform dynamics, certification, and measurement of learning retention.",
-    "HealthTech": "Focus on trust & compliance (HIPAA-like), clinician workflows, patient onboarding, safety-critical UX, integrations with EMR, and monetization models."
-}
+@st.cache_resource
+def get_teardown_cache():
+    return TeardownCache()
+
+teardown_cache = get_teardown_cache()
+
+# Near-duplicate product lookup ("google pay app" reuses a cached "Google Pay" teardown;
+# "GPay" only gets it offered)
+@st.cache_resource
+def get_similarity_index():
+    return SimilarityIndex()
+
+similarity_index = get_similarity_index()
+
+# -------------------------------
+# Searchable history of past runs (SQLite + FTS5, shared across sessions)
+# -------------------------------
+@st.cache_resource
+def get_teardown_history():
+    return TeardownHistory()
+
+teardown_history = get_teardown_history()
+
+def load_history_run(run_id):
+    """Puts a saved run into the product inputs and the session's results (runs before the input widgets exist)."""
+    loaded = teardown_history.load(run_id)
+    if len(loaded) < 2:
+        return
+    st.session_state["product_count"] = len(loaded)
+    for side, entry in loaded.items():
+        st.session_state[f"name_{side}"] = entry["product"]
+        st.session_state[f"features_{side}"] = entry["product_text"].partition("\n\n")[2]
+    # only the settings history records are tracked; Generate regenerates a product once one of them (or its text) changes
+    st.session_state["results"] = {side: {"title": entry["product"], "product_text": entry["product_text"], "teardown": entry["teardown"],
+                                          "inputs": {"product": entry["product"], "features": entry["product_text"].partition("\n\n")[2],
+                                                     "industry": entry["industry"], "depth": entry["depth"], "model": entry["model"],
+                                                     "temperature": round(float(entry["temperature"]), 3), "mode": entry["mode"]}}
+                                   for side, entry in loaded.items()}
+    first = loaded[min(loaded)]
+    saved = time.strftime("%d %b %Y %H:%M", time.localtime(first["created_at"]))
+    st.session_state["results_note"] = (f"Loaded from history: {' vs '.join(e['product'] for _, e in sorted(loaded.items()))} "
+                                        f"({first['depth']}, {first['model']}, saved {saved}). No LLM call was made.")
+
+# -------------------------------
+# Process-wide rate limiter shared by every session (and, with LLM_RATE_STATE_PATH,
+# by batch workers on the same machine). Optional secrets:
+#   [LLM_RATE_LIMITS."gpt-4o"]  rpm = 500  tpm = 30000
+#   LLM_RATE_STATE_PATH = ".teardown/ratelimit.json"
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def setup_rate_limiter(limits_json, state_path):
+    return configure_rate_limiter(json.loads(limits_json), state_path or None)
+
+setup_rate_limiter(
+    json.dumps({m: dict(v) for m, v in st.secrets.get("LLM_RATE_LIMITS", {}).items()}, sort_keys=True),
+    st.secrets.get("LLM_RATE_STATE_PATH", ""),
+)
+
+# -------------------------------
+# Retry policy: backoff with jitter, Retry-After aware, bounded per request
+# Optional secrets: LLM_MAX_ATTEMPTS, LLM_REQUEST_DEADLINE (seconds)
+# -------------------------------
+retry_policy = RetryPolicy(
+    max_attempts=int(st.secrets.get("LLM_MAX_ATTEMPTS", 4)),
+    deadline=float(st.secrets.get("LLM_REQUEST_DEADLINE", 180)),
+)
+
+# -------------------------------
+# Usage accounting: tokens, cost, latency and retries per session and per day.
+# Every LLM call is also appended to a JSONL metrics file.
+# Optional secret: LLM_USAGE_LOG (path; empty string disables the file)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def setup_usage_log(path):
+    usage_tracker.configure(path or None)
+    return path
+
+setup_usage_log(st.secrets.get("LLM_USAGE_LOG", os.path.join(DATA_DIR, "usage.jsonl")))
+
+if "usage_session" not in st.session_state:
+    st.session_state["usage_session"] = uuid.uuid4().hex[:12]
+usage_session_id = st.session_state["usage_session"]
+
+def render_usage(with_export=False):
+    """Fills the sidebar usage panel; the export button is only added once per run."""
+    mine = usage_tracker.session_summary(usage_session_id)
+    today = usage_tracker.day_summary()
+    with usage_slot.container():
+        st.markdown("**Usage & cost**")
+        if not today["calls"]:
+            st.caption("No LLM calls yet.")
+            return
+        st.caption(
+            f"This session: {mine['calls']} calls · {mine['prompt_tokens'] + mine['completion_tokens']:,} tokens · "
+            f"${mine['cost_usd']:.4f} · avg {mine['avg_latency_s']:.1f}s · {mine['retries']} retries · {mine['errors']} errors"
+        )
+        st.caption(
+            f"Today (all sessions): {today['calls']} calls · {today['prompt_tokens'] + today['completion_tokens']:,} tokens · "
+            f"${today['cost_usd']:.4f}"
+        )
+        if today["prompt_tokens"]:
+            st.caption(f"Prompt cache: {today['prompt_cache_hit_rate']:.0%} of prompt tokens cached · "
+                       f"{today['calls_with_cache_hits']}/{today['calls']} calls hit")
+        if with_export and mine["calls"]:
+            st.download_button("Export usage (JSONL)", usage_tracker.export_jsonl(usage_session_id),
+                               file_name=f"teardown_usage_{usage_session_id}.jsonl", mime="application/json")
+
+# -------------------------------
+# Stage timing spans (prompt build, network, parsing, rendering) for every run.
+# Optional secret: TRACE_FILE (OTLP/JSON lines file for OpenTelemetry tooling)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def setup_tracing(path):
+    return configure_tracing(path or None)
+
+setup_tracing(st.secrets.get("TRACE_FILE", ""))
+run_trace = tracer.start("ui.run")
+
+def render_timings():
+    stages = tracer.stage_summary(run_trace.trace_id)
+    with timing_slot.container(), st.expander("Stage timings (this run)"):
+        st.table([{"stage": name, "calls": t["count"], "total ms": round(t["total_s"] * 1000, 1), "max ms": round(t["max_s"] * 1000, 1)}
+                  for name, t in sorted(stages.items(), key=lambda item: -item[1]["total_s"])])
+
+def render_providers():
+    if router is None:
+        return
+    with providers_slot.container(), st.expander("LLM providers"):
+        st.caption("Picked per call by latency, error rate and cost (lower score first); a provider in cooldown is skipped after repeated failures.")
+        st.table(router.snapshot(model))
+
+# -------------------------------
+# Background job queue: teardowns run on worker threads in the server process
+# (or in `python -m teardown.jobs` workers) and survive reruns and closed tabs.
+# Optional secret: JOB_WORKERS (default 2; 0 = leave the jobs to external workers)
+# -------------------------------
+@st.cache_resource(show_spinner=False)
+def get_job_queue(workers, _client):
+    queue = JobQueue()
+    if workers:
+        WorkerPool(queue, teardown_handler(_client, teardown_cache, similarity_index, retry_policy), workers=workers).start()
+    return queue
+
+job_queue = get_job_queue(int(st.secrets.get("JOB_WORKERS", 2)) if client is not None else 0, client)
+
+GENERATION_MODE_KEYS = {"Single call": "single", "Section fan-out": "sections"}
+
+# up to eight products are compared at once, labelled A..H
+SIDES = "ABCDEFGH"
+DEFAULT_PRODUCTS = ["Google Pay", "PhonePe", "Paytm", "Amazon Pay", "BHIM", "CRED", "MobiKwik", "Navi"]
+
+# a new session (e.g. a reloaded tab) picks up the jobs listed in its URL (?jobs=...) and their product inputs
+if "jobs" not in st.session_state:
+    reattached = {job_id: job for job_id, job in job_queue.jobs(job_id for job_id in st.query_params.get("jobs", "").split(",") if job_id).items()
+                  if job["meta"]}
+    st.session_state["jobs"] = {job["meta"]["side"]: job_id for job_id, job in reattached.items()}
+    for job in reattached.values():
+        side, job_inputs = job["meta"]["side"], job["meta"]["inputs"]
+        st.session_state[f"name_{side}"] = job_inputs["product"]
+        st.session_state[f"features_{side}"] = job_inputs["features"]
+        st.session_state["product_count"] = max(st.session_state.get("product_count", 2), SIDES.index(side) + 1)
 
 # -------------------------------
 # Sidebar controls
@@ -70,316 +252,453 @@ INDUSTRY_TEMPLATES = {
 with st.sidebar:
     st.header("Teardown Settings")
     industry = st.selectbox("Industry template", list(INDUSTRY_TEMPLATES.keys()), index=0)
-    depth = st.selectbox("Analysis depth", ["Quick (bullets)", "Standard (detailed)", "Deep (comprehensive)"], index=1)
+    depth = st.selectbox("Analysis depth", DEPTH_LEVELS, index=1)
     include_user_flow = st.checkbox("Include user flow & microcopy", value=True)
     include_metrics = st.checkbox("Include KPIs & measurement plan", value=True)
     include_templates = st.checkbox("Include templates (PRD, experiment briefs)", value=True)
-    model = st.selectbox("LLM Model", ["gpt-4o-mini","gpt-4o"], index=0)
+    model_choices = ["gpt-4o-mini", "gpt-4o"]
+    model_choices += [m for m in provider_models(provider_specs) if m not in model_choices]
+    model = st.selectbox("LLM Model", model_choices, index=0)
     temperature = st.slider("Creativity (temperature)", 0.0, 0.9, 0.2, step=0.1)
+    concurrent_mode = st.checkbox("Generate products concurrently", value=True, help="Send the teardown requests at once instead of one after the other.")
+    max_parallel = st.slider("Max parallel teardowns", 2, len(SIDES), 4, disabled=not concurrent_mode, help="Cap on teardowns generated at the same time when comparing many products.")
+    generation_mode = st.selectbox("Generation mode", ["Single call", "Section fan-out"], index=0, help="Section fan-out sends one smaller request per section in parallel; faster for Deep mode and each section is retried on its own.")
+    structured_mode = st.checkbox("Structured output (JSON schema)", value=True, help="Ask the model for native JSON-schema output matching the teardown shape and validate it strictly.")
+    stream_mode = st.checkbox("Stream sections as they arrive", value=True, help="Render one-pager, strategy, growth loops and KPIs as soon as each section is complete.")
+    bypass_cache = st.checkbox("Bypass cache (force fresh LLM call)", value=False, help="Skip cached teardowns for identical prompt + model + temperature. Fresh results still refresh the cache.")
+    background_mode = st.checkbox("Run in background (job queue)", value=False, disabled=client is None,
+                                  help="Queue teardowns for background workers instead of waiting on this page. They keep running if you close or reload the tab; results appear here when ready.")
+    reuse_similar = st.checkbox("Reuse near-duplicate products", value=True, help="Serve a cached teardown of the same product under another spelling ('google pay app' ≈ Google Pay) with the same settings. Abbreviations (GPay) are offered instead of reused.")
+    cache_stats = teardown_cache.stats()
+    st.caption(f"Cache: {cache_stats['entries']} teardowns, {cache_stats['bytes'] / 1024:.0f} KB")
+    if st.button("Clear teardown cache"):
+        teardown_cache.clear()
+        similarity_index.clear()
+        st.rerun()
+    usage_slot = st.empty()
+    timing_slot = st.empty()
+    providers_slot = st.empty()
     run_button = st.button("Generate / Refresh Teardowns")
     st.markdown("---")
-    st.info("Add OPENAI_API_KEY in Streamlit Secrets to enable LLM calls. If missing, demo outputs will be shown.")
+    st.info("Add OPENAI_API_KEY (or LLM_PROVIDERS) in Streamlit Secrets to enable LLM calls. If missing, demo outputs will be shown.")
+    st.markdown("---")
+    st.subheader("History")
+    history_query = st.text_input("Search past teardowns", placeholder="product, feature, idea…")
+    past_runs = teardown_history.search(history_query, limit=20)
+    if past_runs:
+        run_labels = {
+            r["run_id"]: f"{' vs '.join(r['products'])} · {r['depth']} · {r['model']} · {time.strftime('%d %b %H:%M', time.localtime(r['created_at']))}"
+            for r in past_runs
+        }
+        picked_run = st.selectbox("Past runs", list(run_labels), format_func=run_labels.get)
+        if st.button("Load from history", help="Show a saved comparison instantly, without calling the LLM."):
+            load_history_run(picked_run)
+    else:
+        st.caption("No matching teardowns." if history_query.strip() else "Generated teardowns will appear here.")
 
 # -------------------------------
-# Inputs for two products
+# Inputs: Product A & B, or up to eight products for a category comparison
 # -------------------------------
-st.markdown("## Inputs — Product A & Product B")
-col1, col2 = st.columns(2)
+def grid(n, per_row=4):
+    """n equal-width cells laid out in rows of at most per_row columns."""
+    cells = []
+    for _ in range(0, n, per_row):
+        cells.extend(st.columns(min(per_row, n)))
+    return cells[:n]
 
-with col1:
-    st.subheader("Product A")
-    app_a = st.text_input("Name / URL / short description (A)", value="Google Pay")
-    explicit_a = st.text_area("Optional: paste product key features (A)", height=80)
-
-with col2:
-    st.subheader("Product B")
-    app_b = st.text_input("Name / URL / short description (B)", value="PhonePe")
-    explicit_b = st.text_area("Optional: paste product key features (B)", height=80)
+st.markdown("## Inputs")
+# defaults go through session_state (not value=) so a history load can fill the widgets
+st.session_state.setdefault("product_count", 2)
+product_count = int(st.number_input("Products to compare", min_value=2, max_value=len(SIDES), step=1, key="product_count",
+                                    help="Two products are compared side-by-side; three or more also get a comparison matrix."))
+inputs = {}
+for cell, side in zip(grid(product_count), SIDES):
+    st.session_state.setdefault(f"name_{side}", DEFAULT_PRODUCTS[SIDES.index(side)])
+    with cell:
+        st.subheader(f"Product {side}")
+        name = st.text_input(f"Name / URL / short description ({side})", key=f"name_{side}")
+        features = st.text_area(f"Optional: paste product key features ({side})", height=80, key=f"features_{side}")
+        inputs[side] = (name.strip(), features.strip())
 
 # -------------------------------
-# Prompt builders & LLM helpers
+# Generation: concurrent workers (capped) + live streamed sections
 # -------------------------------
-def depth_to_instruction(d):
-    return {
-        "Quick (bullets)": "Produce concise, high-impact bullet points (1-4 bullets per section).",
-        "Standard (detailed)": "Provide structured analysis with 4-8 bullets per section and short rationale sentences.",
-        "Deep (comprehensive)": "Provide an in-depth multi-paragraph analysis using frameworks and examples for each section."
-    }.get(d, "")
+def show_llm_error(exc):
+    if isinstance(exc, TeardownValidationError):
+        st.warning(str(exc))
+    else:
+        st.error(str(exc))
 
-def build_teardown_prompt(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates):
+LIVE_SECTIONS = [("one_pager", "One-page summary"), ("strategy", "Strategy"), ("growth_loops", "Growth Loops"), ("kpis", "Key KPIs")]
+
+def render_live_section(slot, title, value):
+    with slot.container():
+        st.markdown(f"#### {title}")
+        if isinstance(value, list):
+            st.markdown("\n".join(f"- {v}" for v in value))
+        elif isinstance(value, dict):
+            st.json(value)
+        else:
+            st.write(value or "")
+
+def reuse_note(match):
+    return f"reused the cached teardown of '{match['product']}' ({match['score']:.0%} match; tick 'Bypass cache' for a fresh one)"
+
+def generate_products(products, industry_key, depth, include_user_flow, include_metrics, include_templates, model, temperature, use_cache=True, max_workers=2, stream=False, structured=False, mode="single", similar=None, on_suggest=None, on_error=None):
     """
-    Returns a prompt instructing the LLM to output EXACTLY one JSON object with:
-    { strategy, growth_loops, engagement_mechanics, kpis, ux_teardown, swot, opportunities, one_pager }
+    products: {"A": (label, product_text), "B": (label, product_text), ...}
+    Runs generate_teardown for every product on a thread pool of at most
+    max_workers threads and updates a per-product status line as each one
+    finishes. With stream=True, sections are rendered into live side-by-side
+    panes as soon as they complete. on_suggest(side, matches) receives cached
+    products a side may abbreviate; on_error(side, exc) replaces show_llm_error.
+    Returns {side: (td, raw)}.
     """
-    industry_hint = INDUSTRY_TEMPLATES.get(industry_key, "")
-    explicit_instruction = depth_to_instruction(depth)
-    include_user_flow_flag = "yes" if include_user_flow else "no"
-    include_metrics_flag = "yes" if include_metrics else "no"
-    include_templates_flag = "yes" if include_templates else "no"
-
-    prompt = f"""
-You are an expert Product Manager & Growth strategist.
-
-Product description:
-\"\"\"{product_text}\"\"\"
-
-Context: {industry_hint}
-Depth instruction: {explicit_instruction}
-
-Produce exactly ONE JSON object (no surrounding text) with the following keys:
-- strategy: an array of 3-6 concise strings describing positioning, target segments, monetization levers.
-- growth_loops: an array of 3-6 strings describing primary acquisition & virality loops with estimated impact percentages where reasonable.
-- engagement_mechanics: an array of 4-8 strings describing activation, retention hooks, notifications, onboarding steps.
-- kpis: an object with keys: north_star, leading_indicators (array), dashboard_analytics (array of metric names).
-- ux_teardown: array of observations about UX/flows, friction points, and microcopy suggestions (include sample microcopy if INCLUDE_USER_FLOW=yes).
-- swot: object with keys: strengths (array), weaknesses (array), opportunities (array), threats (array).
-- opportunities: array of short product/experiment ideas prioritized (short/medium/long-term).
-- one_pager: a short markdown string (3-6 sentences) summarizing the product thesis and top recommendations.
-
-REQUIREMENTS:
-- Return valid JSON only (no commentary).
-- If INCLUDE_USER_FLOW is {include_user_flow_flag} then include 1 short suggested user flow (3-6 steps) inside ux_teardown items.
-- If INCLUDE_METRICS is {include_metrics_flag} then include realistic KPI names and 1 example target (e.g., conversion 3% -> 4%).
-- If INCLUDE_TEMPLATES is {include_templates_flag} then include one experiment idea in each of growth_loops and engagement_mechanics.
-
-Be concrete and action-oriented.
-"""
-    return prompt
-
-def call_llm(prompt, model="gpt-4o-mini", temperature=0.2, tries=2):
-    if client is None:
-        return None
-    last_exc = None
-    for attempt in range(tries):
-        try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[{"role":"user","content":prompt}],
-                temperature=temperature
-            )
-            # attempt to extract assistant message
-            try:
-                return resp.choices[0].message.content
-            except Exception:
-                return str(resp)
-        except Exception as e:
-            last_exc = e
-            time.sleep(1 + attempt)
-    st.error(f"LLM call failed after retries: {last_exc}")
-    return None
-
-# robust JSON extraction
-def extract_json(text):
-    if not text:
-        return None
-    # try fenced JSON
-    m = re.search(r"```json\s*(\{.*\}|\[.*\])\s*```", text, flags=re.DOTALL)
-    if m:
-        text = m.group(1)
-    # direct parse
-    try:
-        return json.loads(text)
-    except Exception:
-        # try to find first { ... }
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1 and end > start:
-            candidate = text[start:end+1]
+    ctx = get_script_run_ctx()
+    status = {side: st.empty() for side in products}
+    for side, (label, _) in products.items():
+        status[side].info(f"⏳ Product {side} — generating teardown for {label}...")
+    progress = st.progress(0.0, text="Generating teardowns...")
+
+    live = st.empty()
+    slots, received = {}, {}
+    if stream:
+        with live.container():
+            for col, (side, (label, _)) in zip(grid(len(products)), products.items()):
+                with col:
+                    st.markdown(f"### Product {side} — **{label}** (live)")
+                    slots[side] = {key: st.empty() for key, _ in LIVE_SECTIONS}
+                    slots[side]["_received"] = st.empty()
+                    received[side] = []
+
+    # workers only enqueue sections; all rendering stays on the script thread
+    events = queue.Queue()
+
+    titles = dict(LIVE_SECTIONS)
+
+    def drain_events():
+        while True:
             try:
-                return json.loads(candidate)
-            except Exception:
-                # try minor fixes: remove trailing commas
-                candidate2 = re.sub(r",\s*([}\]])", r"\1", candidate)
-                try:
-                    return json.loads(candidate2)
-                except Exception:
-                    return None
-    return None
-
-# -------------------------------
-# Function: generate teardown (with fallback demo)
-# -------------------------------
-def generate_teardown(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates, model, temperature):
-    prompt = build_teardown_prompt(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates)
-    raw = call_llm(prompt, model=model, temperature=temperature, tries=3)
-    parsed = extract_json(raw) if raw else None
-    if parsed is None:
-        # fallback demo minimal output (useful if no API key)
-        demo = {
-            "strategy": [
-                f"Position as fast, low-friction {industry_key.lower()} product",
-                "Target mass market and power users",
-                "Monetize via freemium and transactional fees"
-            ],
-            "growth_loops": [
-                "Referral loop: user invites friend -> both get credits (expected +1-3% uplift)",
-                "Merchant incentives: onboarding merchants drives supply"
-            ],
-            "engagement_mechanics": [
-                "Onboarding checklist with progress bar",
-                "Daily digest push for key actions"
-            ],
-            "kpis": {
-                "north_star": "DAU -> Paid conversion",
-                "leading_indicators": ["activation_rate", "7d_retention", "week1_cohort_conversion"],
-                "dashboard_analytics": ["signup_rate", "activation_rate", "revenue_per_user"]
-            },
-            "ux_teardown": [
-                "Clear CTA on home screen -> sample microcopy: 'Pay in 2 taps'",
-                "Suggested user flow: ['Install', 'Create account', 'Onboard payment method', 'Complete first transaction']" if include_user_flow else ""
-            ],
-            "swot": {
-                "strengths": ["Strong UX", "Partnerships"],
-                "weaknesses": ["Customer acquisition cost"],
-                "opportunities": ["New monetization"],
-                "threats": ["Regulatory risk"]
-            },
-            "opportunities": [
-                "Test 1: incentivized referral for transactions",
-                "Test 2: merchant onboarding pilot"
-            ],
-            "one_pager": f"{product_text} — Quick product thesis and 3-line exec summary."
-        }
-        return demo, raw
-    return parsed, raw
+                side, key, value = events.get_nowait()
+            except queue.Empty:
+                return
+            if key in titles:
+                render_live_section(slots[side][key], titles[key], value)
+            received[side].append(key)
+            slots[side]["_received"].caption("Sections received: " + ", ".join(received[side]))
+
+    def run(side, product_text):
+        # worker threads need the script context so st.error inside call_llm still renders
+        add_script_run_ctx(ctx=ctx)
+        on_section = (lambda key, value: events.put((side, key, value))) if stream else None
+        started = time.time()
+        td, raw = generate_teardown(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                                    client=client, cache=teardown_cache, use_cache=use_cache, on_section=on_section,
+                                    on_error=(lambda exc: on_error(side, exc)) if on_error is not None else show_llm_error,
+                                    structured=structured, mode=mode, retry_policy=retry_policy,
+                                    similar=similar, on_reuse=lambda match: reused.__setitem__(side, match),
+                                    on_suggest=(lambda matches: on_suggest(side, matches)) if on_suggest is not None else None)
+        return td, raw, time.time() - started
+
+    reused = {}
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # copy the caller's context so usage is attributed to this session
+        futures = {pool.submit(contextvars.copy_context().run, run, side, text): side for side, (_, text) in products.items()}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            drain_events()
+            for fut in done:
+                side = futures[fut]
+                td, raw, elapsed = fut.result()
+                results[side] = (td, raw)
+                render_usage()
+                note = f" · {reuse_note(reused[side])}" if side in reused else ""
+                status[side].success(f"✅ Product {side} — {products[side][0]} ready in {elapsed:.1f}s{note}")
+                progress.progress(len(results) / len(futures), text=f"{len(results)}/{len(futures)} teardowns ready")
+    progress.empty()
+    live.empty()
+    return results
+
+def save_to_history(sides):
+    """Records a run in the searchable history, unless a side fell back to the demo output."""
+    entries = [{"side": side, "product": name, "product_text": text, "teardown": td} for side, (name, text, td) in sides.items()]
+    if all(e["teardown"] and e["teardown"] != demo_teardown(e["product_text"], industry, include_user_flow) for e in entries):
+        teardown_history.record_run(entries, industry, depth, model, temperature, mode=GENERATION_MODE_KEYS[generation_mode])
+
+# -------------------------------
+# Generate teardowns when requested (or reload a saved run from history)
+# -------------------------------
+# Results live in session_state, so download clicks and widget changes don't wipe them.
+# Each product's teardown remembers the inputs it was made from (teardown.fingerprint);
+# Generate only sends products whose inputs changed (or every product with Bypass cache).
+products = {side: (name, name + ("\n\n" + features if features else "")) for side, (name, features) in inputs.items()}
+current_inputs = {side: product_inputs(name, features, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                                       structured=structured_mode, mode=GENERATION_MODE_KEYS[generation_mode])
+                  for side, (name, features) in inputs.items()}
+stored = st.session_state.setdefault("results", {})
 
 # -------------------------------
-# Generate teardowns when requested
+# Background jobs: {side: job_id} in session_state and in the URL (?jobs=...),
+# so a reloaded tab picks its jobs up again; finished ones move into the results.
 # -------------------------------
-teardown_a = None; raw_a = None
-teardown_b = None; raw_b = None
+pending_jobs = st.session_state["jobs"]
+
+def collect_jobs():
+    """Moves finished background jobs into the results; returns (any finished, {side: job} still pending)."""
+    states = job_queue.jobs(pending_jobs.values())
+    finished = False
+    for side, job_id in list(pending_jobs.items()):
+        job = states.get(job_id)
+        if job is not None and job["status"] not in FINISHED:
+            continue
+        pending_jobs.pop(side)
+        if job is not None and job["status"] == "done":
+            stored[side] = {"title": job["meta"]["title"], "product_text": job["params"]["product_text"], "teardown": job["result"],
+                            "inputs": job["meta"]["inputs"]}
+            finished = True
+        elif job is not None and job["status"] == "error":
+            st.error(f"Product {side}: background teardown failed: {job['error']}")
+    if pending_jobs:
+        st.query_params["jobs"] = ",".join(pending_jobs.values())
+    elif "jobs" in st.query_params:
+        del st.query_params["jobs"]
+    if finished and not pending_jobs and all(side in stored for side in products):
+        save_to_history({side: (stored[side]["title"], stored[side]["product_text"], stored[side]["teardown"]) for side in products})
+    return finished, {side: states[job_id] for side, job_id in pending_jobs.items()}
+
+def stale_products():
+    """{side: reasons} for the products Generate has to (re)make: inputs changed, never made, or the last attempt failed."""
+    stale = plan_regeneration({side: entry["inputs"] for side, entry in stored.items()}, current_inputs)
+    for side in stale:
+        if side in stored and stored[side]["inputs"] is None:
+            stale[side] = ["the last attempt failed"]
+    return stale
+
+_, running_jobs = collect_jobs()
+stale = stale_products()
 
 if run_button:
-    if not app_a.strip() or not app_b.strip():
-        st.error("Enter both Product A and Product B (name/URL/short description).")
+    missing = [side for side, (name, _) in products.items() if not name]
+    if missing:
+        st.error(f"Enter every product (name/URL/short description): {', '.join(missing)} missing.")
     else:
-        with st.spinner("Generating teardown for Product A..."):
-            product_text_a = app_a.strip() + ("\n\n" + explicit_a.strip() if explicit_a.strip() else "")
-            teardown_a, raw_a = generate_teardown(product_text_a, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature)
-        with st.spinner("Generating teardown for Product B..."):
-            product_text_b = app_b.strip() + ("\n\n" + explicit_b.strip() if explicit_b.strip() else "")
-            teardown_b, raw_b = generate_teardown(product_text_b, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature)
+        # a side whose job is already working on these exact inputs isn't submitted again
+        todo = {side: product for side, product in products.items()
+                if (bypass_cache or side in stale) and not (side in running_jobs and running_jobs[side]["meta"]["inputs"] == current_inputs[side])}
+        kept = [side for side in products if side not in todo]
+        st.session_state.pop("results_note", None)
+        if todo and background_mode and client is not None:
+            for side, (label, product_text) in todo.items():
+                if side in pending_jobs:
+                    job_queue.cancel(pending_jobs[side])  # superseded by the new inputs
+                pending_jobs[side] = job_queue.submit(
+                    {"product_text": product_text, "industry_key": industry, "depth": depth, "include_user_flow": include_user_flow,
+                     "include_metrics": include_metrics, "include_templates": include_templates, "model": model, "temperature": temperature,
+                     "structured": structured_mode, "mode": GENERATION_MODE_KEYS[generation_mode], "use_cache": not bypass_cache,
+                     "reuse_similar": reuse_similar},
+                    session=usage_session_id, meta={"side": side, "title": label, "inputs": current_inputs[side]},
+                )
+            st.query_params["jobs"] = ",".join(pending_jobs.values())
+            running_jobs = collect_jobs()[1]
+            st.info(f"Queued {', '.join(todo)} for background workers. Results appear below as they finish; you can close or reload this tab.")
+        elif todo:
+            offers = st.session_state.setdefault("offers", {})
+            for side in todo:
+                offers.pop(side, None)
+
+            def offer(side, matches):
+                offers[side] = {"matches": matches, "inputs": current_inputs[side]}
+
+            failed = set()
 
-        st.success("Teardowns generated (or demo outputs provided). Scroll to compare.")
+            def fail(side, exc):
+                failed.add(side)
+                show_llm_error(exc)
+
+            with usage_session(usage_session_id), span("ui.generate", parent=run_trace):
+                if concurrent_mode or stream_mode:
+                    results = generate_products(
+                        todo, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                        use_cache=not bypass_cache, max_workers=min(max_parallel, len(todo)) if concurrent_mode else 1, stream=stream_mode,
+                        structured=structured_mode, mode=GENERATION_MODE_KEYS[generation_mode],
+                        similar=similarity_index if reuse_similar else None, on_suggest=offer, on_error=fail
+                    )
+                else:
+                    results = {}
+                    for side, (label, product_text) in todo.items():
+                        with st.spinner(f"Generating teardown for Product {side}..."):
+                            results[side] = generate_teardown(product_text, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                                                              client=client, cache=teardown_cache, use_cache=not bypass_cache,
+                                                              on_error=lambda exc, side=side: fail(side, exc),
+                                                              structured=structured_mode, mode=GENERATION_MODE_KEYS[generation_mode],
+                                                              retry_policy=retry_policy,
+                                                              similar=similarity_index if reuse_similar else None,
+                                                              on_reuse=lambda match, side=side: st.info(f"Product {side}: {reuse_note(match)}"),
+                                                              on_suggest=lambda matches, side=side: offer(side, matches))
+            for side, (label, product_text) in todo.items():
+                td = results[side][0]
+                # a demo fallback or a failed call is not up to date: the next Generate tries that product again
+                done = side not in failed and td != demo_teardown(product_text, industry, include_user_flow)
+                stored[side] = {"title": label, "product_text": product_text, "teardown": td, "inputs": current_inputs[side] if done else None}
+            why = "; ".join(f"{side}: {', '.join(stale.get(side, ['cache bypassed']))}" for side in todo)
+            st.success(f"Teardowns generated (or demo outputs provided) for {why}"
+                       + (f"; kept {', '.join(kept)} (inputs unchanged)" if kept else "") + ". Scroll to compare.")
+            save_to_history({side: (stored[side]["title"], stored[side]["product_text"], stored[side]["teardown"]) for side in products})
+        elif running_jobs:
+            st.info(f"Already generating {', '.join(running_jobs)} in the background with these inputs.")
+        else:
+            st.success("Inputs unchanged since the last run: showing the existing teardowns (tick 'Bypass cache' to regenerate).")
+
+@st.fragment(run_every=2)
+def job_status():
+    """Polls the background jobs every 2 seconds; a finished job reruns the page to show its result."""
+    finished, running = collect_jobs()
+    if finished:
+        st.rerun()
+    for side, job in running.items():
+        since = job["started_at"] or job["created_at"]
+        st.info(f"⏳ Product {side} — {job['meta']['title']}: {job['status']} for {time.time() - since:.0f}s (background job)")
+
+if pending_jobs:
+    job_status()
 
 # -------------------------------
-# Display side-by-side comparison
+# Offers: a cached teardown of a product this one may abbreviate ("GPay" / "Google Pay")
+# is never reused silently ("GPay" could as well be "Gold Pay"); the user decides.
 # -------------------------------
-st.markdown("## Compare Teardowns")
-if teardown_a is None or teardown_b is None:
-    st.info("Click **Generate / Refresh Teardowns** to produce teardowns for both products. If OPENAI_API_KEY is missing you'll get demo outputs.")
-else:
-    # Two-column side-by-side panes
-    left, right = st.columns(2)
-    with left:
-        st.markdown(f"### Product A — **{app_a.strip()}**")
-        st.download_button("Download A (JSON)", data=json.dumps(teardown_a, indent=2, ensure_ascii=False), file_name=f"teardown_A_{app_a.strip().replace(' ','_')}.json", mime="application/json")
-        st.download_button("Download A (MD)", data=markdown_from_teardown(teardown_a, app_a.strip()), file_name=f"teardown_A_{app_a.strip().replace(' ','_')}.md", mime="text/markdown")
-        st.markdown("#### One-page summary")
-        st.write(teardown_a.get("one_pager") or "")
-        st.markdown("#### Strategy")
-        for s in teardown_a.get("strategy", []):
-            st.markdown(f"- {s}")
-        st.markdown("#### Growth Loops")
-        for g in teardown_a.get("growth_loops", teardown_a.get("growthLoops", [])):
-            st.markdown(f"- {g}")
-        st.markdown("#### Key KPIs")
-        st.json(teardown_a.get("kpis", {}))
-
-    with right:
-        st.markdown(f"### Product B — **{app_b.strip()}**")
-        st.download_button("Download B (JSON)", data=json.dumps(teardown_b, indent=2, ensure_ascii=False), file_name=f"teardown_B_{app_b.strip().replace(' ','_')}.json", mime="application/json")
-        st.download_button("Download B (MD)", data=markdown_from_teardown(teardown_b, app_b.strip()), file_name=f"teardown_B_{app_b.strip().replace(' ','_')}.md", mime="text/markdown")
-        st.markdown("#### One-page summary")
-        st.write(teardown_b.get("one_pager") or "")
-        st.markdown("#### Strategy")
-        for s in teardown_b.get("strategy", []):
-            st.markdown(f"- {s}")
-        st.markdown("#### Growth Loops")
-        for g in teardown_b.get("growth_loops", teardown_b.get("growthLoops", [])):
-            st.markdown(f"- {g}")
-        st.markdown("#### Key KPIs")
-        st.json(teardown_b.get("kpis", {}))
-
-    # Comparison highlights: simple diff-like comparison for top items
+for side, pending_offer in list(st.session_state.get("offers", {}).items()):
+    if side not in products or side not in stored or current_inputs[side] != pending_offer["inputs"]:
+        st.session_state["offers"].pop(side)
+        continue
+    for match in pending_offer["matches"]:
+        text_col, button_col = st.columns([4, 1])
+        text_col.info(f"Product {side} ({stored[side]['title']}) may be the same product as the cached '{match['product']}' teardown.")
+        if button_col.button(f"Use '{match['product']}'", key=f"offer_{side}_{match['key']}"):
+            hit = teardown_cache.get(match["key"])
+            if hit is not None:
+                stored[side]["teardown"] = hit[0]
+                stored[side]["inputs"] = pending_offer["inputs"]
+            st.session_state["offers"].pop(side)
+            st.rerun()
+    if st.button(f"Keep the fresh teardown for {side}", key=f"offer_{side}_dismiss"):
+        st.session_state["offers"].pop(side)
+        st.rerun()
+
+# -------------------------------
+# Display: side-by-side panes, then pair highlights (2 products) or a comparison matrix (3+)
+# -------------------------------
+def render_product_pane(side, title, td, json_text, md_text):
+    st.markdown(f"### Product {side} — **{title}**")
+    st.download_button(f"Download {side} (JSON)", data=json_text, file_name=f"teardown_{side}_{title.replace(' ','_')}.json", mime="application/json")
+    st.download_button(f"Download {side} (MD)", data=md_text, file_name=f"teardown_{side}_{title.replace(' ','_')}.md", mime="text/markdown")
+    st.markdown("#### One-page summary")
+    st.write(td.get("one_pager") or "")
+    st.markdown("#### Strategy")
+    for s in td.get("strategy", []):
+        st.markdown(f"- {s}")
+    st.markdown("#### Growth Loops")
+    for g in td.get("growth_loops", td.get("growthLoops", [])):
+        st.markdown(f"- {g}")
+    st.markdown("#### Key KPIs")
+    st.json(td.get("kpis", {}))
+
+def swot_items(td, quadrant):
+    return (td.get("swot") or {}).get(quadrant, []) if isinstance(td.get("swot"), dict) else []
+
+def column_rows(columns, limit=None):
+    """{column: [items]} -> table rows, one item per column per row (shorter columns padded)."""
+    longest = max((len(items) for items in columns.values()), default=0)
+    if limit is not None:
+        longest = min(longest, limit)
+    return [{name: items[i] if i < len(items) else "" for name, items in columns.items()} for i in range(longest)]
+
+def render_pair_highlights(title_a, teardown_a, title_b, teardown_b):
     st.markdown("---")
     st.header("Quick Comparison Highlights")
     comp_cols = st.columns(3)
-    # North-star comparison
-    try:
-        ns_a = teardown_a.get("kpis", {}).get("north_star", "—")
-        ns_b = teardown_b.get("kpis", {}).get("north_star", "—")
-    except Exception:
-        ns_a = ns_b = "—"
-    comp_cols[0].metric("North-star (A)", ns_a, delta=None)
-    comp_cols[1].metric("North-star (B)", ns_b, delta=None)
+    comp_cols[0].metric("North-star (A)", north_star(teardown_a), delta=None)
+    comp_cols[1].metric("North-star (B)", north_star(teardown_b), delta=None)
     # Strategy length (proxy)
     comp_cols[2].write("Strategy breadth")
     comp_cols[2].write(f"A: {len(teardown_a.get('strategy',[]))} items  |  B: {len(teardown_b.get('strategy',[]))} items")
 
     # Side-by-side table for SWOT strengths
     st.markdown("### SWOT — Strengths (side-by-side)")
-    strengths_a = teardown_a.get("swot", {}).get("strengths", []) if teardown_a.get("swot") else []
-    strengths_b = teardown_b.get("swot", {}).get("strengths", []) if teardown_b.get("swot") else []
-    maxlen = max(len(strengths_a), len(strengths_b))
-    rows = []
-    for i in range(maxlen):
-        a = strengths_a[i] if i < len(strengths_a) else ""
-        b = strengths_b[i] if i < len(strengths_b) else ""
-        rows.append({"A": a, "B": b})
-    st.table(rows)
+    st.table(column_rows({"A": swot_items(teardown_a, "strengths"), "B": swot_items(teardown_b, "strengths")}))
 
     # Opportunity differences
     st.markdown("### Opportunity Ideas (A vs B)")
-    opp_a = teardown_a.get("opportunities", [])
-    opp_b = teardown_b.get("opportunities", [])
     left_o, right_o = st.columns(2)
     with left_o:
-        st.subheader(f"A — {app_a.strip()}")
-        for i, o in enumerate(opp_a[:8]):
+        st.subheader(f"A — {title_a}")
+        for i, o in enumerate(teardown_a.get("opportunities", [])[:8]):
             st.markdown(f"{i+1}. {o}")
     with right_o:
-        st.subheader(f"B — {app_b.strip()}")
-        for i, o in enumerate(opp_b[:8]):
+        st.subheader(f"B — {title_b}")
+        for i, o in enumerate(teardown_b.get("opportunities", [])[:8]):
             st.markdown(f"{i+1}. {o}")
 
+def render_matrix(teardowns):
+    st.markdown("---")
+    st.header("Comparison Matrix")
+    names = {side: f"{side} — {title}" for side, (title, _) in teardowns.items()}
+    st.table([{key.replace("_", " "): value for key, value in row.items()}
+              for row in comparison_rows({names[side]: td for side, (_, td) in teardowns.items()})])
+
+    st.markdown("### SWOT matrix")
+    for tab, quadrant in zip(st.tabs(["Strengths", "Weaknesses", "Opportunities", "Threats"]), ["strengths", "weaknesses", "opportunities", "threats"]):
+        with tab:
+            rows = column_rows({names[side]: swot_items(td, quadrant) for side, (_, td) in teardowns.items()})
+            if rows:
+                st.table(rows)
+            else:
+                st.caption("No items.")
+
+    st.markdown("### Opportunity Ideas")
+    st.table(column_rows({names[side]: td.get("opportunities", []) for side, (_, td) in teardowns.items()}, limit=8))
+
+st.markdown("## Compare Teardowns")
+teardowns = {side: (stored[side]["title"], stored[side]["teardown"]) for side in products if side in stored}
+stale = {side: reasons for side, reasons in stale_products().items() if side in teardowns and side not in pending_jobs}
+if st.session_state.get("results_note"):
+    st.info(st.session_state["results_note"])
+if len(teardowns) < len(products) or any(td is None for _, td in teardowns.values()):
+    st.info("Click **Generate / Refresh Teardowns** to produce teardowns for every product. If OPENAI_API_KEY is missing you'll get demo outputs.")
+else:
+    if stale:
+        st.warning("Some teardowns are out of date (inputs changed or the last attempt failed); Generate refreshes only these products:\n"
+                   + "\n".join(f"- **{side}**: {', '.join(reasons)}" for side, reasons in stale.items()))
+    with span("ui.display", parent=run_trace):
+        with span("download.serialize"):
+            exports = {side: (json.dumps(td, indent=2, ensure_ascii=False), markdown_from_teardown(td, title))
+                       for side, (title, td) in teardowns.items()}
+        # Side-by-side panes (rows of up to four)
+        for cell, (side, (title, td)) in zip(grid(len(teardowns)), teardowns.items()):
+            with cell:
+                render_product_pane(side, title, td, *exports[side])
+
+        if len(teardowns) == 2:
+            (title_a, teardown_a), (title_b, teardown_b) = teardowns.values()
+            render_pair_highlights(title_a, teardown_a, title_b, teardown_b)
+        else:
+            render_matrix(teardowns)
+
 # -------------------------------
-# Utilities: markdown generator
+# Usage panel (filled in last so this run's calls are counted)
 # -------------------------------
-def markdown_from_teardown(td, title):
-    md = [f"# Product Teardown — {title}\n"]
-    md.append("## One-pager\n")
-    md.append(td.get("one_pager","") + "\n\n")
-    md.append("## Strategy\n")
-    for s in td.get("strategy",[]):
-        md.append(f"- {s}\n")
-    md.append("\n## Growth Loops\n")
-    for g in td.get("growth_loops", td.get("growthLoops", [])):
-        md.append(f"- {g}\n")
-    md.append("\n## Engagement Mechanics\n")
-    for e in td.get("engagement_mechanics", td.get("engagement", [])):
-        md.append(f"- {e}\n")
-    md.append("\n## KPIs\n")
-    md.append("```json\n")
-    md.append(json.dumps(td.get("kpis",{}), indent=2, ensure_ascii=False))
-    md.append("\n```\n")
-    md.append("\n## UX Tear-down\n")
-    for u in td.get("ux_teardown", td.get("ux", [])):
-        md.append(f"- {u}\n")
-    md.append("\n## SWOT\n")
-    md.append("```json\n")
-    md.append(json.dumps(td.get("swot",{}), indent=2, ensure_ascii=False))
-    md.append("\n```\n")
-    md.append("\n## Opportunities\n")
-    for o in td.get("opportunities",[]):
-        md.append(f"- {o}\n")
-    return "\n".join(md)
+render_usage(with_export=True)
+tracer.end(run_trace)
+render_timings()
+render_providers()
 
 # -------------------------------
 # Examples / Quick demo
 # -------------------------------
 st.markdown("---")
 st.markdown("#### Tip & Examples")
-st.markdown("Try examples: `Google Pay` vs `PhonePe`, `Duolingo` vs `Babbel`, `Notion` vs `Coda`.")
+st.markdown("Try examples: `Google Pay` vs `PhonePe`, `Duolingo` vs `Babbel`, `Notion` vs `Coda`, or set **Products to compare** to 4+ for a whole category (UPI apps, food delivery).")
 st.caption("For best results paste a short list of product features or the app's one-line positioning into the description fields.")
 
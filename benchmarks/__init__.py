@@ -0,0 +1 @@
+"""Offline benchmarks: a stub OpenAI-compatible server and an end-to-end harness (python -m benchmarks.bench)."""
@@ -0,0 +1,274 @@
+# benchmarks/bench.py
+"""
+Offline end-to-end benchmarks against the stub LLM server (no network, no API key).
+
+    python -m benchmarks.bench
+    python -m benchmarks.bench --requests 200 --concurrency 16 --error-rate 0.05 --malformed-rate 0.1
+    python -m benchmarks.bench --save bench.json           # record a baseline
+    python -m benchmarks.bench --baseline bench.json       # exit 1 on regression
+
+Scenarios:
+- extract_json: parse a corpus of stub responses (clean and corrupted)
+- extract_json_large: multi-megabyte responses (raw, fenced with prose, several
+  fences, unclosed fences, trailing commas, truncated); see --large-mb
+- markdown: markdown_from_teardown on generated teardowns
+- call_llm: raw chat-completion round trips
+- generate_single / generate_stream / generate_sections: generate_teardown end to end
+
+Each reports throughput, p50/p95/p99 latency, the parse success rate (of the
+calls that returned) and the error rate (calls that raised, e.g. an LLM call
+that failed for good). The run exits 2 with the first error when an LLM
+scenario never reached the stub or every call in a scenario failed.
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_server import StubLLMServer, corrupt, fake_value
+from teardown.generate import generate_teardown
+from teardown.llm import LLMCallError, call_llm, make_client
+from teardown.parsing import JSON_BACKEND, extract_json
+from teardown.render import markdown_from_teardown
+from teardown.retry import RetryPolicy
+from teardown.schema import TEARDOWN_SCHEMA, invalid_sections
+
+SCENARIOS = ["extract_json", "extract_json_large", "markdown", "call_llm", "generate_single", "generate_stream", "generate_sections"]
+OFFLINE = ("extract_json", "extract_json_large", "markdown")
+
+# metrics compared against a --baseline and the direction that counts as a regression
+GATED = {"p95_ms": "up", "throughput": "down", "parse_success": "down", "error_rate": "up"}
+# parse success and error rate are rates, so they get an absolute allowance instead of --tolerance
+RATE_SLACK = 0.05
+RATES = ("parse_success", "error_rate")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(name, latencies, successes, errors, wall):
+    n = len(latencies)
+    returned = n - len(errors)
+    return {
+        "scenario": name,
+        "n": n,
+        "throughput": n / wall if wall > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "parse_success": successes / returned if returned else 0.0,
+        "error_rate": len(errors) / n if n else 0.0,
+        "errors": len(errors),
+        "first_error": f"{type(errors[0]).__name__}: {errors[0]}" if errors else None,
+    }
+
+
+def run_timed(fn, inputs, concurrency=1):
+    """
+    Runs fn(item) -> bool over inputs; returns (latencies, successes, errors, wall seconds).
+    An exception from fn counts as an error (kept in `errors`), not as a parse failure.
+    """
+    def one(item):
+        started = time.perf_counter()
+        try:
+            ok, error = bool(fn(item)), None
+        except Exception as e:
+            ok, error = False, e
+        return time.perf_counter() - started, ok, error
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        results = [one(item) for item in inputs]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, inputs))
+    wall = time.perf_counter() - started
+    return [r[0] for r in results], sum(1 for r in results if r[1]), [r[2] for r in results if r[2] is not None], wall
+
+
+def response_corpus(n, malformed_rate, seed):
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        content = json.dumps(fake_value(TEARDOWN_SCHEMA, rng))
+        if rng.random() < 0.2:
+            content = "```json\n" + content + "\n```"
+        if rng.random() < malformed_rate:
+            content = corrupt(content, rng)
+        corpus.append(content)
+    return corpus
+
+
+def large_corpus(megabytes, seed):
+    """Deep-mode-sized responses in the shapes that used to make extract_json backtrack or re-parse."""
+    rng = random.Random(seed)
+    doc, body = {"sections": []}, "{}"
+    while len(body) < megabytes * 1_000_000:
+        doc["sections"].extend(fake_value(TEARDOWN_SCHEMA, rng, items=20, words=30) for _ in range(20))
+        body = json.dumps(doc)
+    fenced = "```json\n" + body + "\n```"
+    return [
+        body,
+        "Here is the full analysis you asked for.\n\n" + fenced + "\n\nAnd a short summary:\n```json\n{\"ok\": true}\n```",
+        (fenced + "\n") * 2,
+        '```json {"a": 1}. ' * (len(body) // 20),
+        body[:-2] + ",]}",
+        "Partial: " + body[: len(body) // 2],
+    ]
+
+
+def bench_offline(name, args):
+    if name == "extract_json_large":
+        # the truncated sample is expected to fail; parse_success is 5/6 when everything else parses
+        return run_timed(lambda text: isinstance(extract_json(text), dict), large_corpus(args.large_mb, args.seed) * 3)
+    corpus = response_corpus(args.requests * 5, args.malformed_rate, args.seed)
+    if name == "extract_json":
+        return run_timed(lambda text: isinstance(extract_json(text), dict), corpus)
+    teardowns = [fake_value(TEARDOWN_SCHEMA, random.Random(i)) for i in range(args.requests * 5)]
+    return run_timed(lambda td: markdown_from_teardown(td, "Bench product"), teardowns)
+
+
+def bench_llm(name, args, client, policy):
+    common = dict(model=args.model, temperature=0.2)
+
+    def llm_call(i):
+        raw = call_llm(client, f"Bench product {i}: return a teardown as JSON.", policy=policy, **common)
+        return isinstance(extract_json(raw), dict)
+
+    def raise_call_errors(exc):
+        # schema problems are parse failures; a call that failed for good is an error
+        if isinstance(exc, LLMCallError):
+            raise exc
+
+    def teardown(i, **kwargs):
+        # distinct product texts so single-flight doesn't coalesce the requests
+        td, _ = generate_teardown(f"Bench product {i}", "General / Consumer", "Standard (detailed)", True, True, True,
+                                  client=client, structured=not args.no_structured, fallback=False,
+                                  on_error=raise_call_errors, retry_policy=policy, **dict(common, **kwargs))
+        return bool(td) and not invalid_sections(td)
+
+    fns = {
+        "call_llm": llm_call,
+        "generate_single": teardown,
+        "generate_stream": lambda i: teardown(i, on_section=lambda key, value: None),
+        "generate_sections": lambda i: teardown(i, mode="sections"),
+    }
+    return run_timed(fns[name], range(args.requests), args.concurrency)
+
+
+def compare(results, baseline, tolerance):
+    """Regressions beyond `tolerance` (a fraction) versus a saved run, as readable strings."""
+    previous = {r["scenario"]: r for r in baseline.get("results", [])}
+    problems = []
+    for row in results:
+        old = previous.get(row["scenario"])
+        if old is None:
+            continue
+        for metric, bad in GATED.items():
+            before, now = old.get(metric, 0.0), row[metric]
+            if metric in RATES:
+                worse = now > before + RATE_SLACK if bad == "up" else now < before - RATE_SLACK
+            elif bad == "up":
+                worse = before > 0 and now > before * (1 + tolerance)
+            else:
+                worse = before > 0 and now < before * (1 - tolerance)
+            if worse:
+                problems.append(f"{row['scenario']}.{metric}: {before:.3f} -> {now:.3f}")
+    return problems
+
+
+def print_table(results, out=sys.stdout):
+    header = f"{'scenario':<18}{'n':>6}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'parse ok':>10}{'errors':>8}"
+    print(header, file=out)
+    print("-" * len(header), file=out)
+    for r in results:
+        print(f"{r['scenario']:<18}{r['n']:>6}{r['throughput']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['parse_success']:>10.1%}{r['errors']:>8}", file=out)
+
+
+def broken_scenarios(results, stub_requests):
+    """Reasons the run can't be trusted: LLM scenarios that never reached the stub, or where every call failed."""
+    problems = []
+    llm = [r for r in results if r["scenario"] not in OFFLINE]
+    if llm and not stub_requests:
+        problems.append("the stub server received no requests")
+    for r in results:
+        if r["n"] and r["errors"] == r["n"]:
+            problems.append(f"{r['scenario']}: all {r['n']} calls failed, first error: {r['first_error']}")
+    return problems
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline teardown benchmarks against a stub LLM server.")
+    parser.add_argument("--scenarios", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--requests", type=int, default=40, help="LLM requests per scenario (offline scenarios use 5x)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--large-mb", type=float, default=4.0, help="response size for extract_json_large")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--tokens-per-second", type=float, default=2000.0, help="stub generation speed; 0 = instant")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of stub requests failing with 429/500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="share of stub responses with broken JSON")
+    parser.add_argument("--tries", type=int, default=3, help="attempts per LLM call")
+    parser.add_argument("--no-structured", action="store_true", help="don't request JSON-schema output")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", default=None, help="write results as JSON (a baseline for --baseline)")
+    parser.add_argument("--baseline", default=None, help="compare with a saved run; exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown vs --baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+    policy = RetryPolicy(max_attempts=args.tries, base_delay=0.02, max_delay=0.5)
+    results = []
+    with StubLLMServer(latency=args.latency, jitter=args.jitter, tokens_per_second=args.tokens_per_second,
+                       error_rate=args.error_rate, malformed_rate=args.malformed_rate, seed=args.seed) as server:
+        client = make_client("stub-key", max_connections=args.concurrency, max_keepalive_connections=args.concurrency,
+                             base_url=server.base_url)
+        for name in args.scenarios:
+            if name in OFFLINE:
+                latencies, successes, errors, wall = bench_offline(name, args)
+            else:
+                latencies, successes, errors, wall = bench_llm(name, args, client, policy)
+            results.append(summarize(name, latencies, successes, errors, wall))
+        stub_stats = dict(server.stats)
+
+    print_table(results)
+    print(f"\nJSON backend: {JSON_BACKEND}")
+    print(f"stub: {stub_stats['requests']} requests, {stub_stats['errors']} injected errors, "
+          f"{stub_stats['malformed']} malformed responses")
+    for r in results:
+        if r["errors"]:
+            print(f"{r['scenario']}: {r['errors']} errors, first: {r['first_error']}")
+    broken = broken_scenarios(results, stub_stats["requests"])
+    if broken:
+        print("\nbenchmark run is broken:\n  " + "\n  ".join(broken))
+        return 2
+    run = {"config": {k: v for k, v in vars(args).items() if k not in ("save", "baseline")}, "results": results}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(run, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        if problems:
+            print("\nregressions vs baseline:\n  " + "\n  ".join(problems))
+            return 1
+        print("\nno regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
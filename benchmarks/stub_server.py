@@ -0,0 +1,212 @@
+# benchmarks/stub_server.py
+"""
+A local fake of the OpenAI chat-completions endpoint for offline benchmarks.
+
+    python -m benchmarks.stub_server --port 8765 --latency 0.3 --error-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+
+Answers POST /v1/chat/completions (blocking and `stream=True` SSE) with a
+teardown generated from the requested JSON schema (or the full TEARDOWN_SCHEMA),
+so responses always have the right shape unless corruption is injected.
+
+Knobs:
+- latency / jitter: seconds before the first byte (time to first token)
+- tokens_per_second: generation speed (~4 characters per token); 0 = instant
+- error_rate: share of requests answered with 429 (with retry-after-ms) or 500
+- malformed_rate: share of responses whose JSON is truncated, wrapped in prose
+  or given a trailing comma
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from teardown.schema import TEARDOWN_SCHEMA
+
+WORDS = ("activation retention referral merchant onboarding cohort pricing wallet checkout cashback "
+         "latency trust habit loop funnel upsell partner growth network density").split()
+
+
+def fake_value(schema, rng, items=5, words=12):
+    """A random value matching a (strict) JSON schema as used in teardown.schema."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {key: fake_value(sub, rng, items, words) for key, sub in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_value(schema.get("items", {"type": "string"}), rng, items, words) for _ in range(items)]
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def corrupt(content, rng):
+    """One of the ways real model output breaks JSON parsing."""
+    how = rng.choice(("truncate", "prose", "trailing_comma"))
+    if how == "truncate":
+        return content[: rng.randint(len(content) // 3, len(content) - 2)]
+    if how == "prose":
+        return "Sure! Here is the teardown you asked for:\n\n" + content + "\n\nLet me know if you want more detail."
+    return content[:-1] + ",}"
+
+
+class StubLLMServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.05, tokens_per_second=400.0,
+                 error_rate=0.0, malformed_rate=0.0, items=5, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.items = items
+        self.rng = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serves in the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _plan(self, body):
+        """Decides (under the lock, so runs are reproducible per seed) how to answer one request."""
+        with self._lock:
+            self.stats["requests"] += 1
+            if self.rng.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return {"error": self.rng.choice((429, 500))}
+            schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema") or TEARDOWN_SCHEMA
+            content = json.dumps(fake_value(schema, self.rng, self.items), ensure_ascii=False)
+            if self.rng.random() < self.malformed_rate:
+                self.stats["malformed"] += 1
+                content = corrupt(content, self.rng)
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        return {"content": content, "delay": delay}
+
+    def _usage(self, body, content):
+        messages = body.get("messages") or []
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4
+        # mimic provider prefix caching: the system message is cached in 128-token blocks past 1024
+        system = sum(len(str(m.get("content", ""))) for m in messages if m.get("role") == "system") // 4
+        cached = (system // 128) * 128 if system >= 1024 else 0
+        completion_tokens = max(1, len(content) // 4)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens, "prompt_tokens_details": {"cached_tokens": cached}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("content-length") or 0)) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                    return
+                plan = server._plan(body)
+                if "error" in plan:
+                    status = plan["error"]
+                    headers = {"retry-after-ms": "20"} if status == 429 else None
+                    self._send_json(status, {"error": {"message": "injected failure", "type": "stub"}}, headers)
+                    return
+                time.sleep(plan["delay"])
+                content, model = plan["content"], body.get("model", "stub")
+                usage = server._usage(body, content)
+                if body.get("stream"):
+                    self._stream(content, model, usage, (body.get("stream_options") or {}).get("include_usage"))
+                    return
+                if server.tokens_per_second:
+                    time.sleep(usage["completion_tokens"] / server.tokens_per_second)
+                self._send_json(200, {
+                    "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()), "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                })
+
+            def _stream(self, content, model, usage, include_usage):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                step = 16  # ~4 tokens per chunk
+                pause = (step / 4) / server.tokens_per_second if server.tokens_per_second else 0
+
+                def send(chunk):
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+                for i in range(0, len(content), step):
+                    send(dict(base, choices=[{"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}]))
+                    if pause:
+                        time.sleep(pause)
+                send(dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+                if include_usage:
+                    send(dict(base, choices=[], usage=usage))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat-completions server for offline runs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to first token")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=400.0, help="0 = instant")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    server = StubLLMServer(args.host, args.port, args.latency, args.jitter, args.tokens_per_second,
+                           args.error_rate, args.malformed_rate, seed=args.seed)
+    print(f"stub LLM server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Reusable building blocks for the AI Product Teardown Engine.
+
+Nothing in this package imports Streamlit, and `openai` is only imported when a
+client is built, so batch workers, tests and benchmarks start quickly.
+"""
+from teardown.generate import demo_teardown, generate_teardown
+from teardown.llm import LLMCallError, call_llm, make_client, stream_llm
+from teardown.parsing import extract_json
+from teardown.prompts import DEPTH_LEVELS, INDUSTRY_TEMPLATES, build_teardown_messages, build_teardown_prompt
+from teardown.render import markdown_from_teardown
+
+__all__ = [
+    "DEPTH_LEVELS",
+    "INDUSTRY_TEMPLATES",
+    "LLMCallError",
+    "build_teardown_messages",
+    "build_teardown_prompt",
+    "call_llm",
+    "demo_teardown",
+    "extract_json",
+    "generate_teardown",
+    "make_client",
+    "markdown_from_teardown",
+    "stream_llm",
+]
@@ -0,0 +1,252 @@
+# teardown/batch.py
+"""
+Headless batch teardowns over a CSV of product pairs (no Streamlit).
+
+    python -m teardown.batch pairs.csv --out runs/upi-sweep --concurrency 8
+
+CSV columns: product_a, product_b and optionally features_a, features_b,
+industry, depth (per-row values override the command-line defaults).
+
+Every pair writes A.json, A.md, B.json, B.md into its own folder and appends
+a line (with that pair's tokens and estimated cost) to <out>/progress.jsonl;
+every LLM call is logged to <out>/usage.jsonl. Re-running the same command skips pairs that
+already completed, so an interrupted overnight sweep resumes where it stopped.
+Failed pairs are recorded and retried on the next run, and so are completed
+pairs whose inputs (features, industry, depth, model, ...) changed since.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from teardown.cache import TeardownCache
+from teardown.fingerprint import changed_inputs, product_inputs
+from teardown.generate import GENERATION_MODES, TeardownParseError, generate_teardown, raise_error
+from teardown.history import TeardownHistory
+from teardown.prompts import DEPTH_LEVELS, INDUSTRY_TEMPLATES
+from teardown.providers import client_from_env
+from teardown.ratelimit import DEFAULT_LIMITS, FALLBACK_LIMITS
+from teardown.ratelimit import configure as configure_rate_limiter
+from teardown.retry import RetryPolicy
+from teardown.render import markdown_from_teardown
+from teardown.similar import SimilarityIndex
+from teardown.tracing import configure as configure_tracing
+from teardown.usage import tracker as usage_tracker, usage_session
+
+logger = logging.getLogger("teardown.batch")
+
+PROGRESS_FILE = "progress.jsonl"
+USAGE_FILE = "usage.jsonl"
+
+
+def slugify(text, limit=40):
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:limit] or "product"
+
+
+def read_pairs(csv_path):
+    """Returns a list of dicts with a stable pair_id derived from row order and names."""
+    pairs = []
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for i, row in enumerate(csv.DictReader(f), start=1):
+            a = (row.get("product_a") or "").strip()
+            b = (row.get("product_b") or "").strip()
+            if not a or not b:
+                logger.warning("row %d: missing product_a/product_b, skipped", i)
+                continue
+            row = {k: (v or "").strip() for k, v in row.items() if k}
+            row["pair_id"] = f"{i:05d}_{slugify(a)}_vs_{slugify(b)}"
+            pairs.append(row)
+    return pairs
+
+
+def load_completed(out_dir):
+    """{pair_id: progress entry} of the pairs whose last recorded run succeeded."""
+    completed = {}
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return completed
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # a torn last line from an interrupted run
+                continue
+            if entry.get("status") == "ok":
+                completed[entry["pair_id"]] = entry
+            else:
+                completed.pop(entry["pair_id"], None)
+    return completed
+
+
+def pair_inputs(pair, args):
+    """{"A": inputs, "B": inputs} as tracked by teardown.fingerprint."""
+    industry = pair.get("industry") or args.industry
+    depth = pair.get("depth") or args.depth
+    return {side.upper(): product_inputs(pair[f"product_{side}"], pair.get(f"features_{side}"), industry, depth,
+                                         args.include_user_flow, args.include_metrics, args.include_templates, args.model, args.temperature,
+                                         structured=args.structured, mode=args.mode)
+            for side in ("a", "b")}
+
+
+def stale_sides(pair, entry, args):
+    """
+    {side: reasons} for the sides of a completed pair whose inputs changed since it ran
+    ({} if none did); entries from before input tracking count as current.
+    """
+    if "inputs" not in entry:
+        return {}
+    current = pair_inputs(pair, args)
+    stale = {side: changed_inputs(entry["inputs"].get(side), current[side]) for side in current}
+    return {side: reasons for side, reasons in stale.items() if reasons}
+
+
+def product_text(name, features):
+    return name + ("\n\n" + features if features else "")
+
+
+def run_product(client, cache, text, industry, depth, args, similar=None):
+    td, _ = generate_teardown(text, industry, depth, args.include_user_flow, args.include_metrics, args.include_templates, args.model, args.temperature,
+                              client=client, cache=cache, use_cache=not args.refresh, on_error=raise_error, fallback=False, tries=args.tries,
+                              structured=args.structured, mode=args.mode,
+                              retry_policy=RetryPolicy(max_attempts=args.tries, deadline=args.deadline), similar=similar,
+                              on_reuse=lambda match: logger.info("%r: reused cached teardown of %r (%.0f%% match)",
+                                                                 text.split("\n")[0], match["product"], match["score"] * 100),
+                              on_suggest=lambda matches: logger.info("%r: generated fresh; cached teardowns it may abbreviate (or be abbreviated by): %s",
+                                                                     text.split("\n")[0], ", ".join(repr(m["product"]) for m in matches)))
+    if td is None:
+        raise TeardownParseError()
+    return td
+
+
+def run_pair(client, cache, pair, args, history=None, similar=None, keep=()):
+    """Writes both sides of a pair; sides listed in `keep` ("A", "B") reuse their JSON from a previous run when present."""
+    industry = pair.get("industry") or args.industry
+    depth = pair.get("depth") or args.depth
+    pair_dir = os.path.join(args.out, pair["pair_id"])
+    os.makedirs(pair_dir, exist_ok=True)
+    started = time.time()
+    # usage of every call for this pair is tallied under its pair_id
+    entries = []
+    with usage_session(pair["pair_id"]):
+        for side in ("a", "b"):
+            name = pair[f"product_{side}"]
+            text = product_text(name, pair.get(f"features_{side}"))
+            label = side.upper()
+            previous = os.path.join(pair_dir, f"{label}.json")
+            if label in keep and os.path.exists(previous):
+                with open(previous, encoding="utf-8") as f:
+                    td = json.load(f)
+            else:
+                td = run_product(client, cache, text, industry, depth, args, similar)
+            entries.append({"side": label, "product": name, "product_text": text, "teardown": td})
+            with open(os.path.join(pair_dir, f"{label}.json"), "w", encoding="utf-8") as f:
+                json.dump(td, f, indent=2, ensure_ascii=False)
+            with open(os.path.join(pair_dir, f"{label}.md"), "w", encoding="utf-8") as f:
+                f.write(markdown_from_teardown(td, name))
+    if history is not None:
+        history.record_run(entries, industry, depth, args.model, args.temperature, mode=args.mode)
+    return time.time() - started
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run product teardowns for every pair in a CSV.")
+    parser.add_argument("csv", help="CSV with product_a, product_b [, features_a, features_b, industry, depth]")
+    parser.add_argument("--out", default="teardown_runs", help="output directory (also holds progress.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=4, help="pairs processed in parallel")
+    parser.add_argument("--industry", default="General / Consumer", choices=list(INDUSTRY_TEMPLATES))
+    parser.add_argument("--depth", default="Standard (detailed)", choices=DEPTH_LEVELS)
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--temperature", type=float, default=0.2)
+    parser.add_argument("--tries", type=int, default=3, help="attempts per LLM call (rate limits, timeouts and 5xx only)")
+    parser.add_argument("--deadline", type=float, default=None, help="seconds one LLM call may take, retries included")
+    parser.add_argument("--mode", default="single", choices=GENERATION_MODES, help="'sections' fans out one call per section")
+    parser.add_argument("--rpm", type=int, default=None, help="requests/minute budget for --model (default: built-in per-model limit)")
+    parser.add_argument("--tpm", type=int, default=None, help="tokens/minute budget for --model")
+    parser.add_argument("--rate-state", default=None, help="JSON file shared with other processes (e.g. the Streamlit app) so they draw from one budget")
+    parser.add_argument("--trace", default=None, help="append stage timing spans to this OTLP/JSON lines file")
+    parser.add_argument("--no-structured", dest="structured", action="store_false", help="don't request JSON-schema structured output")
+    parser.add_argument("--providers", default=None, help="JSON list of LLM providers to route between (see teardown/providers.py); default: OpenAI via OPENAI_API_KEY")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="don't read or write the shared teardown cache")
+    parser.add_argument("--no-history", dest="history", action="store_false", help="don't save runs to the searchable teardown history")
+    parser.add_argument("--no-similar", dest="similar", action="store_false", help="don't reuse cached teardowns of near-duplicate product names")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached teardowns but store the fresh ones")
+    parser.add_argument("--no-user-flow", dest="include_user_flow", action="store_false")
+    parser.add_argument("--no-metrics", dest="include_metrics", action="store_false")
+    parser.add_argument("--no-templates", dest="include_templates", action="store_false")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # one shared client; the pool is sized so every worker keeps a warm connection
+    workers = max(1, args.concurrency)
+    client = client_from_env(args.providers, max_connections=workers, max_keepalive_connections=workers)
+    if client is None:
+        logger.error("OPENAI_API_KEY is not set (or pass --providers)")
+        return 2
+    cache = TeardownCache() if args.cache else None
+    history = TeardownHistory() if args.history else None
+    similar = SimilarityIndex() if args.cache and args.similar else None
+    limits = dict(DEFAULT_LIMITS.get(args.model, FALLBACK_LIMITS))
+    limits.update({k: v for k, v in (("rpm", args.rpm), ("tpm", args.tpm)) if v})
+    configure_rate_limiter({args.model: limits}, state_path=args.rate_state)
+
+    os.makedirs(args.out, exist_ok=True)
+    usage_tracker.configure(os.path.join(args.out, USAGE_FILE))
+    configure_tracing(args.trace)
+    pairs = read_pairs(args.csv)
+    completed = load_completed(args.out)
+    todo, keep = [], {}
+    for pair in pairs:
+        entry = completed.get(pair["pair_id"])
+        if entry is None:
+            todo.append(pair)
+            continue
+        stale = stale_sides(pair, entry, args)
+        if stale:
+            logger.info("%s: inputs changed (%s), regenerating %s", pair["pair_id"],
+                        "; ".join(f"{side}: {', '.join(reasons)}" for side, reasons in stale.items()), " and ".join(stale))
+            todo.append(pair)
+            keep[pair["pair_id"]] = [side for side in ("A", "B") if side not in stale]
+    logger.info("%d pairs in CSV, %d already done, %d to run", len(pairs), len(pairs) - len(todo), len(todo))
+
+    failures = 0
+    # progress lines are written only from this thread, so no locking is needed
+    with open(os.path.join(args.out, PROGRESS_FILE), "a", encoding="utf-8") as progress, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_pair, client, cache, pair, args, history, similar, keep.get(pair["pair_id"], ())): pair for pair in todo}
+        for done, fut in enumerate(as_completed(futures), start=1):
+            pair = futures[fut]
+            usage = usage_tracker.session_summary(pair["pair_id"])
+            entry = {"pair_id": pair["pair_id"], "product_a": pair["product_a"], "product_b": pair["product_b"], "finished_at": time.time(),
+                     "inputs": pair_inputs(pair, args),
+                     "llm_calls": usage["calls"], "prompt_tokens": usage["prompt_tokens"], "completion_tokens": usage["completion_tokens"],
+                     "cost_usd": round(usage["cost_usd"], 6)}
+            try:
+                entry.update(status="ok", seconds=round(fut.result(), 2))
+                logger.info("[%d/%d] ok %s vs %s (%.1fs)", done, len(todo), pair["product_a"], pair["product_b"], entry["seconds"])
+            except Exception as e:
+                failures += 1
+                entry.update(status="error", error=str(e))
+                logger.error("[%d/%d] failed %s vs %s: %s", done, len(todo), pair["product_a"], pair["product_b"], e)
+            progress.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            progress.flush()
+
+    logger.info("finished: %d ok, %d failed", len(todo) - failures, failures)
+    for model, usage in usage_tracker.model_summaries().items():
+        logger.info("%s: %d calls, %d prompt + %d completion tokens (%.0f%% prompt-cached), %d retries, ~$%.4f",
+                    model, usage["calls"], usage["prompt_tokens"], usage["completion_tokens"],
+                    usage["prompt_cache_hit_rate"] * 100, usage["retries"], usage["cost_usd"])
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
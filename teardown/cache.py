@@ -0,0 +1,116 @@
+# teardown/cache.py
+"""
+Persistent, content-addressed teardown cache.
+
+Entries are keyed by a hash of the final prompt plus the model parameters, so
+identical requests (same product text, industry, depth, flags, model and
+temperature) are served from disk instead of paying for a new LLM call.
+Each entry stores the parsed teardown and the raw model response. Entries
+expire after a TTL and the least-recently-used ones are evicted once the
+store grows beyond a size budget.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DATA_DIR = os.environ.get("TEARDOWN_DATA_DIR", ".teardown")
+DEFAULT_PATH = os.path.join(DATA_DIR, "cache.sqlite3")
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+
+def make_cache_key(prompt, model, temperature, **params):
+    """Stable sha256 over the prompt (string or chat messages) and every parameter that changes the output."""
+    payload = {"prompt": prompt, "model": model, "temperature": round(float(temperature), 3)}
+    payload.update(params)
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class TeardownCache:
+    def __init__(self, path=DEFAULT_PATH, ttl_seconds=DEFAULT_TTL_SECONDS, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS teardowns (
+                    key TEXT PRIMARY KEY,
+                    teardown TEXT NOT NULL,
+                    raw TEXT,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_teardowns_last_access ON teardowns(last_access)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return (teardown, raw) for a live entry, or None on miss/expiry."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT teardown, raw, created_at FROM teardowns WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            teardown, raw, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM teardowns WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE teardowns SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(teardown), raw
+
+    def put(self, key, teardown, raw):
+        blob = json.dumps(teardown, ensure_ascii=False)
+        size = len(blob.encode("utf-8")) + len((raw or "").encode("utf-8"))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO teardowns (key, teardown, raw, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, blob, raw, size, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        # drop expired entries first, then least-recently-used until under budget
+        if self.ttl_seconds:
+            conn.execute("DELETE FROM teardowns WHERE created_at < ?", (now - self.ttl_seconds,))
+        if not self.max_bytes:
+            return
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM teardowns").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM teardowns ORDER BY last_access ASC").fetchall():
+            conn.execute("DELETE FROM teardowns WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM teardowns")
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM teardowns").fetchone()
+        return {"entries": count, "bytes": total}
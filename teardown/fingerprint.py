@@ -0,0 +1,86 @@
+# teardown/fingerprint.py
+"""
+Per-product input tracking for incremental regeneration.
+
+A product's teardown depends only on its own effective inputs: the product
+name and pasted features plus the generation settings (industry, depth,
+include flags, model, temperature, structured output, mode). Each product's
+inputs are captured as a small dict and fingerprinted, so a comparison
+regenerates only the products whose inputs changed and reuses the rest, and
+can say why ("features changed", "model gpt-4o-mini -> gpt-4o").
+"""
+import hashlib
+import json
+
+INPUT_FIELDS = ("product", "features", "industry", "depth", "include_user_flow", "include_metrics", "include_templates",
+                "model", "temperature", "structured", "mode")
+
+LABELS = {
+    "product": "product name",
+    "features": "features",
+    "include_user_flow": "user flow",
+    "include_metrics": "KPIs",
+    "include_templates": "templates",
+    "structured": "structured output",
+}
+
+# free text is reported as changed, not quoted
+TEXT_FIELDS = ("product", "features")
+
+
+def product_inputs(name, features, industry, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                   structured=False, mode="single"):
+    """Everything that shapes one product's teardown, as a JSON-friendly dict."""
+    return {
+        "product": (name or "").strip(),
+        "features": (features or "").strip(),
+        "industry": industry,
+        "depth": depth,
+        "include_user_flow": bool(include_user_flow),
+        "include_metrics": bool(include_metrics),
+        "include_templates": bool(include_templates),
+        "model": model,
+        "temperature": round(float(temperature), 3),
+        "structured": bool(structured),
+        "mode": mode,
+    }
+
+
+def fingerprint(inputs):
+    blob = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _describe(field, before, after):
+    label = LABELS.get(field, field)
+    if field in TEXT_FIELDS:
+        return f"{label} changed"
+    if isinstance(after, bool):
+        return f"{label} {'on' if after else 'off'}"
+    return f"{label} {before} -> {after}"
+
+
+def changed_inputs(previous, current):
+    """
+    Readable reasons why `current` needs a new teardown, [] if it doesn't.
+    previous=None means it was never generated. Only fields recorded in
+    `previous` are compared, so partially known inputs (e.g. a run reloaded
+    from history) are not regenerated over settings nobody recorded.
+    """
+    if previous is None:
+        return ["not generated yet"]
+    return [_describe(field, previous[field], current.get(field))
+            for field in INPUT_FIELDS if field in previous and previous[field] != current.get(field)]
+
+
+def plan(previous, current):
+    """
+    previous: {side: inputs or None}, current: {side: inputs}.
+    Returns {side: reasons} for the products to regenerate; unchanged products are left out.
+    """
+    stale = {}
+    for side, inputs in current.items():
+        reasons = changed_inputs(previous.get(side), inputs)
+        if reasons:
+            stale[side] = reasons
+    return stale
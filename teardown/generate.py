@@ -0,0 +1,245 @@
+# teardown/generate.py
+"""
+End-to-end teardown generation: prompt -> cache -> LLM (blocking or streamed)
+-> JSON extraction, with the demo fallback used when there is no client or the
+response can't be parsed.
+"""
+import copy
+import logging
+
+from teardown.cache import make_cache_key
+from teardown.llm import LLMCallError, call_llm, stream_llm
+from teardown.parsing import extract_json
+from teardown.prompts import build_teardown_messages
+from teardown.repair import repair_teardown, salvage_sections
+from teardown.schema import TeardownValidationError, invalid_sections, teardown_response_format, validate_teardown
+from teardown.sections import generate_sections
+from teardown.singleflight import default_flight
+from teardown.tracing import annotate, span, traced
+
+logger = logging.getLogger(__name__)
+
+# "single": one completion for the whole teardown; "sections": one concurrent call per section
+GENERATION_MODES = ["single", "sections"]
+
+
+def demo_teardown(product_text, industry_key, include_user_flow=True):
+    """Minimal placeholder teardown shown when no API key is set or the model output can't be parsed."""
+    return {
+        "strategy": [
+            f"Position as fast, low-friction {industry_key.lower()} product",
+            "Target mass market and power users",
+            "Monetize via freemium and transactional fees"
+        ],
+        "growth_loops": [
+            "Referral loop: user invites friend -> both get credits (expected +1-3% uplift)",
+            "Merchant incentives: onboarding merchants drives supply"
+        ],
+        "engagement_mechanics": [
+            "Onboarding checklist with progress bar",
+            "Daily digest push for key actions"
+        ],
+        "kpis": {
+            "north_star": "DAU -> Paid conversion",
+            "leading_indicators": ["activation_rate", "7d_retention", "week1_cohort_conversion"],
+            "dashboard_analytics": ["signup_rate", "activation_rate", "revenue_per_user"]
+        },
+        "ux_teardown": [
+            "Clear CTA on home screen -> sample microcopy: 'Pay in 2 taps'",
+            "Suggested user flow: ['Install', 'Create account', 'Onboard payment method', 'Complete first transaction']" if include_user_flow else ""
+        ],
+        "swot": {
+            "strengths": ["Strong UX", "Partnerships"],
+            "weaknesses": ["Customer acquisition cost"],
+            "opportunities": ["New monetization"],
+            "threats": ["Regulatory risk"]
+        },
+        "opportunities": [
+            "Test 1: incentivized referral for transactions",
+            "Test 2: merchant onboarding pilot"
+        ],
+        "one_pager": f"{product_text} — Quick product thesis and 3-line exec summary."
+    }
+
+
+class TeardownParseError(ValueError):
+    """The model response held no parseable JSON teardown (raised by headless callers that pass fallback=False)."""
+
+    def __init__(self, message="model response did not contain a parseable JSON teardown"):
+        super().__init__(message)
+
+
+def raise_error(exc):
+    """An on_error for headless callers (batch, job workers, HTTP API): fail on the error instead of reporting it."""
+    raise exc
+
+
+def _report(exc, on_error):
+    if on_error is not None:
+        on_error(exc)
+    else:
+        logger.error("%s", exc)
+
+
+@traced("teardown.generate")
+def generate_teardown(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates, model, temperature,
+                      client=None, cache=None, use_cache=True, on_section=None, on_error=None, fallback=True, tries=3,
+                      structured=False, repair=True, mode="single", retry_policy=None, flight=default_flight,
+                      similar=None, on_reuse=None, on_suggest=None):
+    """
+    Returns (teardown, raw).
+
+    - cache: a TeardownCache; use_cache=False skips the lookup but still stores fresh results.
+    - on_section(key, value): stream the response and report each section as it completes.
+    - on_error(exc): called with the LLMCallError when every retry failed, or with a
+      TeardownValidationError when a structured response breaks the schema (defaults to logging).
+    - fallback=False returns (None, raw) instead of the demo teardown when nothing parses.
+    - structured=True requests native JSON-schema output and validates it strictly.
+      Only complete (and, when structured, schema-valid) teardowns are cached.
+    - repair=True salvages whatever sections parse and regenerates only the missing or
+      invalid ones with a small follow-up call, instead of discarding the response.
+    - mode="sections" fans out one prompt per section concurrently (see teardown.sections);
+      on_section then fires as each section call finishes.
+    - retry_policy: a teardown.retry.RetryPolicy for every LLM call (defaults to `tries` attempts).
+    - flight: a SingleFlight that coalesces concurrent identical requests (same prompt hash and
+      model parameters) into one LLM call; pass None to disable.
+    - similar: a teardown.similar.SimilarityIndex. On an exact cache miss, a cached teardown of a
+      near-identical product ("google pay app" for "Google Pay") with the same settings is returned
+      instead, and on_reuse(match) is told which one. Fresh results are added to the index.
+    - on_suggest(matches): when nothing is reused but cached products this one may abbreviate (or be
+      abbreviated by: "GPay" / "Google Pay") exist, they are offered here; the teardown is still generated.
+    Each stage is recorded as a teardown.tracing span under "teardown.generate".
+    """
+    annotate(model=model, mode=mode, structured=structured, streamed=on_section is not None)
+    with span("prompt.build"):
+        messages = build_teardown_messages(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates)
+        response_format = teardown_response_format() if structured else None
+        cache_key = make_cache_key(messages, model, temperature, structured=structured, mode=mode)
+        # everything but the product: near-duplicates are only reused within the same settings
+        scope = make_cache_key(industry_key, model, temperature, depth=depth, include_user_flow=include_user_flow,
+                               include_metrics=include_metrics, include_templates=include_templates,
+                               structured=structured, mode=mode)
+    if cache is not None and use_cache:
+        with span("cache.get") as s:
+            hit = cache.get(cache_key)
+            s.set(hit=hit is not None)
+        if hit is None and similar is not None:
+            with span("cache.similar") as s:
+                match, hit = _reuse_similar(similar, cache, product_text, scope)
+                s.set(hit=hit is not None)
+            if hit is not None and on_reuse is not None:
+                on_reuse(match)
+            if hit is None and on_suggest is not None:
+                offers = similar.suggest(product_text, scope)
+                if offers:
+                    on_suggest(offers)
+        annotate(cache_hit=hit is not None)
+        if hit is not None:
+            if on_section is not None:
+                for key, value in hit[0].items():
+                    on_section(key, value)
+            return hit
+
+    def remember():
+        if similar is not None:
+            similar.add(product_text, scope, cache_key)
+    def run(emit, report):
+        if mode == "sections":
+            parsed, raw = generate_sections(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                                            client, model=model, temperature=temperature, structured=structured, tries=tries,
+                                            on_section=emit, on_error=report, policy=retry_policy)
+            return _finish(parsed, raw, product_text, industry_key, include_user_flow, structured, cache, cache_key, emit, report, fallback, remember)
+        try:
+            if emit is None:
+                raw = call_llm(client, messages, model=model, temperature=temperature, tries=tries, response_format=response_format, policy=retry_policy)
+            else:
+                raw = stream_llm(client, messages, emit, model=model, temperature=temperature, tries=tries, response_format=response_format, policy=retry_policy)
+        except LLMCallError as e:
+            report(e)
+            raw = None
+        parsed = extract_json(raw) if raw else None
+        if not isinstance(parsed, dict):
+            parsed = salvage_sections(raw) if repair else None
+        if parsed and repair:
+            try:
+                parsed, _ = repair_teardown(parsed, product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                                            client, model=model, temperature=temperature, structured=structured, on_section=emit,
+                                            policy=retry_policy)
+            except LLMCallError as e:
+                report(e)
+        return _finish(parsed, raw, product_text, industry_key, include_user_flow, structured, cache, cache_key, emit, report, fallback, remember)
+
+    if flight is None or client is None:
+        return run(on_section, lambda exc: _report(exc, on_error))
+
+    # identical concurrent requests share one in-flight generation (and its streamed sections);
+    # errors travel with the result so every caller's on_error hears about them
+    delivered = set()
+
+    def listener(event):
+        key, value = event
+        delivered.add(key)
+        if on_section is not None:
+            on_section(key, copy.deepcopy(value))
+
+    def produce(publish):
+        errors = []
+        td, raw = run((lambda key, value: publish((key, value))) if on_section is not None else None, errors.append)
+        return td, raw, errors
+
+    (td, raw, errors), shared = flight.do((cache_key, fallback), produce, listener=listener)
+    annotate(shared=shared)
+    if shared:
+        logger.info("joined an in-flight teardown request instead of calling the LLM again")
+        # the leader keeps its own teardown; followers get a copy they can change freely
+        td = copy.deepcopy(td)
+        if on_section is not None and td:
+            for key, value in td.items():
+                if key not in delivered:
+                    on_section(key, value)
+    for exc in errors:
+        _report(exc, on_error)
+    return td, raw
+
+
+def _reuse_similar(similar, cache, product_text, scope, max_candidates=3):
+    """(match, (teardown, raw)) for a cached near-duplicate product, or (None, None)."""
+    tried = set()
+    for _ in range(max_candidates):
+        match = similar.lookup(product_text, scope, exclude=tried)
+        if match is None:
+            break
+        hit = cache.get(match["key"])
+        if hit is not None:
+            logger.info("reusing cached teardown of %r (similarity %.2f)", match["product"], match["score"])
+            return match, hit
+        # the cached teardown expired or was evicted
+        similar.remove(match["key"])
+        tried.add(match["key"])
+    return None, None
+
+
+def _finish(parsed, raw, product_text, industry_key, include_user_flow, structured, cache, cache_key, on_section, on_error, fallback,
+            on_cached=None):
+    """Validate + cache a generated teardown, or fall back to the demo output."""
+    if parsed:
+        with span("schema.validate"):
+            errors = validate_teardown(parsed) if structured else []
+            complete = not invalid_sections(parsed)
+        if errors:
+            # keep the real (if imperfect) teardown on screen, but never cache it
+            _report(TeardownValidationError(errors), on_error)
+        elif cache is not None and complete:
+            with span("cache.put"):
+                cache.put(cache_key, parsed, raw)
+            if on_cached is not None:
+                on_cached()
+        return parsed, raw
+    annotate(fallback=fallback)
+    if not fallback:
+        return None, raw
+    demo = demo_teardown(product_text, industry_key, include_user_flow)
+    if on_section is not None:
+        for key, value in demo.items():
+            on_section(key, value)
+    return demo, raw
@@ -0,0 +1,193 @@
+# teardown/history.py
+"""
+Searchable history of generated teardowns.
+
+Every comparison run (its A and B teardowns, or a single product from the
+batch runner) is stored in SQLite with product, industry, depth, model and
+timestamp, and indexed with FTS5 over the product names, descriptions and the
+teardown text, so past analyses can be found and reloaded without an LLM call.
+
+Runs are content-addressed: saving the same teardowns again (e.g. a cache hit)
+only refreshes the timestamp instead of adding a duplicate. SQLite builds
+without FTS5 fall back to a LIKE scan.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from teardown.cache import DATA_DIR
+
+DEFAULT_PATH = os.path.join(DATA_DIR, "history.sqlite3")
+
+
+def teardown_text(td):
+    """All the prose in a teardown, flattened for full-text indexing."""
+    if isinstance(td, dict):
+        return "\n".join(teardown_text(v) for v in td.values())
+    if isinstance(td, list):
+        return "\n".join(teardown_text(v) for v in td)
+    return str(td) if td is not None else ""
+
+
+def fts_query(text):
+    """User input -> FTS5 query: every word must match, as a prefix ("goo pay" finds "Google Pay")."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text or ""))
+
+
+class TeardownHistory:
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY,
+                    run_id TEXT NOT NULL,
+                    side TEXT NOT NULL,
+                    product TEXT NOT NULL,
+                    product_text TEXT NOT NULL,
+                    industry TEXT,
+                    depth TEXT,
+                    model TEXT,
+                    temperature REAL,
+                    mode TEXT,
+                    teardown TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    UNIQUE (run_id, side)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_history_created_at ON history(created_at)")
+            self.fts = self._create_fts(conn)
+
+    @staticmethod
+    def _create_fts(conn):
+        try:
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                "product, product_text, industry, body, content='history', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            return False
+        # keep the external-content index in step with the table
+        conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN
+                INSERT INTO history_fts(rowid, product, product_text, industry, body)
+                VALUES (new.id, new.product, new.product_text, new.industry, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN
+                INSERT INTO history_fts(history_fts, rowid, product, product_text, industry, body)
+                VALUES ('delete', old.id, old.product, old.product_text, old.industry, old.body);
+            END;
+            """
+        )
+        return True
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_run(self, entries, industry, depth, model, temperature, mode="single"):
+        """
+        Saves one run. `entries` is a list of dicts with side ("A", "B", ...), product,
+        product_text and teardown. Returns the run_id (a hash of the run's content).
+        """
+        payload = [industry, depth, model, round(float(temperature), 3), mode,
+                   [(e["side"], e["product_text"], e["teardown"]) for e in entries]]
+        blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        run_id = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            if conn.execute("SELECT 1 FROM history WHERE run_id = ?", (run_id,)).fetchone():
+                conn.execute("UPDATE history SET created_at = ? WHERE run_id = ?", (now, run_id))
+                return run_id
+            conn.executemany(
+                "INSERT INTO history (run_id, side, product, product_text, industry, depth, model, temperature, mode, "
+                "teardown, body, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, e["side"], e["product"], e["product_text"], industry, depth, model, temperature, mode,
+                  json.dumps(e["teardown"], ensure_ascii=False), teardown_text(e["teardown"]), now) for e in entries],
+            )
+        return run_id
+
+    def search(self, query="", limit=20):
+        """
+        Most relevant (or, without a query, most recent) runs as dicts with run_id,
+        created_at, industry, depth, model and products (names in side order).
+        """
+        with self._lock, self._connect() as conn:
+            if not fts_query(query):
+                rows = conn.execute(
+                    "SELECT run_id FROM history GROUP BY run_id ORDER BY MAX(created_at) DESC LIMIT ?", (limit,)
+                ).fetchall()
+            elif self.fts:
+                rows = conn.execute(
+                    "SELECT h.run_id FROM history_fts JOIN history h ON h.id = history_fts.rowid "
+                    "WHERE history_fts MATCH ? ORDER BY bm25(history_fts) LIMIT ?",
+                    (fts_query(query), limit * 4),
+                ).fetchall()
+            else:
+                words = re.findall(r"\w+", query)
+                where = " AND ".join("(product || ' ' || product_text || ' ' || body) LIKE ?" for _ in words)
+                rows = conn.execute(
+                    f"SELECT run_id FROM history WHERE {where} ORDER BY created_at DESC LIMIT ?",
+                    [f"%{w}%" for w in words] + [limit * 4],
+                ).fetchall()
+            run_ids = list(dict.fromkeys(r[0] for r in rows))[:limit]
+            if not run_ids:
+                return []
+            marks = ",".join("?" * len(run_ids))
+            meta = conn.execute(
+                f"SELECT run_id, side, product, industry, depth, model, created_at FROM history "
+                f"WHERE run_id IN ({marks}) ORDER BY side",
+                run_ids,
+            ).fetchall()
+        runs = {run_id: {"run_id": run_id, "products": []} for run_id in run_ids}
+        for run_id, _, product, industry, depth, model, created_at in meta:
+            runs[run_id].update(industry=industry, depth=depth, model=model, created_at=created_at)
+            runs[run_id]["products"].append(product)
+        return [runs[run_id] for run_id in run_ids]
+
+    def load(self, run_id):
+        """{side: {"product", "product_text", "teardown", ...}} for a saved run ({} if unknown)."""
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(
+                "SELECT side, product, product_text, industry, depth, model, temperature, mode, teardown, created_at "
+                "FROM history WHERE run_id = ?",
+                (run_id,),
+            ).fetchall()
+        keys = ("product", "product_text", "industry", "depth", "model", "temperature", "mode", "teardown", "created_at")
+        loaded = {}
+        for side, *values in rows:
+            entry = dict(zip(keys, values))
+            entry["teardown"] = json.loads(entry["teardown"])
+            loaded[side] = entry
+        return loaded
+
+    def delete(self, run_id):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM history WHERE run_id = ?", (run_id,))
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM history")
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            runs, entries = conn.execute("SELECT COUNT(DISTINCT run_id), COUNT(*) FROM history").fetchone()
+        return {"runs": runs, "entries": entries}
@@ -0,0 +1,291 @@
+# teardown/jobs.py
+"""
+Background job queue for long teardowns.
+
+Jobs are rows in SQLite (next to the teardown cache), so they outlive
+Streamlit reruns, browser disconnects and the app process itself. A
+WorkerPool claims queued jobs and runs generate_teardown on its own threads;
+the UI only submits jobs and polls their status and results.
+
+Running workers heartbeat; a job whose worker died (no heartbeat for
+`stale_after` seconds) goes back to the queue, up to `max_attempts` times.
+
+    python -m teardown.jobs --workers 4    # standalone worker process (needs OPENAI_API_KEY or --providers)
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from teardown.cache import DATA_DIR, TeardownCache
+from teardown.generate import TeardownParseError, generate_teardown, raise_error
+from teardown.providers import client_from_env
+from teardown.ratelimit import configure as configure_rate_limiter
+from teardown.retry import RetryPolicy
+from teardown.similar import SimilarityIndex
+from teardown.tracing import configure as configure_tracing
+from teardown.usage import usage_session
+
+logger = logging.getLogger("teardown.jobs")
+
+DEFAULT_PATH = os.path.join(DATA_DIR, "jobs.sqlite3")
+DEFAULT_STALE_AFTER = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+FINISHED = ("done", "error", "cancelled")
+
+# generate_teardown arguments a job may carry (everything else is wired by the worker)
+TEARDOWN_PARAMS = ("product_text", "industry_key", "depth", "include_user_flow", "include_metrics", "include_templates",
+                   "model", "temperature", "structured", "mode", "use_cache", "reuse_similar")
+
+
+class JobQueue:
+    def __init__(self, path=DEFAULT_PATH, stale_after=DEFAULT_STALE_AFTER, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    meta TEXT,
+                    session TEXT,
+                    result TEXT,
+                    raw TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    heartbeat_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, created_at)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _decode(row):
+        job = dict(row)
+        for key in ("params", "meta", "result"):
+            job[key] = json.loads(job[key]) if job[key] is not None else None
+        return job
+
+    def submit(self, params, session=None, meta=None):
+        """Queues a teardown job; returns its id. `meta` is stored as-is for the submitter (titles, inputs, ...)."""
+        unknown = set(params) - set(TEARDOWN_PARAMS)
+        if unknown:
+            raise ValueError(f"unknown job parameters: {', '.join(sorted(unknown))}")
+        job_id = uuid.uuid4().hex[:16]
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, meta, session, created_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(params, ensure_ascii=False), json.dumps(meta, ensure_ascii=False), session, time.time()),
+            )
+        return job_id
+
+    def get(self, job_id):
+        return self.jobs([job_id]).get(job_id)
+
+    def jobs(self, job_ids):
+        """{id: job dict} for the given ids (unknown ids are left out)."""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return {}
+        with self._lock, self._connect() as conn:
+            rows = conn.execute(f"SELECT * FROM jobs WHERE id IN ({','.join('?' * len(job_ids))})", job_ids).fetchall()
+        return {row["id"]: self._decode(row) for row in rows}
+
+    def claim(self, worker):
+        """Marks the oldest queued job as running for `worker` and returns it, or None if the queue is empty."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            # one UPDATE is atomic across processes sharing the file
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1)",
+                (worker, now, now),
+            ).rowcount
+            if not claimed:
+                return None
+            row = conn.execute("SELECT * FROM jobs WHERE worker = ? AND status = 'running' ORDER BY started_at DESC LIMIT 1",
+                               (worker,)).fetchone()
+        return self._decode(row) if row else None
+
+    def heartbeat(self, job_ids):
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._lock, self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND id IN ({','.join('?' * len(job_ids))})",
+                         [time.time()] + job_ids)
+
+    def finish(self, job_id, result, raw=None):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'done', result = ?, raw = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                         (json.dumps(result, ensure_ascii=False), raw, time.time(), job_id))
+
+    def fail(self, job_id, error):
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'error', error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                         (str(error), time.time(), job_id))
+
+    def cancel(self, job_id):
+        """Cancels a job that hasn't started; returns False if it is already running or finished."""
+        with self._lock, self._connect() as conn:
+            return conn.execute("UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                                (time.time(), job_id)).rowcount > 0
+
+    def requeue_stale(self):
+        """Puts jobs whose worker stopped heartbeating back in the queue (or fails them after max_attempts)."""
+        cutoff = time.time() - self.stale_after
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = 'error', error = 'worker lost too many times', finished_at = ? "
+                         "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?", (time.time(), cutoff, self.max_attempts))
+            return conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running' AND heartbeat_at < ?",
+                                (cutoff,)).rowcount
+
+    def purge(self, max_age):
+        """Deletes finished jobs older than max_age seconds."""
+        with self._lock, self._connect() as conn:
+            conn.execute(f"DELETE FROM jobs WHERE status IN ({','.join('?' * len(FINISHED))}) AND finished_at < ?",
+                         [*FINISHED, time.time() - max_age])
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in ("queued", "running", *FINISHED)}
+
+
+def teardown_handler(client, cache=None, similar=None, retry_policy=None):
+    """A WorkerPool handler running generate_teardown for a job; usage is attributed to the job's session."""
+    def handle(job):
+        params = dict(job["params"])
+        reuse_similar = params.pop("reuse_similar", True)
+        with usage_session(job["session"]):
+            td, raw = generate_teardown(client=client, cache=cache, similar=similar if reuse_similar else None,
+                                        retry_policy=retry_policy, on_error=raise_error, fallback=False, **params)
+        if td is None:
+            raise TeardownParseError()
+        return td, raw
+    return handle
+
+
+class WorkerPool:
+    def __init__(self, queue, handler, workers=2, poll_interval=0.5):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+        self._active = {}
+        self._active_lock = threading.Lock()
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self._prefix}:{i}",), name=f"teardown-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._beat, name="teardown-job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self, worker):
+        while not self._stop.is_set():
+            try:
+                job = self.queue.claim(worker)
+            except sqlite3.Error:
+                logger.exception("claiming a job failed")
+                job = None
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            with self._active_lock:
+                self._active[worker] = job["id"]
+            try:
+                td, raw = self.handler(job)
+                self.queue.finish(job["id"], td, raw)
+            except Exception as e:
+                logger.warning("job %s failed: %s", job["id"], e)
+                self.queue.fail(job["id"], e)
+            finally:
+                with self._active_lock:
+                    self._active.pop(worker, None)
+
+    def _beat(self):
+        interval = max(1.0, self.queue.stale_after / 4)
+        while not self._stop.wait(interval):
+            with self._active_lock:
+                running = list(self._active.values())
+            try:
+                self.queue.heartbeat(running)
+                self.queue.requeue_stale()
+            except sqlite3.Error:
+                logger.exception("job heartbeat failed")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background teardown jobs queued by the app.")
+    parser.add_argument("--workers", type=int, default=2, help="jobs run in parallel")
+    parser.add_argument("--queue", default=DEFAULT_PATH, help="job database shared with the app")
+    parser.add_argument("--tries", type=int, default=3, help="attempts per LLM call")
+    parser.add_argument("--deadline", type=float, default=None, help="seconds one LLM call may take, retries included")
+    parser.add_argument("--rate-state", default=None, help="JSON file shared with other processes so they draw from one rate budget")
+    parser.add_argument("--trace", default=None, help="append stage timing spans to this OTLP/JSON lines file")
+    parser.add_argument("--providers", default=None, help="JSON list of LLM providers to route between (see teardown/providers.py); default: OpenAI via OPENAI_API_KEY")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="don't read or write the shared teardown cache")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    workers = max(1, args.workers)
+    client = client_from_env(args.providers, max_connections=workers, max_keepalive_connections=workers)
+    if client is None:
+        logger.error("OPENAI_API_KEY is not set (or pass --providers)")
+        return 2
+    configure_rate_limiter(state_path=args.rate_state)
+    configure_tracing(args.trace)
+    cache = TeardownCache() if args.cache else None
+    handler = teardown_handler(client, cache, SimilarityIndex() if cache is not None else None,
+                               RetryPolicy(max_attempts=args.tries, deadline=args.deadline))
+    pool = WorkerPool(JobQueue(args.queue), handler, workers=workers).start()
+    logger.info("%d workers polling %s", workers, args.queue)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
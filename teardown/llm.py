@@ -0,0 +1,243 @@
+# teardown/llm.py
+"""
+Chat-completion helpers shared by the Streamlit app and headless runners.
+
+`client` is an OpenAI SDK client (or anything exposing
+`client.chat.completions.create`, such as the multi-provider
+teardown.providers.Router). A missing client means "no API key": the
+helpers return None and callers fall back to demo output.
+"""
+import logging
+import time
+
+from teardown.ratelimit import estimate_tokens, get_limiter
+from teardown.retry import RetryPolicy, classify_error
+from teardown.streaming import IncrementalJSONParser
+from teardown.tracing import annotate, span, traced
+from teardown.usage import tracker
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCallError(RuntimeError):
+    """Raised when an LLM call failed for good; `kind` is the teardown.retry error class."""
+
+    def __init__(self, message, kind=None):
+        super().__init__(message)
+        self.kind = kind
+
+
+# HTTP pool defaults: enough keep-alive connections for a few concurrent sessions
+DEFAULT_POOL = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry": 60.0,
+    "timeout": 120.0,
+    "connect_timeout": 10.0,
+}
+
+
+def make_client(api_key, max_connections=None, max_keepalive_connections=None, keepalive_expiry=None,
+                timeout=None, connect_timeout=None, **kwargs):
+    """
+    Builds an OpenAI client backed by an explicitly sized HTTP connection pool.
+    Build it once per process and share it: every call then reuses warm
+    keep-alive connections instead of paying a fresh TLS handshake.
+    `openai` is imported here so importing this module stays cheap.
+    """
+    from openai import DEFAULT_CONNECTION_LIMITS, DefaultHttpxClient, OpenAI, Timeout
+
+    def pick(value, name):
+        return DEFAULT_POOL[name] if value is None else value
+
+    # the pool types come from whichever HTTP package this openai release runs on (httpx or httpx2)
+    Limits = type(DEFAULT_CONNECTION_LIMITS)
+    http_client = DefaultHttpxClient(
+        limits=Limits(
+            max_connections=pick(max_connections, "max_connections"),
+            max_keepalive_connections=pick(max_keepalive_connections, "max_keepalive_connections"),
+            keepalive_expiry=pick(keepalive_expiry, "keepalive_expiry"),
+        ),
+        timeout=Timeout(pick(timeout, "timeout"), connect=pick(connect_timeout, "connect_timeout")),
+    )
+    # retries are handled by teardown.retry; SDK-level retries would multiply them
+    kwargs.setdefault("max_retries", 0)
+    return OpenAI(api_key=api_key, http_client=http_client, **kwargs)
+
+
+def as_messages(prompt):
+    """Accepts a plain prompt string or a ready list of chat messages."""
+    if isinstance(prompt, list):
+        return prompt
+    return [{"role":"user","content":prompt}]
+
+
+def _response_format_kwargs(response_format):
+    return {"response_format": response_format} if response_format is not None else {}
+
+
+def _timeout_kwargs(timeout):
+    return {"timeout": max(timeout, 1.0)} if timeout is not None else {}
+
+
+def _policy(policy, tries):
+    return policy if policy is not None else RetryPolicy(max_attempts=tries)
+
+
+def _log_retry(attempt, exc, kind, wait):
+    logger.warning("LLM call attempt %d failed (%s: %s); retrying in %.1fs", attempt, kind, exc, wait)
+
+
+def _counting_retries():
+    """Returns (on_retry, retries) where retries[0] counts the retries logged so far."""
+    retries = [0]
+
+    def on_retry(attempt, exc, kind, wait):
+        retries[0] += 1
+        _log_retry(attempt, exc, kind, wait)
+
+    return on_retry, retries
+
+
+def _record(model, usage, started, retries, ok=True):
+    entry = tracker.record(model, usage, latency_s=time.monotonic() - started, retries=retries[0], ok=ok)
+    annotate(model=model, ok=ok, retries=entry["retries"], prompt_tokens=entry["prompt_tokens"],
+             completion_tokens=entry["completion_tokens"], cached_tokens=entry["cached_tokens"])
+
+
+def _throttle(model, prompt, completion_tokens=None):
+    """Waits for the process-wide rate limiter (if configured); returns the token estimate reserved."""
+    limiter = get_limiter()
+    if limiter is None:
+        return None
+    estimate = estimate_tokens(prompt, completion_tokens)
+    with span("ratelimit.wait", model=model) as s:
+        waited = limiter.acquire(model, estimate)
+        s.set(waited_s=waited)
+    if waited > 0.5:
+        logger.info("rate limiter held %s call for %.1fs", model, waited)
+    return estimate
+
+
+def _settle(model, estimate, usage):
+    """Credits back the part of the reservation the call didn't use, once its usage is known."""
+    limiter = get_limiter()
+    if limiter is not None and estimate is not None and usage is not None:
+        limiter.settle(model, estimate, getattr(usage, "total_tokens", None))
+
+
+def _give_up(what, exc):
+    kind = classify_error(exc)
+    return LLMCallError(f"{what} failed ({kind}): {exc}", kind=kind)
+
+
+@traced("llm.call")
+def call_llm(client, prompt, model="gpt-4o-mini", temperature=0.2, tries=2, response_format=None, policy=None,
+             completion_tokens=None):
+    """
+    Blocking chat completion; returns the assistant text. `prompt` is a string or a
+    list of chat messages (see teardown.prompts.build_teardown_messages). Pass a `response_format`
+    (see teardown.schema.teardown_response_format) to request structured output.
+    Retries follow `policy` (a RetryPolicy); by default up to `tries` attempts with
+    jittered exponential backoff, never retrying auth or bad-request errors.
+    Every attempt first waits for the process-wide rate limiter (teardown.ratelimit),
+    reserving the prompt plus `completion_tokens` (default: a whole teardown).
+    Tokens, cost, latency and retries are recorded in teardown.usage.tracker.
+    """
+    if client is None:
+        return None
+    started = time.monotonic()
+    on_retry, retries = _counting_retries()
+
+    def attempt(timeout):
+        estimate = _throttle(model, prompt, completion_tokens)
+        resp = client.chat.completions.create(
+            model=model,
+            messages=as_messages(prompt),
+            temperature=temperature,
+            **_response_format_kwargs(response_format),
+            **_timeout_kwargs(timeout)
+        )
+        _settle(model, estimate, getattr(resp, "usage", None))
+        return resp
+
+    try:
+        resp = _policy(policy, tries).run(attempt, on_retry=on_retry)
+    except Exception as e:
+        _record(model, None, started, retries, ok=False)
+        raise _give_up("LLM call", e) from e
+    _record(model, getattr(resp, "usage", None), started, retries)
+    # attempt to extract assistant message
+    try:
+        return resp.choices[0].message.content
+    except Exception:
+        return str(resp)
+
+
+def call_llm_stream(client, prompt, model="gpt-4o-mini", temperature=0.2, response_format=None, timeout=None, usage_sink=None):
+    """
+    Yields assistant content deltas as they arrive (stream=True). The token usage
+    reported in the final chunk is appended to `usage_sink` (a list) if given.
+    """
+    if client is None:
+        return
+    stream = client.chat.completions.create(
+        model=model,
+        messages=as_messages(prompt),
+        temperature=temperature,
+        stream=True,
+        # the final chunk then carries token usage (incl. prompt-cache hits)
+        stream_options={"include_usage": True},
+        **_response_format_kwargs(response_format),
+        **_timeout_kwargs(timeout)
+    )
+    for chunk in stream:
+        if getattr(chunk, "usage", None) is not None and usage_sink is not None:
+            usage_sink.append(chunk.usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+@traced("llm.stream")
+def stream_llm(client, prompt, on_section, model="gpt-4o-mini", temperature=0.2, tries=2, response_format=None, policy=None,
+               completion_tokens=None):
+    """
+    Streams a teardown, calling on_section(key, value) for every top-level key
+    as soon as its value is complete. Returns the full raw text (or None).
+    Retries (per `policy`) only if the stream fails before producing any content;
+    a stream that breaks midway returns what arrived so far.
+    """
+    if client is None:
+        return None
+    started = time.monotonic()
+    on_retry, retries = _counting_retries()
+    usage = []
+
+    def attempt(timeout):
+        parser = IncrementalJSONParser()
+        chunks = []
+        seen = len(usage)
+        estimate = _throttle(model, prompt, completion_tokens)
+        try:
+            for delta in call_llm_stream(client, prompt, model=model, temperature=temperature, response_format=response_format,
+                                         timeout=timeout, usage_sink=usage):
+                if not chunks:
+                    annotate(first_token_s=round(time.monotonic() - started, 3))
+                chunks.append(delta)
+                for key, value in parser.feed(delta):
+                    on_section(key, value)
+        except Exception as e:
+            if not chunks:
+                raise
+            logger.warning("LLM stream broke after %d chunks: %s", len(chunks), e)
+        # the final chunk carries this attempt's usage
+        _settle(model, estimate, usage[-1] if len(usage) > seen else None)
+        return "".join(chunks)
+
+    try:
+        text = _policy(policy, tries).run(attempt, on_retry=on_retry)
+    except Exception as e:
+        _record(model, None, started, retries, ok=False)
+        raise _give_up("LLM stream", e) from e
+    _record(model, usage[-1] if usage else None, started, retries)
+    return text
@@ -0,0 +1,75 @@
+# teardown/parsing.py
+"""
+Robust extraction of the JSON object from an LLM response.
+
+Every step is a single left-to-right pass, with no backtracking regex, so
+multi-megabyte Deep-mode responses stay linear:
+
+1. a bare JSON response (structured output) is parsed as-is, with orjson when
+   installed (pip install orjson);
+2. otherwise the first JSON value after a ```json fence (or the first '{') is
+   decoded in place with the C decoder's raw_decode, a brace- and
+   string-aware scan that stops at the end of that value and ignores prose or
+   further fenced blocks after it;
+3. only if that fails, trailing commas are dropped and the value decoded again.
+"""
+import json
+import re
+
+from teardown.tracing import traced
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+JSON_BACKEND = "orjson" if orjson is not None else "json"
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_FENCE = "```json"
+_decoder = json.JSONDecoder()
+
+
+def _loads(text):
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _value_start(text):
+    """Where the JSON value starts: inside the first ```json fence if any, else the first '{'."""
+    fence = text.find(_FENCE)
+    if fence != -1:
+        starts = [i for i in (text.find("{", fence), text.find("[", fence)) if i != -1]
+        if starts:
+            return min(starts)
+    return text.find("{")
+
+
+def first_json_value(text, start=0):
+    """Decodes the JSON value beginning at text[start]; returns (value, end index). Raises ValueError."""
+    return _decoder.raw_decode(text, start)
+
+
+@traced("parse.extract_json")
+def extract_json(text):
+    if not text:
+        return None
+    # structured output / clean responses: one parse, no scanning
+    if text.lstrip()[:1] in ("{", "["):
+        try:
+            return _loads(text)
+        except (ValueError, TypeError):
+            pass
+    start = _value_start(text)
+    if start == -1:
+        return None
+    try:
+        return first_json_value(text, start)[0]
+    except ValueError:
+        pass
+    # minor fix: trailing commas before a closing bracket
+    try:
+        return first_json_value(_TRAILING_COMMA.sub(r"\1", text[start:]))[0]
+    except ValueError:
+        return None
@@ -0,0 +1,128 @@
+# teardown/prompts.py
+"""Industry templates and the teardown prompt builder."""
+
+# -------------------------------
+# Industry fine-tuned prompt templates
+# -------------------------------
+INDUSTRY_TEMPLATES = {
+    "General / Consumer": "Focus on consumer acquisition, retention hooks, network effects, pricing psychology, and UX simplicity.",
+    "FinTech": "Focus on regulatory constraints, payments & flows, trust signals, onboarding (KYC), monetization via interchange/fees, fraud & compliance concerns, and merchant/partner flows.",
+    "Marketplace": "Focus on two-sided network dynamics (supply/demand), liquidity, take rates, onboarding incentives, quality controls, and marketplace matching algorithms.",
+    "SaaS / B2B": "Focus on buyer personas, sales motions (self-serve vs enterprise), onboarding/activation for users/teams, trial/enterprise pricing, retention via ROI, and product-led growth experiments.",
+    "EdTech": "Focus on learning outcomes, curriculum design, engagement loops, teacher/platform dynamics, certification, and measurement of learning retention.",
+    "HealthTech": "Focus on trust & compliance (HIPAA-like), clinician workflows, patient onboarding, safety-critical UX, integrations with EMR, and monetization models."
+}
+
+
+# -------------------------------
+# Teardown sections, in the order the model is asked to write them
+# -------------------------------
+SECTION_SPECS = {
+    "one_pager": "a short markdown string (3-6 sentences) summarizing the product thesis and top recommendations.",
+    "strategy": "an array of 3-6 concise strings describing positioning, target segments, monetization levers.",
+    "growth_loops": "an array of 3-6 strings describing primary acquisition & virality loops with estimated impact percentages where reasonable.",
+    "engagement_mechanics": "an array of 4-8 strings describing activation, retention hooks, notifications, onboarding steps.",
+    "kpis": "an object with keys: north_star, leading_indicators (array), dashboard_analytics (array of metric names).",
+    "ux_teardown": "array of observations about UX/flows, friction points, and microcopy suggestions (include sample microcopy if INCLUDE_USER_FLOW=yes).",
+    "swot": "object with keys: strengths (array), weaknesses (array), opportunities (array), threats (array).",
+    "opportunities": "array of short product/experiment ideas prioritized (short/medium/long-term).",
+}
+SECTION_KEYS = list(SECTION_SPECS)
+
+
+def section_list(keys=SECTION_KEYS):
+    return "\n".join(f"- {key}: {SECTION_SPECS[key]}" for key in keys)
+
+
+# -------------------------------
+# Prompt builders
+# -------------------------------
+DEPTH_INSTRUCTIONS = {
+    "Quick (bullets)": "Produce concise, high-impact bullet points (1-4 bullets per section).",
+    "Standard (detailed)": "Provide structured analysis with 4-8 bullets per section and short rationale sentences.",
+    "Deep (comprehensive)": "Provide an in-depth multi-paragraph analysis using frameworks and examples for each section."
+}
+DEPTH_LEVELS = list(DEPTH_INSTRUCTIONS)
+
+
+def depth_to_instruction(d):
+    return DEPTH_INSTRUCTIONS.get(d, "")
+
+
+# Prompts are chat messages ordered from most to least static: the system message
+# (role, schema, requirements, depth) is byte-identical across products, then the
+# industry hint, then the product text last. Providers cache prompt prefixes, so
+# repeated teardowns reuse the long shared prefix instead of re-reading it.
+
+def build_teardown_messages(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates):
+    """
+    Returns chat messages instructing the LLM to output EXACTLY one JSON object with:
+    { one_pager, strategy, growth_loops, engagement_mechanics, kpis, ux_teardown, swot, opportunities }
+    Keys are requested in display order so streamed output can render top-down.
+    """
+    include_user_flow_flag = "yes" if include_user_flow else "no"
+    include_metrics_flag = "yes" if include_metrics else "no"
+    include_templates_flag = "yes" if include_templates else "no"
+    sections = section_list()
+
+    system = f"""You are an expert Product Manager & Growth strategist.
+
+Produce exactly ONE JSON object (no surrounding text) with the following keys, in this order:
+{sections}
+
+REQUIREMENTS:
+- Return valid JSON only (no commentary).
+- If INCLUDE_USER_FLOW is {include_user_flow_flag} then include 1 short suggested user flow (3-6 steps) inside ux_teardown items.
+- If INCLUDE_METRICS is {include_metrics_flag} then include realistic KPI names and 1 example target (e.g., conversion 3% -> 4%).
+- If INCLUDE_TEMPLATES is {include_templates_flag} then include one experiment idea in each of growth_loops and engagement_mechanics.
+
+Be concrete and action-oriented.
+Depth instruction: {depth_to_instruction(depth)}"""
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": _product_message(product_text, industry_key)},
+    ]
+
+
+def build_teardown_prompt(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates):
+    """Single-string form of build_teardown_messages (system text, then the product message)."""
+    messages = build_teardown_messages(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates)
+    return "\n\n".join(m["content"] for m in messages)
+
+
+def _product_message(product_text, industry_key, extra=""):
+    return f"""Context: {INDUSTRY_TEMPLATES.get(industry_key, "")}
+{extra}
+Product description:
+\"\"\"{product_text}\"\"\""""
+
+
+def build_sections_messages(product_text, industry_key, depth, keys, include_user_flow, include_metrics, include_templates, existing=None):
+    """
+    Chat messages asking for ONLY the given section keys. Used to repair broken
+    sections and for section-parallel generation; `existing` sections (currently
+    the one-pager) are passed as context so the pieces stay consistent.
+    """
+    flags = []
+    if include_user_flow and "ux_teardown" in keys:
+        flags.append("- Include 1 short suggested user flow (3-6 steps) inside ux_teardown items.")
+    if include_metrics and "kpis" in keys:
+        flags.append("- Include realistic KPI names and 1 example target (e.g., conversion 3% -> 4%).")
+    if include_templates and ({"growth_loops", "engagement_mechanics"} & set(keys)):
+        flags.append("- Include one experiment idea in each of growth_loops and engagement_mechanics.")
+    summary = (existing or {}).get("one_pager")
+    context = f"Existing summary of this teardown (stay consistent with it):\n{summary}\n" if isinstance(summary, str) and summary else ""
+    system = f"""You are an expert Product Manager & Growth strategist writing part of a product teardown.
+
+Produce exactly ONE JSON object (no surrounding text) with ONLY these keys:
+{section_list(keys)}
+
+REQUIREMENTS:
+- Return valid JSON only (no commentary).
+{chr(10).join(flags)}
+Be concrete and action-oriented.
+Depth instruction: {depth_to_instruction(depth)}"""
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": _product_message(product_text, industry_key, context)},
+    ]
@@ -0,0 +1,294 @@
+# teardown/providers.py
+"""
+Multiple LLM backends behind one client, with latency-aware routing and failover.
+
+A Provider wraps one chat-completions endpoint: OpenAI, any OpenAI-compatible
+base URL (Groq, Together, vLLM, ...) or a local Ollama / llama.cpp server
+(both speak the same API under /v1). A Router looks like an OpenAI client
+(`router.chat.completions.create(...)`), so it can be passed anywhere a
+`client` is expected (teardown.llm, generate_teardown, the batch runner, job
+workers and the HTTP API) without changing them.
+
+For every request the router ranks the providers that serve the requested
+model by
+
+    score = latency EWMA + error_penalty_s * error-rate EWMA + cost_weight * price
+
+(latency is time to first chunk for streams, total time otherwise), tries the
+best one and fails over to the next on transient errors (rate limits,
+timeouts, 5xx, dropped connections; see teardown.retry.RETRYABLE). Bad
+requests, auth failures and unrecognised errors are raised at once and don't
+count against the provider's health. A provider that fails `trip_after` times
+in a row is skipped for `cooldown_s` seconds, unless nothing else is left. A small share of requests goes to another healthy
+provider so the statistics stay current.
+
+Providers are configured as a list of dicts (LLM_PROVIDERS secret, or a JSON
+file passed with --providers / TEARDOWN_PROVIDERS):
+
+    [{"name": "openai", "kind": "openai"},
+     {"name": "groq", "kind": "openai-compatible", "base_url": "https://api.groq.com/openai/v1",
+      "api_key_env": "GROQ_API_KEY", "models": {"gpt-4o-mini": "llama-3.1-8b-instant"},
+      "cost": {"input": 0.05, "output": 0.08}},
+     {"name": "ollama", "kind": "ollama", "models": {"*": "llama3.1"}}]
+
+`models` maps the app's model names to the provider's own ("*" = any model);
+without it a provider serves every model under its own name. The provider's
+own names (here "llama-3.1-8b-instant", "llama3.1") are offered as extra
+models in the app and can be requested directly; they go only to the
+providers that list them, never to a provider without a `models` map. `cost` is USD
+per 1M tokens (defaults: teardown.usage.PRICING for OpenAI kinds, 0 for local
+servers). Set "structured": false for servers without JSON-schema output; the
+prompt still asks for JSON and the response is parsed as usual.
+"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+from teardown.llm import make_client
+from teardown.retry import RETRYABLE, classify_error
+from teardown.tracing import annotate
+from teardown.usage import PRICING
+
+logger = logging.getLogger(__name__)
+
+KINDS = {
+    # kind: (default base_url, default api key, local server)
+    "openai": (None, None, False),
+    "openai-compatible": (None, None, False),
+    "ollama": ("http://localhost:11434/v1", "ollama", True),
+    "llamacpp": ("http://localhost:8080/v1", "llamacpp", True),
+}
+
+
+class Provider:
+    def __init__(self, name, client, models=None, cost=None, structured=True, local=False):
+        self.name = name
+        self.client = client
+        self.models = dict(models or {})
+        self.cost = cost
+        self.structured = structured
+        self.local = local
+
+    def serves(self, model):
+        return not self.models or model in self.models or "*" in self.models or model in self.models.values()
+
+    def model_for(self, model):
+        if not self.models:
+            return model
+        if model not in self.models and model in self.models.values():
+            # asked for by the provider's own name
+            return model
+        return self.models.get(model, self.models.get("*", model))
+
+    def price(self, model):
+        """USD per 1M input + output tokens, for routing."""
+        if self.cost is not None:
+            return float(self.cost.get("input", 0.0)) + float(self.cost.get("output", 0.0))
+        if self.local:
+            return 0.0
+        price = PRICING.get(self.model_for(model)) or PRICING.get(model)
+        return price[0] + price[2] if price else 0.0
+
+    def create(self, **kwargs):
+        kwargs["model"] = self.model_for(kwargs["model"])
+        if not self.structured:
+            kwargs.pop("response_format", None)
+        return self.client.chat.completions.create(**kwargs)
+
+
+def build_provider(spec, default_api_key=None, **pool):
+    """A Provider from one config dict (see the module docstring)."""
+    kind = spec.get("kind", "openai-compatible")
+    if kind not in KINDS:
+        raise ValueError(f"unknown provider kind {kind!r}; one of: {', '.join(KINDS)}")
+    default_url, default_key, local = KINDS[kind]
+    base_url = spec.get("base_url", default_url)
+    if kind == "openai-compatible" and not base_url:
+        raise ValueError(f"provider {spec.get('name', kind)!r} needs a base_url")
+    api_key = spec.get("api_key") or (os.environ.get(spec["api_key_env"]) if spec.get("api_key_env") else None)
+    if api_key is None:
+        api_key = default_key if local else default_api_key
+    if not api_key:
+        raise ValueError(f"provider {spec.get('name', kind)!r} has no API key")
+    extra = {"base_url": base_url} if base_url else {}
+    client = make_client(api_key, **pool, **extra)
+    return Provider(spec.get("name", kind), client, models=spec.get("models"), cost=spec.get("cost"),
+                    structured=spec.get("structured", True), local=local)
+
+
+class Router:
+    def __init__(self, providers, alpha=0.3, error_penalty_s=10.0, cost_weight=0.05, prior_latency_s=2.0,
+                 trip_after=3, cooldown_s=30.0, explore=0.05, seed=None):
+        if not providers:
+            raise ValueError("a Router needs at least one provider")
+        self.providers = list(providers)
+        self.alpha = alpha
+        self.error_penalty_s = error_penalty_s
+        self.cost_weight = cost_weight
+        self.prior_latency_s = prior_latency_s
+        self.trip_after = trip_after
+        self.cooldown_s = cooldown_s
+        self.explore = explore
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {p.name: {"calls": 0, "failures": 0, "consecutive_failures": 0, "latency_s": None, "ttft_s": None,
+                                "error_rate": 0.0, "down_until": 0.0, "last_error": None} for p in self.providers}
+        # providers' own model names ("llama3.1"): only the providers that list them serve them
+        mapped = {name for p in self.providers for name in p.models}
+        self._own_names = {name for p in self.providers for name in p.models.values()} - mapped - set(PRICING)
+        # duck-types the OpenAI client used by teardown.llm
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _ewma(self, old, value):
+        return value if old is None else (1 - self.alpha) * old + self.alpha * value
+
+    def _serves(self, provider, model):
+        return provider.serves(model) and (bool(provider.models) or model not in self._own_names)
+
+    def score(self, provider, model, stream=False):
+        stats = self._stats[provider.name]
+        latency = stats["ttft_s"] if stream else stats["latency_s"]
+        if latency is None:
+            latency = stats["latency_s"] if stream else stats["ttft_s"]
+        if latency is None:
+            latency = self.prior_latency_s
+        return latency + self.error_penalty_s * stats["error_rate"] + self.cost_weight * provider.price(model)
+
+    def ranked(self, model, stream=False):
+        """Providers serving `model`, best first; providers in cooldown go last."""
+        now = time.time()
+        with self._lock:
+            candidates = [p for p in self.providers if self._serves(p, model)]
+            healthy = sorted((p for p in candidates if self._stats[p.name]["down_until"] <= now),
+                             key=lambda p: self.score(p, model, stream))
+            down = sorted((p for p in candidates if self._stats[p.name]["down_until"] > now),
+                          key=lambda p: self._stats[p.name]["down_until"])
+            if len(healthy) > 1 and self._rng.random() < self.explore:
+                healthy.insert(0, healthy.pop(self._rng.randrange(1, len(healthy))))
+        if not candidates:
+            raise ValueError(f"no LLM provider serves model {model!r}")
+        return healthy + down
+
+    def _observe(self, provider, ok=True, latency_s=None, ttft_s=None, error=None):
+        with self._lock:
+            stats = self._stats[provider.name]
+            stats["calls"] += 1
+            stats["error_rate"] = self._ewma(stats["error_rate"], 0.0 if ok else 1.0)
+            if ok:
+                stats["consecutive_failures"] = 0
+                if latency_s is not None:
+                    stats["latency_s"] = self._ewma(stats["latency_s"], latency_s)
+                if ttft_s is not None:
+                    stats["ttft_s"] = self._ewma(stats["ttft_s"], ttft_s)
+                return
+            stats["failures"] += 1
+            stats["consecutive_failures"] += 1
+            stats["last_error"] = f"{classify_error(error)}: {error}" if error is not None else None
+            if stats["consecutive_failures"] >= self.trip_after:
+                stats["down_until"] = time.time() + self.cooldown_s
+                logger.warning("LLM provider %s failed %d times in a row; skipping it for %.0fs",
+                               provider.name, stats["consecutive_failures"], self.cooldown_s)
+
+    def create(self, **kwargs):
+        """chat.completions.create on the best provider, failing over to the next on transient errors."""
+        stream = bool(kwargs.get("stream"))
+        error = None
+        for provider in self.ranked(kwargs.get("model"), stream):
+            started = time.monotonic()
+            try:
+                resp = provider.create(**kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind not in RETRYABLE:
+                    # the request itself is wrong (or our code is): another provider won't do better
+                    raise
+                self._observe(provider, ok=False, error=e)
+                logger.warning("LLM provider %s failed (%s); trying the next one", provider.name, kind)
+                error = e
+                continue
+            annotate(provider=provider.name)
+            if stream:
+                return self._watch(provider, resp, started)
+            self._observe(provider, latency_s=time.monotonic() - started)
+            return resp
+        # every provider failed: raise the last error so teardown.retry can classify it
+        raise error
+
+    def _watch(self, provider, stream, started):
+        """Passes stream chunks through, timing the first one; a stream broken by a transient error counts as a failure."""
+        first = True
+        try:
+            for chunk in stream:
+                if first:
+                    first = False
+                    self._observe(provider, ttft_s=time.monotonic() - started)
+                yield chunk
+        except Exception as e:
+            if classify_error(e) in RETRYABLE:
+                self._observe(provider, ok=False, error=e)
+            raise
+        if first:
+            self._observe(provider, ttft_s=time.monotonic() - started)
+
+    def snapshot(self, model=None):
+        """Per-provider statistics (and the routing score for `model`), for status panels."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for p in self.providers:
+                stats = self._stats[p.name]
+                row = {"provider": p.name, "calls": stats["calls"], "failures": stats["failures"],
+                       "error_rate": round(stats["error_rate"], 3),
+                       "latency_s": round(stats["latency_s"], 3) if stats["latency_s"] is not None else None,
+                       "ttft_s": round(stats["ttft_s"], 3) if stats["ttft_s"] is not None else None,
+                       "state": "cooldown" if stats["down_until"] > now else "ok", "last_error": stats["last_error"]}
+                if model is not None and self._serves(p, model):
+                    row["score"] = round(self.score(p, model), 3)
+                rows.append(row)
+        return rows
+
+
+def build_router(specs, default_api_key=None, router_options=None, **pool):
+    """A Router over the configured providers; providers that can't be built are logged and left out."""
+    providers = []
+    for spec in specs:
+        try:
+            providers.append(build_provider(spec, default_api_key, **pool))
+        except ValueError as e:
+            logger.error("LLM provider skipped: %s", e)
+    return Router(providers, **(router_options or {}))
+
+
+def provider_models(specs):
+    """The providers' own model names from their `models` maps (e.g. a local "llama3.1"), in order, without repeats."""
+    names = []
+    for spec in specs:
+        for model in (spec.get("models") or {}).values():
+            if model not in names:
+                names.append(model)
+    return names
+
+
+def load_specs(path):
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise ValueError(f"{path}: expected a JSON list of providers")
+    return specs
+
+
+def client_from_env(providers_path=None, **pool):
+    """
+    The LLM client for headless runners: a Router when a providers file is given
+    (or TEARDOWN_PROVIDERS points at one), else an OpenAI client from
+    OPENAI_API_KEY, else None.
+    """
+    providers_path = providers_path or os.environ.get("TEARDOWN_PROVIDERS")
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if providers_path:
+        return build_router(load_specs(providers_path), api_key, **pool)
+    return make_client(api_key, **pool) if api_key else None
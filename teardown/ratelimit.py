@@ -0,0 +1,159 @@
+# teardown/ratelimit.py
+"""
+Client-side token-bucket rate limiting for LLM calls.
+
+Each model gets two buckets: requests per minute and (estimated) tokens per
+minute. A call reserves one request plus its token estimate and sleeps until
+both buckets can cover it. Reservations may drive a bucket negative, which
+queues later callers behind earlier ones, so bursts are paced out smoothly
+instead of all hitting the API and coming back as 429s.
+
+The limiter is process-wide (configure() once, every call_llm uses it). With a
+`state_path` the bucket levels live in a small JSON file guarded by an
+exclusive file lock, so Streamlit servers and batch workers on the same machine
+share one budget.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process sharing unavailable, in-process limiting still works
+    fcntl = None
+
+# Conservative per-model budgets (requests/min, tokens/min); override via configure().
+DEFAULT_LIMITS = {
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200_000},
+    "gpt-4o": {"rpm": 500, "tpm": 30_000},
+}
+FALLBACK_LIMITS = {"rpm": 500, "tpm": 30_000}
+
+# completion budget assumed when estimating a call's token cost: a whole
+# teardown, or a share per section for section fan-out and repair calls
+DEFAULT_COMPLETION_TOKENS = 1500
+SECTION_COMPLETION_TOKENS = 250
+
+
+def section_completion_tokens(sections):
+    """Completion budget for a call that writes `sections` teardown sections."""
+    return min(DEFAULT_COMPLETION_TOKENS, SECTION_COMPLETION_TOKENS * max(1, sections))
+
+
+def estimate_tokens(prompt, completion_tokens=None):
+    """Rough token cost of a call: ~4 characters per prompt token plus the expected completion."""
+    if completion_tokens is None:
+        completion_tokens = DEFAULT_COMPLETION_TOKENS
+    if isinstance(prompt, list):
+        prompt = "".join(str(m.get("content", "")) for m in prompt)
+    return len(prompt or "") // 4 + completion_tokens
+
+
+class TokenBucket:
+    """A bucket of `capacity` units refilled continuously at `capacity` per minute."""
+
+    def __init__(self, per_minute, level=None, updated=None):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity if level is None else level
+        self.updated = time.time() if updated is None else updated
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount, now=None):
+        """Takes `amount` units (possibly going into debt) and returns the seconds to wait before using them."""
+        now = time.time() if now is None else now
+        self._refill(now)
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def credit(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+    def state(self):
+        return {"level": self.level, "updated": self.updated}
+
+
+class RateLimiter:
+    def __init__(self, limits=None, state_path=None, sleep=time.sleep):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self.state_path = state_path if fcntl is not None else None
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._buckets = {}
+        if self.state_path and os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+
+    def _limits_for(self, model):
+        return self.limits.get(model, FALLBACK_LIMITS)
+
+    @contextmanager
+    def _state(self):
+        """Yields {model: {"requests": bucket, "tokens": bucket}}, persisted to state_path if configured."""
+        with self._lock:
+            if not self.state_path:
+                yield self._buckets
+                return
+            with open(self.state_path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        saved = json.loads(f.read() or "{}")
+                    except ValueError:
+                        saved = {}
+                    buckets = {}
+                    for model, state in saved.items():
+                        limits = self._limits_for(model)
+                        buckets[model] = {
+                            "requests": TokenBucket(limits["rpm"], **state["requests"]),
+                            "tokens": TokenBucket(limits["tpm"], **state["tokens"]),
+                        }
+                    yield buckets
+                    f.seek(0)
+                    f.truncate()
+                    json.dump({m: {k: b.state() for k, b in pair.items()} for m, pair in buckets.items()}, f)
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _pair(self, buckets, model):
+        if model not in buckets:
+            limits = self._limits_for(model)
+            buckets[model] = {"requests": TokenBucket(limits["rpm"]), "tokens": TokenBucket(limits["tpm"])}
+        return buckets[model]
+
+    def acquire(self, model, tokens):
+        """Blocks until `model` has budget for one request of ~`tokens` tokens; returns the time waited."""
+        with self._state() as buckets:
+            pair = self._pair(buckets, model)
+            wait = max(pair["requests"].reserve(1), pair["tokens"].reserve(tokens))
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def settle(self, model, estimated, actual):
+        """Returns over-estimated tokens to the bucket once the real usage is known."""
+        if actual is None or actual >= estimated:
+            return
+        with self._state() as buckets:
+            self._pair(buckets, model)["tokens"].credit(estimated - actual)
+
+
+_limiter = None
+
+
+def configure(limits=None, state_path=None):
+    """Installs the process-wide limiter used by call_llm / stream_llm and returns it."""
+    global _limiter
+    _limiter = RateLimiter(limits=limits, state_path=state_path)
+    return _limiter
+
+
+def get_limiter():
+    """The process-wide limiter, or None when rate limiting hasn't been configured."""
+    return _limiter
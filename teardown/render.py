@@ -0,0 +1,55 @@
+# teardown/render.py
+"""Markdown export of a teardown dict."""
+import json
+
+from teardown.tracing import traced
+
+
+@traced("render.markdown")
+def markdown_from_teardown(td, title):
+    md = [f"# Product Teardown — {title}\n"]
+    md.append("## One-pager\n")
+    md.append(td.get("one_pager","") + "\n\n")
+    md.append("## Strategy\n")
+    for s in td.get("strategy",[]):
+        md.append(f"- {s}\n")
+    md.append("\n## Growth Loops\n")
+    for g in td.get("growth_loops", td.get("growthLoops", [])):
+        md.append(f"- {g}\n")
+    md.append("\n## Engagement Mechanics\n")
+    for e in td.get("engagement_mechanics", td.get("engagement", [])):
+        md.append(f"- {e}\n")
+    md.append("\n## KPIs\n")
+    md.append("```json\n")
+    md.append(json.dumps(td.get("kpis",{}), indent=2, ensure_ascii=False))
+    md.append("\n```\n")
+    md.append("\n## UX Tear-down\n")
+    for u in td.get("ux_teardown", td.get("ux", [])):
+        md.append(f"- {u}\n")
+    md.append("\n## SWOT\n")
+    md.append("```json\n")
+    md.append(json.dumps(td.get("swot",{}), indent=2, ensure_ascii=False))
+    md.append("\n```\n")
+    md.append("\n## Opportunities\n")
+    for o in td.get("opportunities",[]):
+        md.append(f"- {o}\n")
+    return "\n".join(md)
+
+
+def north_star(td):
+    kpis = td.get("kpis")
+    return (kpis.get("north_star") if isinstance(kpis, dict) else None) or "—"
+
+
+def comparison_rows(teardowns):
+    """One matrix row per product for {name: teardown}: north star and the breadth of the main sections."""
+    return [
+        {
+            "product": name,
+            "north_star": north_star(td),
+            "strategy_breadth": len(td.get("strategy", [])),
+            "growth_loops": len(td.get("growth_loops", td.get("growthLoops", []))),
+            "opportunities": len(td.get("opportunities", [])),
+        }
+        for name, td in teardowns.items()
+    ]
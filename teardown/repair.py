@@ -0,0 +1,61 @@
+# teardown/repair.py
+"""
+Targeted repair of incomplete teardowns.
+
+Instead of re-running the whole multi-thousand-token teardown when a response
+lacks `swot` or has a malformed `kpis`, we keep every section that is valid and
+ask the model for just the broken ones in a small follow-up call, then merge.
+Responses that don't parse as JSON at all are first salvaged section by section
+with the streaming parser.
+"""
+import logging
+
+from teardown.llm import call_llm
+from teardown.parsing import extract_json
+from teardown.prompts import build_sections_messages
+from teardown.ratelimit import section_completion_tokens
+from teardown.schema import SECTION_SCHEMAS, invalid_sections, sections_schema, teardown_response_format
+from teardown.streaming import IncrementalJSONParser
+from teardown.tracing import traced
+
+logger = logging.getLogger(__name__)
+
+
+def salvage_sections(raw):
+    """Complete, known top-level sections from a response that isn't valid JSON as a whole."""
+    if not raw:
+        return {}
+    parser = IncrementalJSONParser()
+    parser.feed(raw)
+    return {key: value for key, value in parser.sections.items() if key in SECTION_SCHEMAS}
+
+
+@traced("teardown.repair")
+def repair_teardown(td, product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                    client, model="gpt-4o-mini", temperature=0.2, structured=False, tries=2, on_section=None, policy=None):
+    """
+    Regenerates only the missing/invalid sections of `td` and merges them in.
+    Returns (teardown, repaired_keys). Sections that are still broken after the
+    follow-up call are left as they were.
+    """
+    td = dict(td or {})
+    broken = invalid_sections(td)
+    if not broken or client is None:
+        return td, []
+    messages = build_sections_messages(product_text, industry_key, depth, broken, include_user_flow, include_metrics, include_templates, existing=td)
+    response_format = teardown_response_format(sections_schema(broken), name="teardown_sections") if structured else None
+    raw = call_llm(client, messages, model=model, temperature=temperature, tries=tries, response_format=response_format, policy=policy,
+                   completion_tokens=section_completion_tokens(len(broken)))
+    patch = extract_json(raw) if raw else None
+    if not isinstance(patch, dict):
+        logger.warning("repair call for %s returned no usable JSON", ", ".join(broken))
+        return td, []
+    repaired = []
+    for key in broken:
+        if key in patch and key not in invalid_sections({**td, key: patch[key]}):
+            td[key] = patch[key]
+            repaired.append(key)
+            if on_section is not None:
+                on_section(key, patch[key])
+    logger.info("repaired sections: %s (requested %s)", repaired, broken)
+    return td, repaired
@@ -0,0 +1,144 @@
+# teardown/retry.py
+"""
+Retry policy for LLM calls.
+
+Errors are classified first: rate limits, timeouts, 5xx and dropped connections
+are retried; auth failures, bad requests and anything unrecognised (e.g. a
+TypeError from our own code) are not (retrying a 400 only burns quota). Waits honour the server's Retry-After / retry-after-ms headers and
+otherwise use capped exponential backoff with full jitter, so concurrent
+workers spread out instead of retrying in lock-step. An optional per-request
+deadline bounds the total time spent, including waits.
+
+Errors are recognised by status code and class name, so this module works with
+any OpenAI-compatible SDK without importing one.
+"""
+import email.utils
+import random
+import socket
+import time
+
+RATE_LIMIT = "rate_limit"
+TIMEOUT = "timeout"
+SERVER = "server"
+CONNECTION = "connection"
+AUTH = "auth"
+BAD_REQUEST = "bad_request"
+UNKNOWN = "unknown"
+
+RETRYABLE = {RATE_LIMIT, TIMEOUT, SERVER, CONNECTION}
+
+# network-layer exception names (httpx/httpcore and friends) that mean the connection broke
+NETWORK_ERRORS = ("ConnectError", "ReadError", "WriteError", "NetworkError", "ProtocolError")
+# socket-level errors that mean the same; other OSErrors (a missing or unwritable local file) are not retried
+SOCKET_ERRORS = (ConnectionError, socket.timeout, socket.gaierror)
+
+
+def _status_code(exc):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def classify_error(exc):
+    """Maps an exception from the SDK (or network layer) to one of the error kinds above."""
+    status = _status_code(exc)
+    name = type(exc).__name__
+    if status == 429 or name == "RateLimitError":
+        return RATE_LIMIT
+    if status == 408 or "Timeout" in name or isinstance(exc, TimeoutError):
+        return TIMEOUT
+    if status in (401, 403) or name in ("AuthenticationError", "PermissionDeniedError"):
+        return AUTH
+    if status is not None and status >= 500:
+        return SERVER
+    if status == 409:
+        # OpenAI uses 409 for transient lock conflicts
+        return SERVER
+    if status is not None and 400 <= status < 500:
+        return BAD_REQUEST
+    if "Connection" in name or name.endswith(NETWORK_ERRORS) or isinstance(exc, SOCKET_ERRORS):
+        return CONNECTION
+    if name == "APIError":
+        # the SDK's error for a failure reported mid-stream (no HTTP status)
+        return SERVER
+    return UNKNOWN
+
+
+def retry_after_seconds(exc):
+    """Seconds the server asked us to wait (retry-after-ms / retry-after), or None."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000.0)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    max_attempts: total tries, including the first.
+    base_delay/max_delay: exponential backoff bounds (seconds) before jitter.
+    deadline: optional wall-clock budget per request (seconds), waits included.
+    max_retry_after: cap on a server-provided Retry-After.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=30.0, deadline=None, max_retry_after=60.0,
+                 sleep=time.sleep, rng=random.random):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.max_retry_after = max_retry_after
+        self._sleep = sleep
+        self._rng = rng
+
+    def backoff(self, attempt, exc=None):
+        """Wait before retry number `attempt` (0-based)."""
+        server_wait = retry_after_seconds(exc) if exc is not None else None
+        if server_wait is not None:
+            return min(server_wait, self.max_retry_after)
+        # full jitter: uniform in [0, min(cap, base * 2^attempt)]
+        return self._rng() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def run(self, fn, on_retry=None):
+        """
+        Calls fn(timeout) until it succeeds or the policy gives up, then re-raises the
+        last error. `timeout` is the time left before the deadline (None without one)
+        so the HTTP request itself can't outlive the budget.
+        on_retry(attempt, exc, kind, wait) is called before each wait.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            remaining = None
+            if self.deadline is not None:
+                remaining = self.deadline - (time.monotonic() - started)
+            try:
+                return fn(remaining)
+            except Exception as e:
+                kind = classify_error(e)
+                attempt += 1
+                if kind not in RETRYABLE or attempt >= self.max_attempts:
+                    raise
+                wait = self.backoff(attempt - 1, e)
+                if self.deadline is not None and time.monotonic() - started + wait >= self.deadline:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, e, kind, wait)
+                self._sleep(wait)
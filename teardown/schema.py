@@ -0,0 +1,116 @@
+# teardown/schema.py
+"""
+JSON schema for a teardown, used two ways:
+
+- as a native structured-output `response_format`, so the model is constrained
+  to emit exactly the shape build_teardown_prompt describes (no regex scraping,
+  no demo fallback on a stray comma);
+- as a strict local validator for whatever comes back.
+"""
+from teardown.prompts import SECTION_KEYS, SECTION_SPECS
+
+
+class TeardownValidationError(ValueError):
+    """A parsed teardown does not match TEARDOWN_SCHEMA."""
+
+    def __init__(self, errors):
+        super().__init__("Teardown failed schema validation: " + "; ".join(errors))
+        self.errors = errors
+
+
+def _strings(description=None):
+    schema = {"type": "array", "items": {"type": "string"}}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def _object(properties, description=None):
+    schema = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+    if description:
+        schema["description"] = description
+    return schema
+
+
+SECTION_SCHEMAS = {
+    "one_pager": {"type": "string", "description": SECTION_SPECS["one_pager"]},
+    "strategy": _strings(SECTION_SPECS["strategy"]),
+    "growth_loops": _strings(SECTION_SPECS["growth_loops"]),
+    "engagement_mechanics": _strings(SECTION_SPECS["engagement_mechanics"]),
+    "kpis": _object(
+        {"north_star": {"type": "string"}, "leading_indicators": _strings(), "dashboard_analytics": _strings()},
+        SECTION_SPECS["kpis"],
+    ),
+    "ux_teardown": _strings(SECTION_SPECS["ux_teardown"]),
+    "swot": _object(
+        {"strengths": _strings(), "weaknesses": _strings(), "opportunities": _strings(), "threats": _strings()},
+        SECTION_SPECS["swot"],
+    ),
+    "opportunities": _strings(SECTION_SPECS["opportunities"]),
+}
+
+
+def sections_schema(keys):
+    """Strict object schema covering only the given sections (used for partial regeneration)."""
+    return _object({key: SECTION_SCHEMAS[key] for key in keys})
+
+
+TEARDOWN_SCHEMA = sections_schema(SECTION_KEYS)
+
+
+def teardown_response_format(schema=TEARDOWN_SCHEMA, name="product_teardown"):
+    """`response_format` payload for chat.completions.create (strict JSON-schema mode)."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+_TYPES = {"object": dict, "array": list, "string": str}
+
+
+def _validate(value, schema, path, errors):
+    expected = schema.get("type")
+    if expected in _TYPES and not isinstance(value, _TYPES[expected]):
+        errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+        return
+    if expected == "object":
+        props = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: missing")
+        if schema.get("additionalProperties") is False:
+            for key in value:
+                if key not in props:
+                    errors.append(f"{path}.{key}: unexpected key")
+        for key, sub in props.items():
+            if key in value:
+                _validate(value[key], sub, f"{path}.{key}", errors)
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            _validate(item, schema["items"], f"{path}[{i}]", errors)
+
+
+def validate_teardown(td, schema=TEARDOWN_SCHEMA):
+    """Returns a list of human-readable errors ("$.kpis.north_star: missing"); empty means valid."""
+    errors = []
+    _validate(td, schema, "$", errors)
+    return errors
+
+
+def invalid_sections(td):
+    """
+    Section keys that are missing, mistyped or empty in `td`, in prompt order.
+    Empty sections count as broken because they render as blank panes.
+    """
+    broken = []
+    for key in SECTION_KEYS:
+        value = td.get(key) if isinstance(td, dict) else None
+        errors = []
+        if value is not None:
+            _validate(value, SECTION_SCHEMAS[key], f"$.{key}", errors)
+        if value is None or errors or not value:
+            broken.append(key)
+    return broken
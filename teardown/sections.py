@@ -0,0 +1,81 @@
+# teardown/sections.py
+"""
+Section-parallel teardown generation.
+
+Rather than one giant completion for all eight sections, fan out one small
+prompt per section concurrently and assemble the results into the usual
+teardown dict. Wall-clock time is bounded by the slowest *section* instead of
+the whole document, and a malformed section is retried on its own.
+"""
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from teardown.llm import LLMCallError, call_llm
+from teardown.parsing import extract_json
+from teardown.prompts import SECTION_KEYS, build_sections_messages
+from teardown.ratelimit import section_completion_tokens
+from teardown.schema import invalid_sections, sections_schema, teardown_response_format
+from teardown.tracing import annotate, traced
+
+logger = logging.getLogger(__name__)
+
+
+@traced("teardown.section")
+def generate_section(key, product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                     client, model="gpt-4o-mini", temperature=0.2, structured=False, tries=2, section_tries=2, policy=None):
+    """
+    Returns (value, raw) for a single section, or (None, raw) if it never validated.
+    `tries` is the per-call network retry budget, `section_tries` how many times an
+    invalid section is regenerated.
+    """
+    annotate(section=key)
+    messages = build_sections_messages(product_text, industry_key, depth, [key], include_user_flow, include_metrics, include_templates)
+    response_format = teardown_response_format(sections_schema([key]), name=f"teardown_{key}") if structured else None
+    raw = None
+    for attempt in range(section_tries):
+        raw = call_llm(client, messages, model=model, temperature=temperature, tries=tries, response_format=response_format, policy=policy,
+                       completion_tokens=section_completion_tokens(1))
+        parsed = extract_json(raw) if raw else None
+        if isinstance(parsed, dict) and key in parsed and key not in invalid_sections({key: parsed[key]}):
+            return parsed[key], raw
+        logger.info("section %s invalid on attempt %d, retrying", key, attempt + 1)
+    return None, raw
+
+
+def generate_sections(product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                      client, model="gpt-4o-mini", temperature=0.2, structured=False, tries=2, section_tries=2,
+                      keys=SECTION_KEYS, max_workers=None, on_section=None, on_error=None, policy=None):
+    """
+    Generates every section concurrently. Returns (teardown, raw) where raw is a
+    JSON object mapping section key -> raw model text. Sections that failed are
+    left out of the teardown; on_error receives each LLMCallError.
+    """
+    if client is None:
+        return {}, None
+    td, raws = {}, {}
+    with ThreadPoolExecutor(max_workers=max_workers or len(keys)) as pool:
+        futures = {
+            # copy the caller's context so usage is attributed to its session
+            pool.submit(contextvars.copy_context().run, generate_section, key, product_text, industry_key, depth, include_user_flow, include_metrics, include_templates,
+                        client, model, temperature, structured, tries, section_tries, policy): key
+            for key in keys
+        }
+        for fut in as_completed(futures):
+            key = futures[fut]
+            try:
+                value, raws[key] = fut.result()
+            except LLMCallError as e:
+                if on_error is not None:
+                    on_error(e)
+                else:
+                    logger.error("section %s: %s", key, e)
+                continue
+            if value is not None:
+                td[key] = value
+                if on_section is not None:
+                    on_section(key, value)
+    # keep the usual section order regardless of completion order
+    td = {key: td[key] for key in keys if key in td}
+    return td, json.dumps(raws, ensure_ascii=False)
@@ -0,0 +1,353 @@
+# teardown/server.py
+"""
+HTTP API for the teardown engine (ASGI: Starlette + uvicorn).
+
+    python -m teardown.server --port 8000 --concurrency 8 --queue 64
+
+    POST /teardown  {"product": "Google Pay", "features": "UPI, rewards", "depth": "Deep (comprehensive)"}
+    POST /compare   {"products": ["Google Pay", "PhonePe", {"product": "Paytm", "features": "..."}]}
+    GET  /health, GET /stats
+
+Optional settings in either body: industry, depth, include_user_flow,
+include_metrics, include_templates, model, temperature, structured, mode,
+use_cache, reuse_similar, markdown (add a Markdown export) and session
+(usage attribution). Requests go through generate_teardown, so the teardown
+cache, near-duplicate reuse and single-flight coalescing all apply.
+
+Add "stream": true (or send Accept: text/event-stream) for server-sent
+events: `section` as each section completes, `product` as each teardown is
+ready (or `error`), then `done` (with the comparison matrix for /compare).
+
+At most `concurrency` teardowns run at once; further ones wait, and a request
+that would take more than `queue` waiting teardowns gets 503 with Retry-After
+(a /compare request counts one per product).
+
+Starlette and uvicorn are installed with recent Streamlit releases
+(otherwise: pip install starlette uvicorn).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from teardown.cache import TeardownCache
+from teardown.generate import GENERATION_MODES, TeardownParseError, generate_teardown, raise_error
+from teardown.llm import LLMCallError
+from teardown.prompts import DEPTH_LEVELS, INDUSTRY_TEMPLATES
+from teardown.providers import Router, client_from_env
+from teardown.ratelimit import configure as configure_rate_limiter
+from teardown.render import comparison_rows, markdown_from_teardown
+from teardown.retry import RetryPolicy
+from teardown.similar import SimilarityIndex
+from teardown.tracing import configure as configure_tracing
+from teardown.usage import tracker as usage_tracker, usage_session
+
+try:
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+except ImportError:  # optional: only needed to serve the API
+    Starlette = None
+
+logger = logging.getLogger("teardown.server")
+
+DEFAULTS = {
+    "industry": "General / Consumer",
+    "depth": "Standard (detailed)",
+    "include_user_flow": True,
+    "include_metrics": True,
+    "include_templates": True,
+    "model": "gpt-4o-mini",
+    "temperature": 0.2,
+    "structured": True,
+    "mode": "single",
+    "use_cache": True,
+    "reuse_similar": True,
+    "markdown": False,
+}
+SIDES = "ABCDEFGH"
+FLAGS = [key for key, value in DEFAULTS.items() if isinstance(value, bool)]
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def parse_settings(body):
+    settings = dict(DEFAULTS)
+    settings.update({key: body[key] for key in DEFAULTS if key in body})
+    for key in FLAGS:
+        # "false" is truthy: only JSON booleans are accepted
+        if not isinstance(settings[key], bool):
+            raise BadRequest(f"{key} must be true or false")
+    if settings["industry"] not in INDUSTRY_TEMPLATES:
+        raise BadRequest(f"unknown industry {settings['industry']!r}; one of: {', '.join(INDUSTRY_TEMPLATES)}")
+    if settings["depth"] not in DEPTH_LEVELS:
+        raise BadRequest(f"unknown depth {settings['depth']!r}; one of: {', '.join(DEPTH_LEVELS)}")
+    if settings["mode"] not in GENERATION_MODES:
+        raise BadRequest(f"unknown mode {settings['mode']!r}; one of: {', '.join(GENERATION_MODES)}")
+    if not isinstance(settings["model"], str) or not settings["model"]:
+        raise BadRequest("model must be a non-empty string")
+    try:
+        settings["temperature"] = float(settings["temperature"])
+    except (TypeError, ValueError):
+        raise BadRequest("temperature must be a number")
+    if not 0.0 <= settings["temperature"] <= 2.0:
+        raise BadRequest("temperature must be between 0 and 2")
+    return settings
+
+
+def parse_product(item):
+    """A product as "name" or {"product": name, "features": ...} -> (name, features)."""
+    if isinstance(item, str):
+        name, features = item, ""
+    elif isinstance(item, dict):
+        name, features = item.get("product") or "", item.get("features") or ""
+    else:
+        raise BadRequest("a product is a string or an object with 'product' (and optional 'features')")
+    if not isinstance(name, str) or not name.strip() or not isinstance(features, str):
+        raise BadRequest("every product needs a non-empty 'product' string")
+    return name.strip(), features.strip()
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+class TeardownService:
+    """Runs generate_teardown on a bounded thread pool for the async endpoints."""
+
+    def __init__(self, client, cache=None, similar=None, retry_policy=None, concurrency=4, queue_size=32):
+        self.client = client
+        self.cache = cache
+        self.similar = similar
+        self.retry_policy = retry_policy
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._slots = asyncio.Semaphore(concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="teardown-api")
+        self.counters = {"pending": 0, "running": 0, "served": 0, "failed": 0, "rejected": 0}
+
+    def admit(self, teardowns=1):
+        """
+        Takes slots for a request's `teardowns`; False when they would make more than
+        `queue_size` teardowns wait. A request larger than the whole limit still runs
+        when nothing else is pending.
+        """
+        pending = self.counters["pending"]
+        if pending and pending + teardowns > self.concurrency + self.queue_size:
+            self.counters["rejected"] += 1
+            return False
+        self.counters["pending"] += teardowns
+        return True
+
+    def release(self, teardowns=1, ok=True):
+        self.counters["pending"] -= teardowns
+        self.counters["served" if ok else "failed"] += 1
+
+    async def generate(self, name, features, settings, session=None, on_section=None):
+        """One teardown, at most `concurrency` at a time; returns a result dict. Raises LLMCallError / ValueError."""
+        loop = asyncio.get_running_loop()
+        reused, suggested = {}, []
+
+        def emit(key, value):
+            loop.call_soon_threadsafe(on_section, key, value)
+
+        def run():
+            with usage_session(session):
+                td, _ = generate_teardown(
+                    name + ("\n\n" + features if features else ""), settings["industry"], settings["depth"],
+                    settings["include_user_flow"], settings["include_metrics"], settings["include_templates"],
+                    settings["model"], settings["temperature"], client=self.client, cache=self.cache,
+                    use_cache=settings["use_cache"], on_section=emit if on_section is not None else None,
+                    on_error=raise_error, fallback=False, structured=settings["structured"], mode=settings["mode"],
+                    retry_policy=self.retry_policy, similar=self.similar if settings["reuse_similar"] else None,
+                    on_reuse=lambda match: reused.update(product=match["product"], score=match["score"]),
+                    on_suggest=lambda matches: suggested.extend({"product": m["product"], "score": m["score"]} for m in matches),
+                )
+            if td is None:
+                raise TeardownParseError()
+            return td
+
+        started = time.time()
+        async with self._slots:
+            self.counters["running"] += 1
+            try:
+                # copy the context so usage_session and tracing reach the worker thread
+                td = await loop.run_in_executor(self._executor, contextvars.copy_context().run, run)
+            finally:
+                self.counters["running"] -= 1
+        result = {"product": name, "teardown": td, "reused": reused or None, "suggested": suggested or None, "seconds": round(time.time() - started, 3)}
+        if settings["markdown"]:
+            result["markdown"] = markdown_from_teardown(td, name)
+        return result
+
+    async def stream(self, products, settings, session=None, compare=False):
+        """SSE for [(side, name, features)]; releases the request slot when the stream ends or the client goes away."""
+        events = asyncio.Queue()
+
+        async def one(side, name, features):
+            def on_section(key, value):
+                events.put_nowait(("section", {"side": side, "product": name, "key": key, "value": value}))
+            try:
+                result = await self.generate(name, features, settings, session, on_section)
+                events.put_nowait(("product", dict(result, side=side)))
+            except (LLMCallError, ValueError) as e:
+                events.put_nowait(("error", {"side": side, "product": name, "error": str(e)}))
+
+        tasks = [asyncio.create_task(one(*product)) for product in products]
+        teardowns, ok = {}, True
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event, data = await events.get()
+                if event in ("product", "error"):
+                    remaining -= 1
+                    ok = ok and event == "product"
+                    if event == "product":
+                        teardowns[data["product"]] = data["teardown"]
+                yield sse(event, data)
+            done = {"ok": ok}
+            if compare:
+                done["matrix"] = comparison_rows(teardowns)
+            yield sse("done", done)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.release(len(products), ok)
+
+
+def create_app(service):
+    if Starlette is None:
+        raise RuntimeError("the HTTP API needs starlette and uvicorn: pip install starlette uvicorn")
+
+    async def read_body(request):
+        try:
+            body = json.loads(await request.body() or b"{}")
+        except ValueError:
+            raise BadRequest("body must be JSON")
+        if not isinstance(body, dict):
+            raise BadRequest("body must be a JSON object")
+        return body
+
+    def wants_stream(request, body):
+        return body.get("stream", False) or "text/event-stream" in request.headers.get("accept", "")
+
+    def busy():
+        return JSONResponse({"error": "too many queued requests, retry shortly"}, status_code=503, headers={"retry-after": "5"})
+
+    async def handle(request, compare):
+        try:
+            body = await read_body(request)
+            settings = parse_settings(body)
+            if compare:
+                items = body.get("products")
+                if not isinstance(items, list) or not 2 <= len(items) <= len(SIDES):
+                    raise BadRequest(f"'products' must list 2 to {len(SIDES)} products")
+                products = [(side, *parse_product(item)) for side, item in zip(SIDES, items)]
+            else:
+                products = [("A", *parse_product(body))]
+            if not isinstance(body.get("stream", False), bool):
+                raise BadRequest("stream must be true or false")
+        except BadRequest as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        session = body.get("session") or request.headers.get("x-session")
+        if not service.admit(len(products)):
+            return busy()
+        if wants_stream(request, body):
+            return StreamingResponse(service.stream(products, settings, session, compare), media_type="text/event-stream",
+                                     headers={"cache-control": "no-cache", "x-accel-buffering": "no"})
+        ok = False
+        try:
+            results = await asyncio.gather(*(service.generate(name, features, settings, session) for _, name, features in products),
+                                           return_exceptions=True)
+            ok = not any(isinstance(r, BaseException) for r in results)
+        finally:
+            service.release(len(products), ok)
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, (LLMCallError, ValueError)):
+                raise result
+        if not compare:
+            if not ok:
+                return JSONResponse({"error": str(results[0])}, status_code=502)
+            return JSONResponse(results[0])
+        entries = [dict(result, side=side) if not isinstance(result, BaseException) else {"side": side, "product": name, "error": str(result)}
+                   for (side, name, _), result in zip(products, results)]
+        if not any("teardown" in e for e in entries):
+            return JSONResponse({"error": "every teardown failed", "products": entries}, status_code=502)
+        matrix = comparison_rows({e["product"]: e["teardown"] for e in entries if "teardown" in e})
+        return JSONResponse({"products": entries, "matrix": matrix})
+
+    async def teardown(request):
+        return await handle(request, compare=False)
+
+    async def compare(request):
+        return await handle(request, compare=True)
+
+    async def health(request):
+        return JSONResponse({"ok": True})
+
+    async def stats(request):
+        return JSONResponse({
+            "requests": dict(service.counters),
+            "concurrency": service.concurrency,
+            "queue": service.queue_size,
+            "cache": service.cache.stats() if service.cache is not None else None,
+            "usage_today": usage_tracker.day_summary(),
+            "providers": service.client.snapshot() if isinstance(service.client, Router) else None,
+        })
+
+    return Starlette(routes=[
+        Route("/teardown", teardown, methods=["POST"]),
+        Route("/compare", compare, methods=["POST"]),
+        Route("/health", health),
+        Route("/stats", stats),
+    ])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for product teardowns.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=4, help="teardowns generated at the same time")
+    parser.add_argument("--queue", type=int, default=32, help="teardowns allowed to wait before new requests get 503")
+    parser.add_argument("--tries", type=int, default=3, help="attempts per LLM call")
+    parser.add_argument("--deadline", type=float, default=None, help="seconds one LLM call may take, retries included")
+    parser.add_argument("--rate-state", default=None, help="JSON file shared with other processes so they draw from one rate budget")
+    parser.add_argument("--usage-log", default=None, help="append every LLM call to this JSONL file")
+    parser.add_argument("--trace", default=None, help="append stage timing spans to this OTLP/JSON lines file")
+    parser.add_argument("--providers", default=None, help="JSON list of LLM providers to route between (see teardown/providers.py); default: OpenAI via OPENAI_API_KEY")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="don't read or write the shared teardown cache")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    try:
+        import uvicorn
+    except ImportError:
+        logger.error("the HTTP API needs starlette and uvicorn: pip install starlette uvicorn")
+        return 2
+    workers = max(1, args.concurrency)
+    client = client_from_env(args.providers, max_connections=workers, max_keepalive_connections=workers)
+    if client is None:
+        logger.error("OPENAI_API_KEY is not set (or pass --providers)")
+        return 2
+    configure_rate_limiter(state_path=args.rate_state)
+    configure_tracing(args.trace)
+    usage_tracker.configure(args.usage_log)
+    cache = TeardownCache() if args.cache else None
+    service = TeardownService(client, cache, SimilarityIndex() if cache is not None else None,
+                              RetryPolicy(max_attempts=args.tries, deadline=args.deadline),
+                              concurrency=workers, queue_size=max(0, args.queue))
+    uvicorn.run(create_app(service), host=args.host, port=args.port, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
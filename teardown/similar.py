@@ -0,0 +1,219 @@
+# teardown/similar.py
+"""
+Near-duplicate lookup for product inputs.
+
+"Google Pay", "GPay" and "google pay app" hash to different cache keys, so
+each would pay for a fresh LLM call. This index remembers the product name
+(first line of the input) and optional feature notes of every cached
+teardown, and finds a stored one whose name is close enough:
+
+- names are normalized (case, punctuation, filler words like "app") and
+  compared in compact form ("Google-Pay app" is "Google Pay");
+- otherwise character-trigram MinHash signatures are bucketed with LSH bands
+  for candidate retrieval, and candidates are re-scored by exact Jaccard.
+
+A short form ("GPay") and the full name it may abbreviate ("googlepay") are
+only ever *suggested* (suggest()), never returned by lookup(): "GPay" could
+just as well be "Gold Pay", so reusing one for the other is left to the user.
+
+Feature notes, when present on either side, must overlap as well. Lookups
+are scoped (industry, depth, model, flags ...), so only a teardown generated
+with the same settings is ever reused.
+"""
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+from teardown.cache import DATA_DIR
+
+DEFAULT_PATH = os.path.join(DATA_DIR, "similar.sqlite3")
+DEFAULT_THRESHOLD = 0.8
+FEATURE_THRESHOLD = 0.5
+# an abbreviation can't tell "Gold Pay" from "Google Pay" ("gpay"), so it is only suggested
+ABBREVIATION_SCORE = 0.9
+
+# words that don't change which product is meant
+FILLER = {"app", "apps", "application", "the", "official", "mobile", "android", "ios", "inc", "ltd", "llc", "by", "online"}
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs with Jaccard >= ~0.6 almost always share a bucket
+_PRIME = (1 << 61) - 1
+_rng = random.Random(1729)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+
+def split_product(product_text):
+    """(name, features) from an input built as name + blank line + pasted features."""
+    name, _, features = (product_text or "").strip().partition("\n")
+    return name.strip(), features.strip()
+
+
+def normalize_name(name):
+    words = [w for w in re.findall(r"[a-z0-9]+", (name or "").lower()) if w not in FILLER]
+    return " ".join(words)
+
+
+def name_aliases(name):
+    """
+    (full, shorts): the compact name and its abbreviations,
+    'Google Pay' -> ('googlepay', {'gpay'}), 'Bank of America' -> ('bankofamerica', {'boamerica', 'boa'}).
+    """
+    words = normalize_name(name).split()
+    if not words:
+        return "", set()
+    full = "".join(words)
+    shorts = set()
+    if len(words) >= 2:
+        # abbreviated leading words + last word ("GPay"); too-short forms are ambiguous
+        short = "".join(w[0] for w in words[:-1]) + words[-1]
+        if len(short) >= 4:
+            shorts.add(short)
+    if len(words) >= 3:
+        shorts.add("".join(w[0] for w in words))
+    shorts.discard(full)
+    return full, shorts
+
+
+def shingles(text, n=3):
+    compact = f" {text.replace(' ', '')} "
+    return {compact[i:i + n] for i in range(max(1, len(compact) - n + 1))}
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def minhash(items):
+    hashes = [struct.unpack("<Q", hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest())[0] for s in items]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMS]
+
+
+def lsh_buckets(signature):
+    rows = NUM_PERM // BANDS
+    return [(band, hashlib.blake2b(repr(signature[band * rows:(band + 1) * rows]).encode(), digest_size=8).hexdigest())
+            for band in range(BANDS)]
+
+
+class SimilarityIndex:
+    def __init__(self, path=DEFAULT_PATH, threshold=DEFAULT_THRESHOLD, feature_threshold=FEATURE_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.feature_threshold = feature_threshold
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS products (
+                    key TEXT PRIMARY KEY,
+                    scope TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    features TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS aliases (scope TEXT NOT NULL, alias TEXT NOT NULL, full INTEGER NOT NULL, key TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_aliases ON aliases(scope, alias);
+                CREATE TABLE IF NOT EXISTS buckets (scope TEXT NOT NULL, band INTEGER NOT NULL, bucket TEXT NOT NULL, key TEXT NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_buckets ON buckets(scope, band, bucket);
+                """
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add(self, product_text, scope, key):
+        """Remembers that the teardown cached under `key` was generated for `product_text` within `scope`."""
+        name, features = split_product(product_text)
+        normalized = normalize_name(name)
+        if not normalized:
+            return
+        with self._lock, self._connect() as conn:
+            self._remove(conn, key)
+            conn.execute("INSERT INTO products (key, scope, name, features, created_at) VALUES (?, ?, ?, ?, ?)",
+                         (key, scope, normalized, features, time.time()))
+            full, shorts = name_aliases(name)
+            conn.executemany("INSERT INTO aliases (scope, alias, full, key) VALUES (?, ?, ?, ?)",
+                             [(scope, full, 1, key)] + [(scope, short, 0, key) for short in shorts])
+            conn.executemany("INSERT INTO buckets (scope, band, bucket, key) VALUES (?, ?, ?, ?)",
+                             [(scope, band, bucket, key) for band, bucket in lsh_buckets(minhash(shingles(normalized)))])
+
+    def _remove(self, conn, key):
+        for table in ("products", "aliases", "buckets"):
+            conn.execute(f"DELETE FROM {table} WHERE key = ?", (key,))
+
+    def remove(self, key):
+        with self._lock, self._connect() as conn:
+            self._remove(conn, key)
+
+    def lookup(self, product_text, scope, exclude=()):
+        """
+        Best stored match for `product_text` within `scope` that is safe to reuse, as a dict
+        with key, product (the stored normalized name), score and kind ("exact" for the same
+        compact name, "similar" for a close spelling), or None if nothing is close enough.
+        """
+        matches = [m for m in self._matches(product_text, scope, exclude) if m["kind"] != "abbreviation"]
+        return max(matches, key=lambda m: m["score"]) if matches else None
+
+    def suggest(self, product_text, scope, exclude=()):
+        """Stored products `product_text` may abbreviate or be abbreviated by, best first (kind "abbreviation")."""
+        return [m for m in self._matches(product_text, scope, exclude) if m["kind"] == "abbreviation"]
+
+    def _matches(self, product_text, scope, exclude):
+        """Every stored product within `scope` scoring at least the threshold, best first."""
+        name, features = split_product(product_text)
+        normalized = normalize_name(name)
+        if not normalized:
+            return []
+        full, shorts = name_aliases(name)
+        query_shingles = shingles(normalized)
+        with self._lock, self._connect() as conn:
+            # our full name vs any stored spelling, or our short forms vs stored full names
+            alias_hits = {row[0] for row in conn.execute(
+                f"SELECT key FROM aliases WHERE scope = ? AND (alias = ? OR (full = 1 AND alias IN ({','.join('?' * len(shorts)) or 'NULL'})))",
+                [scope, full, *shorts],
+            )}
+            candidates = set(alias_hits)
+            for band, bucket in lsh_buckets(minhash(query_shingles)):
+                candidates.update(row[0] for row in conn.execute(
+                    "SELECT key FROM buckets WHERE scope = ? AND band = ? AND bucket = ?", (scope, band, bucket)))
+            candidates.difference_update(exclude)
+            if not candidates:
+                return []
+            rows = conn.execute(
+                f"SELECT key, name, features FROM products WHERE key IN ({','.join('?' * len(candidates))})",
+                list(candidates),
+            ).fetchall()
+        matches = []
+        for key, stored_name, stored_features in rows:
+            if stored_name.replace(" ", "") == full:
+                score, kind = 1.0, "exact"
+            else:
+                score, kind = jaccard(query_shingles, shingles(stored_name)), "similar"
+                if key in alias_hits and score < ABBREVIATION_SCORE:
+                    score, kind = ABBREVIATION_SCORE, "abbreviation"
+            if score < self.threshold:
+                continue
+            if (features or stored_features) and jaccard(set(re.findall(r"\w+", features.lower())),
+                                                         set(re.findall(r"\w+", stored_features.lower()))) < self.feature_threshold:
+                continue
+            matches.append({"key": key, "product": stored_name, "score": round(score, 3), "kind": kind})
+        return sorted(matches, key=lambda m: -m["score"])
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            for table in ("products", "aliases", "buckets"):
+                conn.execute(f"DELETE FROM {table}")
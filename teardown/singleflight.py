@@ -0,0 +1,79 @@
+# teardown/singleflight.py
+"""
+Request coalescing ("single-flight") for identical in-flight work.
+
+When several sessions ask for the same teardown at the same moment (same prompt
+hash and model parameters), only the first caller runs the LLM call; the others
+wait for it and receive the same result. The leader may also publish progress
+events (streamed sections), which are fanned out to every waiting caller, with
+a replay for callers that join late.
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.lock = threading.RLock()
+        self.events = []
+        self.listeners = []
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+    def publish(self, event):
+        with self.lock:
+            self.events.append(event)
+            for listener in list(self.listeners):
+                listener(event)
+
+    def join(self, listener):
+        with self.lock:
+            for event in self.events:
+                listener(event)
+            self.listeners.append(listener)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, listener=None):
+        """
+        Runs fn(publish) once per key among concurrent callers and returns
+        (result, shared). `shared` is True for callers that reused another
+        caller's in-flight work. Exceptions from fn are raised to every caller.
+        listener(event) receives events published by the leader via publish().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            call.waiters += 1
+        if listener is not None:
+            call.join(listener)
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn(call.publish)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        with self._lock:
+            return {key: call.waiters for key, call in self._calls.items()}
+
+
+# process-wide instance shared by every Streamlit session and worker thread
+default_flight = SingleFlight()
@@ -0,0 +1,84 @@
+# teardown/streaming.py
+"""
+Incremental parsing of a streamed JSON teardown.
+
+The model streams one JSON object token by token. IncrementalJSONParser is fed
+those chunks and hands back each top-level (key, value) pair as soon as the
+value is complete, so the UI can render `one_pager` while `swot` is still being
+written. It never re-scans a section that has already been emitted.
+"""
+import json
+
+_WS = " \t\r\n"
+# a chunk without any of these cannot complete a key or a value
+_CLOSERS = set('"}],')
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.started = False
+        self.done = False
+        self.sections = {}
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk):
+        """Append streamed text; return the list of (key, value) pairs completed by it."""
+        self.buffer += chunk
+        if self.done or (self.started and not _CLOSERS.intersection(chunk)):
+            return []
+        completed = list(self._drain())
+        self.sections.update(completed)
+        return completed
+
+    def _skip(self, i, chars):
+        buf = self.buffer
+        while i < len(buf) and buf[i] in chars:
+            i += 1
+        return i
+
+    def _drain(self):
+        buf = self.buffer
+        if not self.started:
+            # tolerate ```json fences or chatter before the object
+            start = buf.find("{", self.pos)
+            if start == -1:
+                self.pos = len(buf)
+                return
+            self.started = True
+            self.pos = start + 1
+        while True:
+            i = self._skip(self.pos, _WS + ",")
+            if i >= len(buf):
+                return
+            if buf[i] == "}":
+                self.done = True
+                self.pos = i + 1
+                return
+            if buf[i] != '"':
+                # not a key: malformed stream, leave the rest to extract_json
+                self.done = True
+                return
+            try:
+                key, end = self._decoder.raw_decode(buf, i)
+            except ValueError:
+                return
+            j = self._skip(end, _WS)
+            if j >= len(buf):
+                return
+            if buf[j] != ":":
+                self.done = True
+                return
+            k = self._skip(j + 1, _WS)
+            if k >= len(buf):
+                return
+            try:
+                value, vend = self._decoder.raw_decode(buf, k)
+            except ValueError:
+                return
+            if buf[k] not in '{["' and vend >= len(buf):
+                # a bare number/literal may still be growing
+                return
+            self.pos = vend
+            yield key, value
@@ -0,0 +1,210 @@
+# teardown/tracing.py
+"""
+Lightweight tracing for the teardown hot path.
+
+    with span("parse.extract_json", chars=len(raw)):
+        ...
+
+    @traced("render.markdown")
+    def markdown_from_teardown(...): ...
+
+Spans nest through a contextvar (copy the context into worker threads to keep
+the parent link, as teardown.sections does), record wall time and attributes,
+and are kept in a bounded in-memory buffer with per-stage totals. Recording is
+always on; it costs a couple of object allocations per stage.
+
+configure(path) additionally appends every finished span to `path` as one
+OTLP/JSON `ExportTraceServiceRequest` per line, the format OpenTelemetry's
+file exporter and the collector's `otlpjsonfile` receiver use, so traces can be
+loaded into Jaeger/Tempo/etc. without the OpenTelemetry SDK installed here.
+"""
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SERVICE_NAME = "product-teardown"
+
+_current = contextvars.ContextVar("teardown_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "end_ns", "error", "_t0")
+
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._t0 = time.perf_counter_ns()
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def _end(self):
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._t0)
+
+    @property
+    def duration_s(self):
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e9
+
+    def to_dict(self):
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start_ns": self.start_ns, "duration_s": round(self.duration_s, 6), "attributes": self.attributes,
+                "error": self.error}
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_json(spans, service_name=SERVICE_NAME):
+    """Spans as an OTLP/JSON ExportTraceServiceRequest dict."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "teardown"},
+            "spans": [{
+                "traceId": s.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            } for s in spans],
+        }],
+    }]}
+
+
+class FileSpanExporter:
+    """Appends each finished span to `path` as one OTLP/JSON line."""
+
+    def __init__(self, path, service_name=SERVICE_NAME):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        line = json.dumps(otlp_json(spans, self.service_name))
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    def __init__(self, max_spans=5000, exporter=None):
+        self.exporter = exporter
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self._totals = {}
+
+    @contextmanager
+    def span(self, name, parent=None, **attributes):
+        """Runs the block inside a new span, a child of `parent` or else of the current span."""
+        s = Span(name, parent if parent is not None else _current.get(), attributes)
+        token = _current.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s._end()
+            _current.reset(token)
+            self._finish(s)
+
+    def start(self, name, parent=None, **attributes):
+        """A span that is not made current, for work that can't sit inside one `with` block; close it with end()."""
+        return Span(name, parent if parent is not None else _current.get(), attributes)
+
+    def end(self, s):
+        s._end()
+        self._finish(s)
+
+    def _finish(self, s):
+        with self._lock:
+            self._spans.append(s)
+            totals = self._totals.setdefault(s.name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            totals["count"] += 1
+            totals["total_s"] += s.duration_s
+            totals["max_s"] = max(totals["max_s"], s.duration_s)
+        exporter = self.exporter
+        if exporter is not None:
+            exporter.export([s])
+
+    def spans(self, trace_id=None):
+        with self._lock:
+            return [s for s in self._spans if trace_id is None or s.trace_id == trace_id]
+
+    def stage_summary(self, trace_id=None):
+        """{span name: {"count", "total_s", "max_s"}} for one trace, or for everything recorded so far."""
+        if trace_id is None:
+            with self._lock:
+                return {name: dict(t) for name, t in self._totals.items()}
+        summary = {}
+        for s in self.spans(trace_id):
+            totals = summary.setdefault(s.name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            totals["count"] += 1
+            totals["total_s"] += s.duration_s
+            totals["max_s"] = max(totals["max_s"], s.duration_s)
+        return summary
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._totals.clear()
+
+
+# process-wide tracer used by span() / traced()
+tracer = Tracer()
+
+
+def configure(path=None):
+    """Exports every span to an OTLP/JSON lines file at `path` (None stops exporting)."""
+    tracer.exporter = FileSpanExporter(path) if path else None
+    return tracer
+
+
+def span(name, parent=None, **attributes):
+    return tracer.span(name, parent=parent, **attributes)
+
+
+def current_span():
+    return _current.get()
+
+
+def annotate(**attributes):
+    """Adds attributes to the innermost open span (no-op outside one)."""
+    s = _current.get()
+    if s is not None:
+        s.set(**attributes)
+
+
+def traced(name):
+    """Decorator: runs the function inside span(name)."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
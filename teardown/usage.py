@@ -0,0 +1,153 @@
+# teardown/usage.py
+"""
+Token, cost and latency accounting for LLM calls.
+
+call_llm / stream_llm record one entry per call: model, prompt / completion /
+cached prompt tokens, latency (retries and rate-limit waits included), retry
+count, estimated cost and success. Entries are aggregated per session (set with
+usage_session) and per day, kept in a bounded in-memory log for export, and
+optionally appended to a JSONL metrics file.
+
+Cached tokens come from `usage.prompt_tokens_details.cached_tokens`, i.e.
+provider prefix-cache hits (see the static-first prompt layout in prompts.py).
+"""
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# USD per 1M tokens: (input, cached input, output)
+PRICING = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+
+_session = contextvars.ContextVar("teardown_usage_session", default="default")
+
+
+@contextmanager
+def usage_session(session_id):
+    """Attributes every call made inside the block (same thread/context) to `session_id`."""
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session():
+    return _session.get()
+
+
+def _get(obj, name, default=None):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def cached_prompt_tokens(usage):
+    return _get(_get(usage, "prompt_tokens_details"), "cached_tokens", 0) or 0
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens=0):
+    """USD cost from PRICING; unknown models cost 0 (e.g. local servers)."""
+    price = PRICING.get(model)
+    if price is None:
+        return 0.0
+    input_price, cached_price, output_price = price
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def _empty_totals():
+    return {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "cached_tokens": 0, "cost_usd": 0.0, "latency_s": 0.0, "calls_with_cache_hits": 0}
+
+
+def _summarize(totals):
+    out = dict(totals)
+    calls = totals["calls"]
+    out["avg_latency_s"] = totals["latency_s"] / calls if calls else 0.0
+    out["prompt_cache_hit_rate"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+    return out
+
+
+class UsageTracker:
+    def __init__(self, path=None, max_records=10_000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._by_session = {}
+        self._by_day = {}
+        self._by_model = {}
+
+    def configure(self, path):
+        """Also append every record to the JSONL file at `path` (None to stop)."""
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+
+    def record(self, model, usage=None, latency_s=0.0, retries=0, ok=True, session=None):
+        prompt_tokens = _get(usage, "prompt_tokens", 0) or 0
+        completion_tokens = _get(usage, "completion_tokens", 0) or 0
+        cached = cached_prompt_tokens(usage)
+        entry = {
+            "ts": time.time(),
+            "day": datetime.date.today().isoformat(),
+            "session": session or current_session(),
+            "model": model,
+            "ok": ok,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "cached_tokens": cached,
+            "latency_s": round(latency_s, 3),
+            "retries": retries,
+            "cost_usd": estimate_cost(model, prompt_tokens, completion_tokens, cached),
+        }
+        with self._lock:
+            self._records.append(entry)
+            for index, key in ((self._by_session, entry["session"]), (self._by_day, entry["day"]), (self._by_model, model)):
+                totals = index.setdefault(key, _empty_totals())
+                totals["calls"] += 1
+                totals["errors"] += 0 if ok else 1
+                totals["retries"] += retries
+                totals["prompt_tokens"] += prompt_tokens
+                totals["completion_tokens"] += completion_tokens
+                totals["cached_tokens"] += cached
+                totals["cost_usd"] += entry["cost_usd"]
+                totals["latency_s"] += latency_s
+                totals["calls_with_cache_hits"] += 1 if cached else 0
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+        return entry
+
+    def session_summary(self, session_id):
+        with self._lock:
+            return _summarize(self._by_session.get(session_id, _empty_totals()))
+
+    def day_summary(self, day=None):
+        day = day or datetime.date.today().isoformat()
+        with self._lock:
+            return _summarize(self._by_day.get(day, _empty_totals()))
+
+    def model_summaries(self):
+        with self._lock:
+            return {model: _summarize(t) for model, t in self._by_model.items()}
+
+    def records(self, session_id=None):
+        with self._lock:
+            return [r for r in self._records if session_id is None or r["session"] == session_id]
+
+    def export_jsonl(self, session_id=None):
+        return "".join(json.dumps(r) + "\n" for r in self.records(session_id))
+
+
+# process-wide tracker, fed by call_llm / stream_llm
+tracker = UsageTracker()
@@ -0,0 +1,63 @@
+import pytest
+
+from teardown import cache as cache_module
+from teardown.cache import TeardownCache, make_cache_key
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_key_depends_on_prompt_model_and_params():
+    key = make_cache_key("prompt", "gpt-4o-mini", 0.2)
+    assert key == make_cache_key("prompt", "gpt-4o-mini", 0.2000001)
+    assert key != make_cache_key("prompt", "gpt-4o", 0.2)
+    assert key != make_cache_key("prompt", "gpt-4o-mini", 0.2, structured=True)
+    assert key != make_cache_key([{"role": "user", "content": "prompt"}], "gpt-4o-mini", 0.2)
+
+
+def test_round_trip(tmp_path):
+    cache = TeardownCache(str(tmp_path / "cache.sqlite3"))
+    assert cache.get("k") is None
+    cache.put("k", {"strategy": ["a"]}, '{"strategy": ["a"]}')
+    assert cache.get("k") == ({"strategy": ["a"]}, '{"strategy": ["a"]}')
+    assert cache.stats()["entries"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = TeardownCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.put("k", {"strategy": ["a"]}, None)
+    clock.now += 59
+    assert cache.get("k") is not None
+    clock.now += 2
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted_over_budget(tmp_path, clock):
+    td = {"strategy": ["x" * 100]}
+    path = str(tmp_path / "cache.sqlite3")
+    TeardownCache(path).put("probe", td, None)
+    size = TeardownCache(path).stats()["bytes"]
+    cache = TeardownCache(path, max_bytes=2 * size)
+    cache.clear()
+    for key in ("a", "b"):
+        clock.now += 1
+        cache.put(key, td, None)
+    clock.now += 1
+    cache.get("a")  # "b" is now the least recently used
+    clock.now += 1
+    cache.put("c", td, None)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
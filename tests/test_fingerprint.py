@@ -0,0 +1,29 @@
+from teardown.fingerprint import changed_inputs, fingerprint, plan, product_inputs
+
+
+def inputs(name="Google Pay", features="", model="gpt-4o-mini", **kwargs):
+    settings = dict(industry="FinTech", depth="Standard (detailed)", include_user_flow=True, include_metrics=True,
+                    include_templates=True, temperature=0.2)
+    settings.update(kwargs)
+    return product_inputs(name, features, model=model, **settings)
+
+
+def test_fingerprint_ignores_surrounding_whitespace():
+    assert fingerprint(inputs(" Google Pay ")) == fingerprint(inputs("Google Pay"))
+    assert fingerprint(inputs(model="gpt-4o")) != fingerprint(inputs())
+
+
+def test_plan_regenerates_only_changed_products():
+    previous = {"A": inputs("Google Pay"), "B": inputs("PhonePe")}
+    current = {"A": inputs("Google Pay"), "B": inputs("PhonePe", features="UPI"), "C": inputs("Paytm")}
+    assert plan(previous, current) == {"B": ["features changed"], "C": ["not generated yet"]}
+
+
+def test_setting_changes_are_described():
+    reasons = changed_inputs(inputs(), inputs(model="gpt-4o", include_metrics=False))
+    assert reasons == ["KPIs off", "model gpt-4o-mini -> gpt-4o"]
+
+
+def test_only_recorded_fields_are_compared():
+    # e.g. a run reloaded from history, where only the product text is known
+    assert changed_inputs({"product": "Google Pay", "features": ""}, inputs()) == []
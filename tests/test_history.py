@@ -0,0 +1,62 @@
+import itertools
+
+import pytest
+
+from teardown import history as history_module
+from teardown.history import TeardownHistory, fts_query
+
+
+@pytest.fixture(params=["fts", "like"])
+def history(request, tmp_path, monkeypatch):
+    if request.param == "like":
+        # SQLite builds without FTS5 fall back to a LIKE scan
+        monkeypatch.setattr(TeardownHistory, "_create_fts", staticmethod(lambda conn: False))
+    return TeardownHistory(str(tmp_path / "history.sqlite3"))
+
+
+def record(history, a, b, a_text="", industry="FinTech"):
+    return history.record_run([{"side": "A", "product": a, "product_text": a + a_text, "teardown": {"strategy": [f"{a} strategy"]}},
+                               {"side": "B", "product": b, "product_text": b, "teardown": {"strategy": [f"{b} growth via referrals"]}}],
+                              industry, "Quick (bullets)", "gpt-4o-mini", 0.2)
+
+
+def test_fts_query_matches_every_word_as_a_prefix():
+    assert fts_query("goo pay") == '"goo"* "pay"*'
+    assert fts_query('"; DROP') == '"DROP"*'
+    assert fts_query("") == ""
+
+
+def test_search_finds_products_and_teardown_text(history):
+    upi = record(history, "Google Pay", "PhonePe")
+    learning = record(history, "Duolingo", "Babbel", industry="EdTech")
+    assert [r["run_id"] for r in history.search("google pay")] == [upi]
+    assert sorted(r["run_id"] for r in history.search("referrals")) == sorted([upi, learning])
+    run = history.search("babbel")[0]
+    assert run["products"] == ["Duolingo", "Babbel"] and run["industry"] == "EdTech"
+    assert history.search("nothing matches this") == []
+
+
+def test_search_without_a_query_lists_recent_runs(history, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(history_module.time, "time", lambda: float(next(ticks)))
+    first = record(history, "Google Pay", "PhonePe")
+    second = record(history, "Duolingo", "Babbel")
+    assert [r["run_id"] for r in history.search("")] == [second, first]
+    assert len(history.search("", limit=1)) == 1
+
+
+def test_same_run_is_stored_once_and_loads_back(history):
+    run_id = record(history, "Google Pay", "PhonePe", a_text="\n\nUPI, rewards")
+    assert record(history, "Google Pay", "PhonePe", a_text="\n\nUPI, rewards") == run_id
+    assert history.stats() == {"runs": 1, "entries": 2}
+    loaded = history.load(run_id)
+    assert loaded["A"]["product_text"] == "Google Pay\n\nUPI, rewards"
+    assert loaded["B"]["teardown"] == {"strategy": ["PhonePe growth via referrals"]}
+    assert history.load("unknown") == {}
+
+
+def test_deleted_runs_leave_the_index(history):
+    run_id = record(history, "Google Pay", "PhonePe")
+    history.delete(run_id)
+    assert history.search("google") == []
+    assert history.stats() == {"runs": 0, "entries": 0}
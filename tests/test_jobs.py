@@ -0,0 +1,101 @@
+import itertools
+import time
+
+import pytest
+
+from benchmarks.stub_server import StubLLMServer
+from teardown import jobs as jobs_module
+from teardown.jobs import JobQueue, WorkerPool, teardown_handler
+from teardown.llm import make_client
+from teardown.retry import RetryPolicy
+
+PARAMS = {"product_text": "Google Pay", "industry_key": "FinTech", "depth": "Quick (bullets)", "include_user_flow": True,
+          "include_metrics": True, "include_templates": True, "model": "gpt-4o-mini", "temperature": 0.2, "structured": True}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), stale_after=60, max_attempts=2)
+
+
+def wait_for(queue, job_ids, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        jobs = queue.jobs(job_ids)
+        if all(job["status"] in jobs_module.FINISHED for job in jobs.values()):
+            return jobs
+        time.sleep(0.05)
+    raise AssertionError("jobs did not finish")
+
+
+def test_submit_rejects_unknown_parameters(queue):
+    with pytest.raises(ValueError, match="client"):
+        queue.submit(dict(PARAMS, client="x"))
+
+
+@pytest.fixture
+def ticking(monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(jobs_module.time, "time", lambda: float(next(ticks)))
+
+
+def test_jobs_are_claimed_oldest_first_and_finished(queue, ticking):
+    first = queue.submit(PARAMS, session="s1", meta={"side": "A"})
+    second = queue.submit(PARAMS)
+    job = queue.claim("w1")
+    assert job["id"] == first and job["status"] == "running" and job["meta"] == {"side": "A"} and job["session"] == "s1"
+    assert queue.claim("w2")["id"] == second
+    assert queue.claim("w3") is None
+    queue.finish(first, {"strategy": ["x"]}, "raw")
+    queue.fail(second, ValueError("no JSON"))
+    jobs = queue.jobs([first, second])
+    assert jobs[first]["status"] == "done" and jobs[first]["result"] == {"strategy": ["x"]}
+    assert jobs[second]["status"] == "error" and jobs[second]["error"] == "no JSON"
+    assert queue.stats()["done"] == 1 and queue.stats()["error"] == 1
+
+
+def test_only_queued_jobs_can_be_cancelled(queue, ticking):
+    started, waiting = queue.submit(PARAMS), queue.submit(PARAMS)
+    queue.claim("w1")
+    assert not queue.cancel(started)
+    assert queue.cancel(waiting)
+    assert queue.get(waiting)["status"] == "cancelled"
+    assert queue.claim("w2") is None
+
+
+def test_jobs_of_lost_workers_are_requeued_then_failed(queue, monkeypatch):
+    job_id = queue.submit(PARAMS)
+    queue.claim("w1")
+    now = time.time()
+    monkeypatch.setattr(jobs_module.time, "time", lambda: now + 61)
+    assert queue.requeue_stale() == 1
+    assert queue.get(job_id)["status"] == "queued"
+    assert queue.claim("w2")["attempts"] == 2
+    monkeypatch.setattr(jobs_module.time, "time", lambda: now + 200)
+    queue.requeue_stale()
+    job = queue.get(job_id)
+    assert job["status"] == "error" and "worker lost" in job["error"]
+
+
+def test_worker_pool_runs_teardowns_against_the_stub(queue):
+    with StubLLMServer(latency=0.0, jitter=0.0, tokens_per_second=0, seed=1) as stub:
+        handler = teardown_handler(make_client("stub-key", base_url=stub.base_url), retry_policy=RetryPolicy(max_attempts=1))
+        pool = WorkerPool(queue, handler, workers=2, poll_interval=0.05).start()
+        try:
+            job_ids = [queue.submit(dict(PARAMS, product_text=f"Job product {i}")) for i in range(3)]
+            jobs = wait_for(queue, job_ids)
+        finally:
+            pool.stop(timeout=5)
+    assert [job["status"] for job in jobs.values()] == ["done"] * 3
+    assert all(isinstance(job["result"], dict) and job["result"] for job in jobs.values())
+
+
+def test_failed_teardowns_mark_the_job_as_error(queue):
+    handler = teardown_handler(None)
+    pool = WorkerPool(queue, handler, workers=1, poll_interval=0.05).start()
+    try:
+        job = wait_for(queue, [queue.submit(PARAMS)])
+    finally:
+        pool.stop(timeout=5)
+    (job,) = job.values()
+    assert job["status"] == "error" and "parseable JSON teardown" in job["error"]
@@ -0,0 +1,89 @@
+import json
+import re
+
+import pytest
+
+from teardown.parsing import extract_json
+from teardown.streaming import IncrementalJSONParser
+
+
+def baseline_extract_json(text):
+    """extract_json as it shipped in the original app.py, kept as the reference behaviour."""
+    if not text:
+        return None
+    m = re.search(r"```json\s*(\{.*\}|\[.*\])\s*```", text, flags=re.DOTALL)
+    if m:
+        text = m.group(1)
+    try:
+        return json.loads(text)
+    except Exception:
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end != -1 and end > start:
+            candidate = text[start:end + 1]
+            try:
+                return json.loads(candidate)
+            except Exception:
+                candidate2 = re.sub(r",\s*([}\]])", r"\1", candidate)
+                try:
+                    return json.loads(candidate2)
+                except Exception:
+                    return None
+    return None
+
+
+# inputs the original extractor handled: the rewrite must agree
+SAME_AS_BASELINE = [
+    '{"a": 1, "b": [1, 2]}',
+    'Here it is:\n```json\n{"a": 1}\n```\nThanks!',
+    'Sure! {"a": {"b": 2}} hope that helps',
+    '{"a": [1, 2,], "b": 3,}',
+    '```json\n[1, 2]\n```',
+    '```json\n{"a": 1}',
+    '{"a": 1, "b": [1, 2',
+    "no json here",
+    "",
+    None,
+]
+
+# inputs the original extractor got wrong (greedy regex / last '}' in the text)
+FIXED = [
+    ('```json\n{"a": 1}\n```\nand a summary:\n```json\n{"b": 2}\n```', {"a": 1}),
+    ('Result: {"a": 1} (note: {x} is a placeholder)', {"a": 1}),
+    ('{"a": "use } carefully"} and a stray }', {"a": "use } carefully"}),
+]
+
+
+@pytest.mark.parametrize("text", SAME_AS_BASELINE)
+def test_extract_json_matches_baseline(text):
+    assert extract_json(text) == baseline_extract_json(text)
+
+
+@pytest.mark.parametrize("text, expected", FIXED)
+def test_extract_json_fixes_baseline_failures(text, expected):
+    assert baseline_extract_json(text) != expected
+    assert extract_json(text) == expected
+
+
+def test_extract_json_large_fenced_response_with_prose():
+    doc = {"sections": [{"name": f"s{i}", "items": ["x" * 50] * 20} for i in range(2000)]}
+    text = "Analysis below.\n```json\n" + json.dumps(doc) + "\n```\nSummary: {not json}"
+    assert extract_json(text) == doc
+
+
+def test_incremental_parser_emits_sections_from_fenced_chunks():
+    td = {"one_pager": "Thesis with a } brace", "strategy": ["a", "b"], "kpis": {"north_star": "n", "leading_indicators": []}}
+    text = "```json\n" + json.dumps(td) + "\n```"
+    parser = IncrementalJSONParser()
+    emitted = []
+    for i in range(0, len(text), 5):
+        emitted.extend(parser.feed(text[i:i + 5]))
+    assert emitted == list(td.items())
+    assert parser.sections == td
+
+
+def test_incremental_parser_emits_each_section_once_complete():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"one_pager": "abc') == []
+    assert parser.feed('", "strategy": ["x"') == [("one_pager", "abc")]
+    assert parser.feed("]}") == [("strategy", ["x"])]
@@ -0,0 +1,72 @@
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.stub_server import StubLLMServer
+from teardown.llm import call_llm, make_client
+from teardown.parsing import extract_json
+from teardown.providers import Provider, Router, provider_models
+from teardown.retry import RetryPolicy
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+def fake_client(error=None, calls=None):
+    def create(**kwargs):
+        if calls is not None:
+            calls.append(kwargs["model"])
+        if error is not None:
+            raise error
+        return "ok"
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_router_fails_over_to_a_healthy_provider():
+    dead = Provider("dead", make_client("x", base_url=f"http://127.0.0.1:{closed_port()}/v1"))
+    with StubLLMServer(latency=0.0, jitter=0.0, tokens_per_second=0, seed=1) as stub:
+        healthy = Provider("stub", make_client("x", base_url=stub.base_url))
+        router = Router([dead, healthy], prior_latency_s=0.0, explore=0.0)
+        raw = call_llm(router, "Product: PhonePe. Return JSON.", policy=RetryPolicy(max_attempts=1))
+    assert isinstance(extract_json(raw), dict)
+    stats = {row["provider"]: row for row in router.snapshot()}
+    assert stats["dead"]["failures"] == 1
+    assert stats["stub"]["calls"] == 1 and stats["stub"]["failures"] == 0
+    assert [p.name for p in router.ranked("gpt-4o-mini")] == ["stub", "dead"]
+
+
+@pytest.mark.parametrize("status", [400, 401, 404])
+def test_permanent_errors_are_raised_without_failover(status):
+    backup_calls = []
+    router = Router([Provider("first", fake_client(APIStatusError(status)), cost={}),
+                     Provider("backup", fake_client(calls=backup_calls), cost={"input": 1.0})], explore=0.0)
+    with pytest.raises(APIStatusError):
+        router.create(model="gpt-4o-mini", messages=[])
+    assert backup_calls == []
+    stats = {row["provider"]: row for row in router.snapshot()}
+    assert stats["first"]["failures"] == 0 and stats["first"]["error_rate"] == 0.0
+
+
+def test_own_model_names_skip_providers_without_a_models_map():
+    openai_calls, ollama_calls = [], []
+    specs = [{"name": "openai"}, {"name": "ollama", "models": {"*": "llama3.1"}}]
+    router = Router([Provider("openai", fake_client(calls=openai_calls)),
+                     Provider("ollama", fake_client(calls=ollama_calls), models=specs[1]["models"], local=True)],
+                    explore=0.0)
+    assert provider_models(specs) == ["llama3.1"]
+    assert [p.name for p in router.ranked("llama3.1")] == ["ollama"]
+    router.create(model="llama3.1", messages=[])
+    assert openai_calls == [] and ollama_calls == ["llama3.1"]
+    # OpenAI was never tried, so its health (and its rank for gpt-4o-mini) is untouched
+    openai = {row["provider"]: row for row in router.snapshot()}["openai"]
+    assert openai["calls"] == 0 and openai["error_rate"] == 0.0
@@ -0,0 +1,33 @@
+import pytest
+
+from teardown.ratelimit import (DEFAULT_COMPLETION_TOKENS, RateLimiter, SECTION_COMPLETION_TOKENS, TokenBucket, estimate_tokens,
+                                section_completion_tokens)
+
+
+def test_bucket_goes_into_debt_and_reports_the_wait():
+    bucket = TokenBucket(60, updated=0.0)
+    assert bucket.reserve(60, now=0.0) == 0.0
+    # 60/min refills one unit per second
+    assert bucket.reserve(3, now=0.0) == pytest.approx(3.0)
+    assert bucket.reserve(1, now=2.0) == pytest.approx(2.0)
+
+
+def test_bucket_refill_is_capped():
+    bucket = TokenBucket(60, level=0.0, updated=0.0)
+    bucket.reserve(0, now=1000.0)
+    assert bucket.level == 60
+
+
+def test_section_calls_reserve_less_than_a_whole_teardown():
+    assert section_completion_tokens(1) == SECTION_COMPLETION_TOKENS
+    assert section_completion_tokens(100) == DEFAULT_COMPLETION_TOKENS
+    assert estimate_tokens("x" * 400) == 100 + DEFAULT_COMPLETION_TOKENS
+    assert estimate_tokens("x" * 400, section_completion_tokens(1)) == 100 + SECTION_COMPLETION_TOKENS
+
+
+def test_settle_credits_back_unused_tokens():
+    limiter = RateLimiter(limits={"m": {"rpm": 1000, "tpm": 6000}}, sleep=lambda s: None)
+    assert limiter.acquire("m", 6000) == 0.0
+    limiter.settle("m", 6000, 1000)
+    # 5000 tokens came back, so a 4000-token call doesn't wait
+    assert limiter.acquire("m", 4000) < 0.1
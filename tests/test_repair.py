@@ -0,0 +1,66 @@
+import json
+from types import SimpleNamespace
+
+from teardown.generate import demo_teardown, generate_teardown
+from teardown.repair import repair_teardown, salvage_sections
+from teardown.retry import RetryPolicy
+from teardown.schema import invalid_sections
+
+FULL = demo_teardown("Google Pay", "FinTech")
+
+
+def scripted_client(*contents):
+    """A client answering each chat.completions.create with the next content; the requests are kept in `.calls`."""
+    replies = list(contents)
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        message = SimpleNamespace(content=replies.pop(0))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)), calls=calls)
+
+
+def without(*keys):
+    return {key: value for key, value in FULL.items() if key not in keys}
+
+
+def test_salvage_keeps_complete_known_sections():
+    raw = json.dumps(without("opportunities"))[:-1] + ', "opportunities": ["cut off'
+    salvaged = salvage_sections(raw)
+    assert salvaged == without("opportunities")
+    assert salvage_sections("") == {}
+
+
+def test_repair_requests_only_the_broken_sections():
+    td = dict(without("swot"), kpis="not an object")
+    client = scripted_client(json.dumps({"swot": FULL["swot"], "kpis": FULL["kpis"]}))
+    repaired, keys = repair_teardown(td, "Google Pay", "FinTech", "Quick (bullets)", True, True, True, client,
+                                     structured=True, policy=RetryPolicy(max_attempts=1))
+    assert sorted(keys) == ["kpis", "swot"]
+    assert repaired == FULL
+    schema = client.calls[0]["response_format"]["json_schema"]["schema"]
+    assert sorted(schema["properties"]) == ["kpis", "swot"]
+
+
+def test_repair_leaves_sections_that_are_still_invalid():
+    client = scripted_client(json.dumps({"swot": "still wrong"}))
+    repaired, keys = repair_teardown(without("swot"), "Google Pay", "FinTech", "Quick (bullets)", True, True, True, client,
+                                     policy=RetryPolicy(max_attempts=1))
+    assert keys == []
+    assert invalid_sections(repaired) == ["swot"]
+
+
+def test_complete_teardowns_make_no_repair_call():
+    client = scripted_client()
+    assert repair_teardown(FULL, "Google Pay", "FinTech", "Quick (bullets)", True, True, True, client) == (FULL, [])
+    assert client.calls == []
+
+
+def test_generate_repairs_a_truncated_response():
+    truncated = json.dumps(without("opportunities"))[:-1] + ', "opportunities": ["cut'
+    client = scripted_client(truncated, json.dumps({"opportunities": FULL["opportunities"]}))
+    td, _ = generate_teardown("Google Pay", "FinTech", "Quick (bullets)", True, True, True, "gpt-4o-mini", 0.2, client=client,
+                              fallback=False, retry_policy=RetryPolicy(max_attempts=1), flight=None)
+    assert td == FULL
+    assert len(client.calls) == 2
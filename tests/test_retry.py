@@ -0,0 +1,82 @@
+import socket
+
+import pytest
+
+from teardown.retry import AUTH, BAD_REQUEST, CONNECTION, RATE_LIMIT, SERVER, TIMEOUT, UNKNOWN, RetryPolicy, classify_error
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = FakeResponse(status_code, headers)
+
+
+class RemoteProtocolError(Exception):
+    pass
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (APIStatusError(429), RATE_LIMIT),
+    (APIStatusError(500), SERVER),
+    (APIStatusError(409), SERVER),
+    (APIStatusError(401), AUTH),
+    (APIStatusError(400), BAD_REQUEST),
+    (TimeoutError(), TIMEOUT),
+    (ConnectionResetError(), CONNECTION),
+    (socket.gaierror(-2, "Name or service not known"), CONNECTION),
+    (RemoteProtocolError(), CONNECTION),
+    (TypeError("'Timeout' object cannot be interpreted as an integer"), UNKNOWN),
+    (FileNotFoundError(2, "No such file or directory", ".teardown/ratelimit.json"), UNKNOWN),
+    (PermissionError(13, "Permission denied", ".teardown/ratelimit.json"), UNKNOWN),
+])
+def test_classify_error(exc, kind):
+    assert classify_error(exc) == kind
+
+
+def failing(errors):
+    calls = []
+
+    def fn(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return fn, calls
+
+
+def test_retries_transient_errors_then_succeeds():
+    waits = []
+    fn, calls = failing([APIStatusError(500), APIStatusError(429)])
+    assert RetryPolicy(max_attempts=3, sleep=waits.append, rng=lambda: 1.0).run(fn) == "ok"
+    assert len(calls) == 3
+    assert waits == [0.5, 1.0]
+
+
+@pytest.mark.parametrize("exc", [APIStatusError(400), APIStatusError(401), TypeError("bug"), AttributeError("bug"),
+                                 PermissionError(13, "Permission denied")])
+def test_does_not_retry_permanent_or_unrecognised_errors(exc):
+    fn, calls = failing([exc])
+    with pytest.raises(type(exc)):
+        RetryPolicy(max_attempts=4, sleep=lambda s: None).run(fn)
+    assert len(calls) == 1
+
+
+def test_honours_retry_after():
+    waits = []
+    fn, _ = failing([APIStatusError(429, {"retry-after-ms": "1500"})])
+    RetryPolicy(sleep=waits.append).run(fn)
+    assert waits == [1.5]
+
+
+def test_gives_up_after_max_attempts():
+    fn, calls = failing([APIStatusError(503)] * 5)
+    with pytest.raises(APIStatusError):
+        RetryPolicy(max_attempts=3, sleep=lambda s: None).run(fn)
+    assert len(calls) == 3
@@ -0,0 +1,78 @@
+import pytest
+
+pytest.importorskip("starlette")
+from starlette.testclient import TestClient
+
+from benchmarks.stub_server import StubLLMServer
+from teardown.llm import make_client
+from teardown.retry import RetryPolicy
+from teardown.server import BadRequest, TeardownService, create_app, parse_settings
+
+
+@pytest.fixture(scope="module")
+def service():
+    with StubLLMServer(latency=0.0, jitter=0.0, tokens_per_second=0, seed=1) as stub:
+        yield TeardownService(make_client("stub-key", base_url=stub.base_url), retry_policy=RetryPolicy(max_attempts=1),
+                              concurrency=2, queue_size=2)
+
+
+@pytest.fixture(scope="module")
+def api(service):
+    with TestClient(create_app(service)) as client:
+        yield client
+
+
+@pytest.mark.parametrize("value", ["false", 0, 1, None])
+def test_flags_must_be_booleans(value):
+    with pytest.raises(BadRequest, match="include_metrics"):
+        parse_settings({"include_metrics": value})
+
+
+def test_flags_accept_booleans():
+    assert parse_settings({"include_metrics": False, "markdown": True})["include_metrics"] is False
+
+
+def test_admit_counts_teardowns_not_requests():
+    service = TeardownService(None, concurrency=2, queue_size=2)
+    assert service.admit(3)
+    assert not service.admit(2)
+    assert service.admit(1)
+    service.release(3)
+    service.release(1)
+    # a request bigger than the whole limit still runs on an idle server
+    assert service.admit(8)
+    assert not service.admit(1)
+    assert service.counters["rejected"] == 2
+
+
+def test_teardown_endpoint(api):
+    resp = api.post("/teardown", json={"product": "Server product", "markdown": True, "use_cache": False})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["product"] == "Server product"
+    assert isinstance(body["teardown"], dict) and body["markdown"]
+
+
+def test_teardown_rejects_string_flags(api):
+    resp = api.post("/teardown", json={"product": "Server product", "include_metrics": "false"})
+    assert resp.status_code == 400
+    assert "include_metrics" in resp.json()["error"]
+
+
+def test_compare_endpoint(api, service):
+    resp = api.post("/compare", json={"products": ["Compare one", {"product": "Compare two", "features": "UPI"}]})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert [p["side"] for p in body["products"]] == ["A", "B"]
+    assert body["matrix"]
+    assert service.counters["pending"] == 0
+
+
+def test_compare_is_rejected_when_its_teardowns_dont_fit(api, service):
+    service.counters["pending"] = 2
+    try:
+        resp = api.post("/compare", json={"products": ["One", "Two", "Three"]})
+    finally:
+        service.counters["pending"] = 0
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"]
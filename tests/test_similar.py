@@ -0,0 +1,47 @@
+import pytest
+
+from teardown.similar import SimilarityIndex, name_aliases, normalize_name
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SimilarityIndex(str(tmp_path / "similar.sqlite3"))
+    index.add("Google Pay", "scope", "google")
+    index.add("Gold Pay", "scope", "gold")
+    index.add("Amazon Pay", "scope", "amazon")
+    index.add("PhonePe\n\nUPI, wallet, cashback", "scope", "phonepe")
+    return index
+
+
+def test_normalize_and_aliases():
+    assert normalize_name("The Google-Pay App") == "google pay"
+    assert name_aliases("Google Pay") == ("googlepay", {"gpay"})
+
+
+@pytest.mark.parametrize("query", ["google pay app", "Google-Pay", "GOOGLE PAY"])
+def test_spellings_of_the_same_name_are_reused(index, query):
+    match = index.lookup(query, "scope")
+    assert match["key"] == "google" and match["kind"] == "exact"
+
+
+@pytest.mark.parametrize("query, offered", [("GPay", {"google", "gold"}), ("APay", {"amazon"})])
+def test_abbreviations_are_only_suggested(index, query, offered):
+    assert index.lookup(query, "scope") is None
+    suggestions = index.suggest(query, "scope")
+    assert {m["key"] for m in suggestions} == offered
+    assert all(m["kind"] == "abbreviation" for m in suggestions)
+
+
+def test_lookup_is_scoped(index):
+    assert index.lookup("Google Pay", "other scope") is None
+
+
+def test_features_must_overlap(index):
+    assert index.lookup("PhonePe\n\nUPI, wallet, cashback", "scope")["key"] == "phonepe"
+    assert index.lookup("PhonePe\n\ngrocery delivery subscriptions", "scope") is None
+
+
+def test_remove_and_exclude(index):
+    assert index.lookup("Google Pay", "scope", exclude={"google"}) is None
+    index.remove("google")
+    assert index.lookup("Google Pay", "scope") is None
@@ -0,0 +1,95 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from teardown.generate import generate_teardown
+from teardown.llm import LLMCallError
+from teardown.retry import RetryPolicy
+from teardown.singleflight import SingleFlight
+
+
+def run_concurrently(n, fn):
+    results, errors = [None] * n, [None] * n
+
+    def one(i):
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            errors[i] = e
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+
+    def work(publish):
+        calls.append(1)
+        time.sleep(0.2)
+        return "result"
+    results, _ = run_concurrently(4, lambda i: flight.do("key", work))
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True]
+    assert flight.in_flight() == {}
+
+
+def test_leader_error_reaches_every_caller():
+    flight = SingleFlight()
+
+    def work(publish):
+        time.sleep(0.2)
+        raise ValueError("boom")
+    _, errors = run_concurrently(3, lambda i: flight.do("key", work))
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_late_joiners_get_published_events_replayed():
+    flight, seen = SingleFlight(), []
+    started = threading.Event()
+
+    def work(publish):
+        publish("first")
+        started.set()
+        time.sleep(0.2)
+        return "done"
+    leader = threading.Thread(target=flight.do, args=("key", work))
+    leader.start()
+    started.wait()
+    assert flight.do("key", work, listener=seen.append) == ("done", True)
+    leader.join()
+    assert seen == ["first"]
+
+
+def slow_failing_client(calls):
+    class AuthenticationError(Exception):
+        status_code = 401
+
+    def create(**kwargs):
+        calls.append(kwargs["model"])
+        time.sleep(0.3)
+        raise AuthenticationError("bad key")
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_coalesced_errors_reach_every_on_error_and_teardowns_are_copies():
+    calls = []
+    client = slow_failing_client(calls)
+
+    def generate(i):
+        errors = []
+        td, _ = generate_teardown("Google Pay", "FinTech", "Quick (bullets)", True, True, True, "gpt-4o-mini", 0.2,
+                                  client=client, on_error=errors.append, retry_policy=RetryPolicy(max_attempts=1),
+                                  flight=flight)
+        return td, errors
+    flight = SingleFlight()
+    results, _ = run_concurrently(3, generate)
+    assert len(calls) == 1
+    for td, errors in results:
+        assert [type(e) for e in errors] == [LLMCallError]
+    teardowns = [td for td, _ in results]
+    assert all(td == teardowns[0] for td in teardowns)
+    assert len({id(td) for td in teardowns}) == 3
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.stub_server import StubLLMServer
+from teardown.generate import generate_teardown
+from teardown.llm import call_llm, make_client
+from teardown.parsing import extract_json
+from teardown.retry import RetryPolicy
+from teardown.schema import invalid_sections
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with StubLLMServer(latency=0.0, jitter=0.0, tokens_per_second=0, seed=1) as server:
+        yield server
+
+
+@pytest.fixture(scope="module")
+def client(stub):
+    return make_client("stub-key", base_url=stub.base_url)
+
+
+def test_call_llm_round_trip(stub, client):
+    before = stub.stats["requests"]
+    raw = call_llm(client, "Product: Google Pay. Return the teardown as JSON.", policy=RetryPolicy(max_attempts=1))
+    assert isinstance(extract_json(raw), dict)
+    assert stub.stats["requests"] == before + 1
+
+
+@pytest.mark.parametrize("mode, stream", [("single", False), ("single", True), ("sections", False)])
+def test_generate_teardown_end_to_end(client, mode, stream):
+    sections, errors = [], []
+    td, raw = generate_teardown(f"Smoke product {mode} {stream}", "General / Consumer", "Quick (bullets)", True, True, True,
+                                "gpt-4o-mini", 0.2, client=client, structured=True, mode=mode, fallback=False,
+                                on_section=(lambda key, value: sections.append(key)) if stream else None,
+                                on_error=errors.append, retry_policy=RetryPolicy(max_attempts=1), flight=None)
+    assert errors == []
+    assert td and not invalid_sections(td)
+    if stream:
+        assert set(sections) == set(td)
+